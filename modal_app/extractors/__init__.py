@@ -1,3 +1,15 @@
-from .firecrawl_extractor import FirecrawlExtractor
+from .cache import ExtractionCache
+from .deterministic import PARSERS, completeness
+from .firecrawl_extractor import FirecrawlExtractor, PageResult
+from .hybrid import HybridExtractor
+from .pacing import Pacer
 
-__all__ = ["FirecrawlExtractor"]
+__all__ = [
+    "ExtractionCache",
+    "FirecrawlExtractor",
+    "HybridExtractor",
+    "PageResult",
+    "Pacer",
+    "PARSERS",
+    "completeness",
+]
@@ -0,0 +1,204 @@
+"""On-disk cache of Firecrawl extraction results.
+
+Entries are keyed by page URL and validated with a cheap content
+fingerprint (plain HTTP GET, conditional when the site sends ETag or
+Last-Modified), so unchanged pages skip AI extraction entirely.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from .pacing import Pacer
+
+logger = logging.getLogger(__name__)
+
+# Three weekly runs: well clear of the schedule interval, so an entry stored
+# late in last week's run is still valid when this week's run reaches it
+DEFAULT_TTL_SECONDS = 21 * 24 * 3600
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+# Markup that changes on every request without the listings changing
+_VOLATILE = re.compile(r"<script\b.*?</script>|<style\b.*?</style>|<!--.*?-->|<input[^>]*>", re.S | re.I)
+_TAGS = re.compile(r"<(?!a\s)[^>]+>")
+_SPACE = re.compile(r"\s+")
+
+
+@dataclass
+class PageFingerprint:
+    """Cheap identity of a page's content plus its HTTP validators."""
+
+    value: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+def fingerprint_html(html: str) -> str:
+    """Hash the visible text and links of a page, ignoring scripts and styles."""
+    text = _VOLATILE.sub(" ", html)
+    text = _TAGS.sub(" ", text)
+    text = _SPACE.sub(" ", text).strip()
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ExtractionCache:
+    """Extraction results stored as one JSON file per page URL."""
+
+    def __init__(
+        self,
+        directory: str,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        proxy_url: Optional[str] = None,
+        fetch_timeout: float = 15.0,
+        pacer: Optional[Pacer] = None,
+    ):
+        """Initialize the cache.
+
+        Args:
+            directory: Cache directory (e.g. a mounted Modal volume)
+            ttl_seconds: Entries older than this are re-extracted even if unchanged
+            max_bytes: Oldest entries are evicted beyond this total size
+            proxy_url: Proxy for fingerprint requests
+            fetch_timeout: Timeout of fingerprint requests (seconds)
+            pacer: Paces fingerprint requests with the worker's other page fetches
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.http = httpx.Client(
+            proxy=proxy_url, timeout=fetch_timeout, follow_redirects=True,
+            headers={"User-Agent": "Mozilla/5.0 (compatible; property-scraper)"},
+        )
+        self.pacer = pacer or Pacer()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, url: str) -> Path:
+        return self.directory / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def _read(self, url: str) -> Optional[dict]:
+        try:
+            entry = json.loads(self._path(url).read_text())
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("stored_at", 0) > self.ttl_seconds:
+            return None
+        return entry
+
+    def fingerprint(self, url: str) -> Optional[PageFingerprint]:
+        """Fetch the page without AI extraction and fingerprint it (None on failure)."""
+        entry = self._read(url)
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            with self.pacer:
+                response = self.http.get(url, headers=headers)
+            if response.status_code == 304 and entry:
+                return PageFingerprint(entry["fingerprint"], entry.get("etag"), entry.get("last_modified"))
+            response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"Could not fingerprint {url}, bypassing cache: {e}")
+            return None
+
+        return PageFingerprint(
+            fingerprint_html(response.text),
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+
+    def get(self, url: str, fingerprint: Optional[PageFingerprint]) -> Optional[List[dict]]:
+        """Cached listings for the page if its content is unchanged."""
+        entry = self._read(url) if fingerprint else None
+        hit = entry is not None and entry["fingerprint"] == fingerprint.value
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry["listings"] if hit else None
+
+    def put(self, url: str, fingerprint: Optional[PageFingerprint], listings: List[dict]) -> None:
+        """Store extraction results for a page (atomic write)."""
+        if fingerprint is None:
+            return
+        entry = {
+            "url": url,
+            "fingerprint": fingerprint.value,
+            "etag": fingerprint.etag,
+            "last_modified": fingerprint.last_modified,
+            "stored_at": time.time(),
+            "listings": listings,
+        }
+        path = self._path(url)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp.write_text(json.dumps(entry, default=str))
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write extraction cache entry for {url}: {e}")
+
+    def lookup_many(
+        self, urls: List[str], fingerprints: Optional[Dict[str, PageFingerprint]] = None
+    ) -> Dict[str, tuple]:
+        """Look pages up, fingerprinting (paced, one at a time) those without a known fingerprint.
+
+        Args:
+            urls: Page URLs
+            fingerprints: Fingerprints of pages the caller already fetched
+
+        Returns:
+            url -> (fingerprint, cached listings or None)
+        """
+        fingerprints = fingerprints or {}
+        results = {}
+        for url in urls:
+            fingerprint = fingerprints[url] if url in fingerprints else self.fingerprint(url)
+            results[url] = (fingerprint, self.get(url, fingerprint))
+        return results
+
+    def evict(self) -> int:
+        """Remove expired entries, then the oldest ones until under max_bytes."""
+        now = time.time()
+        entries = []
+        removed = 0
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                removed += 1
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+
+        if removed:
+            logger.info(f"Evicted {removed} extraction cache entries")
+        return removed
+
+    def close(self) -> None:
+        self.http.close()
@@ -0,0 +1,139 @@
+"""Deterministic (selector-based) listing parsers.
+
+Free and fast alternatives to AI extraction for sites with a stable
+markup. Each parser turns a listing index page into raw listing dicts in
+the PropertyListing shape; completeness() scores how much of a listing
+the selectors managed to find.
+"""
+
+import re
+from typing import Callable, Dict, List
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+# Weight of each field in the completeness score (sums to 1.0)
+COMPLETENESS_WEIGHTS = {
+    "title": 0.3,
+    "price": 0.3,
+    "location": 0.2,
+    "size": 0.2,  # any of bedrooms / bathrooms / area_sqm
+}
+
+# BienesOnline detail pages: /ficha-casa-venta-..._CAV123.php, /ficha-apartamento-venta-..._APV123.php, ...
+BIENES_ONLINE_LINK = re.compile(r"/ficha-[a-z-]+_[A-Z]{3}\d+\.php")
+
+BIENES_ONLINE_TYPES = (
+    ("apartamento", "apartment"),
+    ("terreno", "land"),
+    ("oficina", "office"),
+    ("local", "commercial"),
+    ("casa", "house"),
+)
+
+
+def completeness(listing: dict) -> float:
+    """Score 0-1 of how complete a parsed listing is."""
+    score = 0.0
+    if listing.get("title"):
+        score += COMPLETENESS_WEIGHTS["title"]
+    if listing.get("price"):
+        score += COMPLETENESS_WEIGHTS["price"]
+    if listing.get("location"):
+        score += COMPLETENESS_WEIGHTS["location"]
+    if any(listing.get(key) for key in ("bedrooms", "bathrooms", "area_sqm")):
+        score += COMPLETENESS_WEIGHTS["size"]
+    return round(score, 2)
+
+
+def parse_bienes_online(html: str, page_url: str) -> List[dict]:
+    """Parse BienesOnline listing cards (ported from scraper/run.py)."""
+    soup = BeautifulSoup(html, "lxml")
+    listings = []
+    seen_urls = set()
+
+    for link in soup.find_all("a", href=BIENES_ONLINE_LINK):
+        source_url = urljoin(page_url, link.get("href", ""))
+        if source_url in seen_urls:
+            continue
+        seen_urls.add(source_url)
+
+        data = {"source_url": source_url}
+
+        # Property card container (go up to div/article parent)
+        card = link.find_parent(["div", "article"]) or link.parent
+
+        # Title - h2/h3/h4 in the card, or the image alt text
+        title_elem = card.find(["h2", "h3", "h4"])
+        if title_elem:
+            data["title"] = title_elem.get_text(strip=True)
+        elif link.find("img"):
+            data["title"] = link.find("img").get("alt", "")
+
+        # Image
+        img = card.find("img") or link.find("img")
+        if img:
+            img_url = img.get("src", "")
+            if img_url and not img_url.startswith(("http", "data:", "blob:")):
+                img_url = urljoin(page_url, img_url)
+            if img_url.startswith("http"):
+                data["thumbnail_url"] = img_url
+
+        # Bedrooms, bathrooms, area from <li> elements ("7 habitaciones", "6 baños", "580 m2")
+        for li in card.find_all("li"):
+            li_text = li.get_text(strip=True).lower()
+            number = re.search(r"(\d+)", li_text)
+            if not number:
+                continue
+            if "habitacion" in li_text:
+                data["bedrooms"] = int(number.group(1))
+            if "baño" in li_text or "bano" in li_text:
+                data["bathrooms"] = int(number.group(1))
+            if "m2" in li_text or "m²" in li_text:
+                data["area_sqm"] = float(number.group(1))
+
+        # Fallback: same facts from the card text
+        all_text = card.get_text(" ")
+        if not data.get("bedrooms"):
+            match = re.search(r"(\d+)\s*habitacion", all_text, re.I)
+            if match:
+                data["bedrooms"] = int(match.group(1))
+        if not data.get("bathrooms"):
+            match = re.search(r"(\d+)\s*baños?", all_text, re.I)
+            if match:
+                data["bathrooms"] = int(match.group(1))
+        if not data.get("area_sqm"):
+            match = re.search(r"(\d+)\s*m[2²]", all_text, re.I)
+            if match:
+                data["area_sqm"] = float(match.group(1))
+
+        # Price - "U$D 120.000"
+        match = re.search(r"U\$D\s*([\d,.]+)", all_text)
+        if match:
+            digits = match.group(1).replace(".", "").replace(",", "")
+            if digits.isdigit():
+                data["price"] = float(digits)
+                data["currency"] = "USD"
+
+        # Location - "Casa en Venta en [location]"
+        match = re.search(
+            r"(?:Casa|Apartamento|Terreno|Oficina|Local)\s+en\s+Venta\s+en\s+([^,\n]+)", all_text, re.I
+        )
+        if match:
+            data["location"] = match.group(1).strip()
+
+        # Property type from the URL
+        for keyword, property_type in BIENES_ONLINE_TYPES:
+            if keyword in source_url.lower():
+                data["property_type"] = property_type
+                break
+
+        listings.append(data)
+
+    return listings
+
+
+# Deterministic parser per source; sources without one use AI extraction only
+PARSERS: Dict[str, Callable[[str, str], List[dict]]] = {
+    "bienesonline": parse_bienes_online,
+}
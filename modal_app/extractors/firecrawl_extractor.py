@@ -1,15 +1,56 @@
 """Firecrawl-based property listing extractor."""
 
 import os
+import time
 import logging
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urljoin
+import sentry_sdk
 from firecrawl import FirecrawlApp
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 
 from ..models.listing import PropertyListing
+from .cache import ExtractionCache, PageFingerprint
 
 logger = logging.getLogger(__name__)
 
+MAX_RETRY_AFTER_SECONDS = 120.0
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of a Firecrawl client error (requests.HTTPError carries the response)."""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """Network errors, rate limits (429) and server errors; not other 4xx."""
+    status = _status_code(error)
+    return status is None or status == 429 or status >= 500
+
+
+def _submit_wait(retry_state) -> float:
+    """Honour Retry-After on 429s, exponential backoff otherwise."""
+    error = retry_state.outcome.exception()
+    response = getattr(error, "response", None)
+    retry_after = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+    if _status_code(error) == 429 and retry_after:
+        try:
+            return min(float(retry_after), MAX_RETRY_AFTER_SECONDS)
+        except ValueError:
+            pass  # an HTTP date; fall back to backoff
+    return wait_exponential(multiplier=2, min=2, max=60)(retry_state)
+
+
+@dataclass
+class PageResult:
+    """Outcome of extracting one page in batch mode."""
+
+    url: str
+    listings: List[PropertyListing] = field(default_factory=list)
+    error: Optional[str] = None
+
 
 class FirecrawlExtractor:
     """Firecrawl-based property listing extractor using AI extraction."""
@@ -59,60 +100,106 @@ class FirecrawlExtractor:
     Make sure source_url is the full URL to the individual property page, not the current page URL.
     """
 
-    def __init__(self, proxy_url: Optional[str] = None):
-        """Initialize the Firecrawl extractor."""
+    def __init__(
+        self,
+        proxy_url: Optional[str] = None,
+        api_url: Optional[str] = None,
+        batch_size: int = 50,
+        max_active_batches: int = 2,
+        poll_interval_seconds: float = 2.0,
+        batch_timeout_seconds: float = 900.0,
+        cache: Optional[ExtractionCache] = None,
+    ):
+        """Initialize the Firecrawl extractor.
+
+        Args:
+            proxy_url: Bright Data proxy URL
+            api_url: Firecrawl API base URL (default: FIRECRAWL_API_URL or the hosted API)
+            batch_size: URLs per batch scrape job
+            max_active_batches: Batch jobs running at once (keep within the plan's concurrency)
+            poll_interval_seconds: Delay between batch status checks
+            batch_timeout_seconds: Pages not done after this long are reported as failed
+            cache: Extraction cache; unchanged pages are served from it without credits
+        """
         api_key = os.environ.get("FIRECRAWL_API_KEY")
         if not api_key:
             raise ValueError("FIRECRAWL_API_KEY environment variable is required")
 
-        self.client = FirecrawlApp(api_key=api_key)
+        api_url = api_url or os.environ.get("FIRECRAWL_API_URL")
+        self.client = FirecrawlApp(api_key=api_key, api_url=api_url) if api_url else FirecrawlApp(api_key=api_key)
         self.proxy_url = proxy_url
+        self.batch_size = batch_size
+        self.max_active_batches = max_active_batches
+        self.poll_interval_seconds = poll_interval_seconds
+        self.batch_timeout_seconds = batch_timeout_seconds
+        self.cache = cache
+
+    def _scrape_params(self) -> dict:
+        return {
+            "formats": ["extract"],
+            "extract": {
+                "schema": self.LISTING_SCHEMA,
+                "prompt": self.EXTRACTION_PROMPT,
+            },
+        }
+
+    def _validate(self, raw_listings: list, url: str) -> List[PropertyListing]:
+        """Validate raw extracted listings from page `url`."""
+        validated_listings = []
+        for raw in raw_listings:
+            try:
+                # Ensure source_url is absolute
+                source_url = raw.get("source_url", "")
+                if source_url and not source_url.startswith("http"):
+                    # Make relative URL absolute (the same way the selector parsers do)
+                    raw["source_url"] = urljoin(url, source_url)
+
+                listing = PropertyListing(**raw)
+                validated_listings.append(listing)
+            except Exception as e:
+                logger.warning(f"Failed to validate listing: {e}")
+                continue
+        return validated_listings
+
+    def extract_listings(self, url: str, fingerprint: Optional[PageFingerprint] = None) -> List[PropertyListing]:
+        """Extract property listings from a single page (served from the cache if unchanged).
+
+        Args:
+            url: Page URL
+            fingerprint: Fingerprint of the page if the caller already fetched it
+        """
+        if not self.cache:
+            return self._extract(url)
+
+        fingerprint = fingerprint or self.cache.fingerprint(url)
+        cached = self.cache.get(url, fingerprint)
+        if cached is not None:
+            logger.info(f"Cache hit for: {url}")
+            return self._validate(cached, url)
+
+        listings = self._extract(url)
+        self.cache.put(url, fingerprint, [l.model_dump() for l in listings])
+        return listings
 
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=30),
     )
-    def extract_listings(self, url: str) -> List[PropertyListing]:
-        """Extract property listings from a single page."""
+    def _extract(self, url: str) -> List[PropertyListing]:
+        """Extract property listings from a single page with Firecrawl."""
         logger.info(f"Extracting listings from: {url}")
 
         try:
             # Use Firecrawl's extract method with schema
-            result = self.client.scrape_url(
-                url,
-                params={
-                    "formats": ["extract"],
-                    "extract": {
-                        "schema": self.LISTING_SCHEMA,
-                        "prompt": self.EXTRACTION_PROMPT,
-                    },
-                },
-            )
+            with sentry_sdk.start_span(op="firecrawl.scrape", description=url):
+                result = self.client.scrape_url(url, params=self._scrape_params())
 
             if not result or "extract" not in result:
                 logger.warning(f"No extraction result for: {url}")
                 return []
 
             extracted = result.get("extract", {})
-            raw_listings = extracted.get("listings", [])
-
-            # Validate and convert to PropertyListing objects
-            validated_listings = []
-            for raw in raw_listings:
-                try:
-                    # Ensure source_url is absolute
-                    source_url = raw.get("source_url", "")
-                    if source_url and not source_url.startswith("http"):
-                        # Make relative URL absolute
-                        base_url = url.rsplit("/", 1)[0]
-                        source_url = f"{base_url}/{source_url.lstrip('/')}"
-                        raw["source_url"] = source_url
-
-                    listing = PropertyListing(**raw)
-                    validated_listings.append(listing)
-                except Exception as e:
-                    logger.warning(f"Failed to validate listing: {e}")
-                    continue
+            validated_listings = self._validate(extracted.get("listings", []), url)
 
             logger.info(f"Extracted {len(validated_listings)} listings from: {url}")
             return validated_listings
@@ -120,3 +207,111 @@ class FirecrawlExtractor:
         except Exception as e:
             logger.error(f"Extraction failed for {url}: {e}")
             raise
+
+    def extract_batch(
+        self, urls: List[str], fingerprints: Optional[Dict[str, PageFingerprint]] = None
+    ) -> Iterator[PageResult]:
+        """Extract listings from many pages with Firecrawl batch scrape jobs.
+
+        URLs are submitted in jobs of `batch_size`, with at most
+        `max_active_batches` jobs running; Firecrawl scrapes the pages of a
+        job concurrently, so the wall-clock time follows the slowest page
+        rather than the sum. Results are yielded as pages complete, in
+        completion order; every URL yields exactly one PageResult.
+        `fingerprints` of pages the caller already fetched save the cache
+        a second request.
+        """
+        missed = {}  # url -> fingerprint of pages to extract
+        if self.cache:
+            # Unchanged pages come straight from the cache, only the rest is submitted
+            for url, (fingerprint, cached) in self.cache.lookup_many(urls, fingerprints).items():
+                if cached is not None:
+                    yield PageResult(url, listings=self._validate(cached, url))
+                else:
+                    missed[url] = fingerprint
+            misses = list(missed)
+            logger.info(f"Extraction cache: {len(urls) - len(misses)} hits, {len(misses)} pages to extract")
+            urls = misses
+
+        for result in self._extract_batch(urls):
+            if self.cache and not result.error:
+                self.cache.put(result.url, missed.get(result.url), [l.model_dump() for l in result.listings])
+            yield result
+
+    @retry(
+        stop=stop_after_attempt(4),
+        wait=_submit_wait,
+        retry=retry_if_exception(_is_retryable),
+        reraise=True,
+        before_sleep=lambda state: logger.warning(
+            f"Batch submit failed ({state.outcome.exception()}), retry {state.attempt_number}/3"
+        ),
+    )
+    def _submit_batch(self, chunk: List[str]) -> dict:
+        """Submit a batch scrape job; retried with backoff (plan limits answer 429)."""
+        response = self.client.async_batch_scrape_urls(chunk, params=self._scrape_params())
+        if not response or "id" not in response:
+            raise RuntimeError(f"batch submit returned no job id: {response}")
+        return response
+
+    def _extract_batch(self, urls: List[str]) -> Iterator[PageResult]:
+        """Run Firecrawl batch scrape jobs for `urls` (see extract_batch)."""
+        pending = [urls[i:i + self.batch_size] for i in range(0, len(urls), self.batch_size)]
+        active = {}  # job id -> (urls not yet reported, submitted at, tracing span)
+
+        while pending or active:
+            # Keep up to max_active_batches jobs in flight
+            while pending and len(active) < self.max_active_batches:
+                chunk = pending.pop(0)
+                try:
+                    response = self._submit_batch(chunk)
+                    job_id = response["id"]
+                except Exception as e:
+                    logger.error(f"Batch submit failed for {len(chunk)} URLs after retries: {e}")
+                    for url in chunk:
+                        yield PageResult(url, error=f"submit failed: {e}")
+                    continue
+                for url in response.get("invalidURLs") or []:
+                    if url in chunk:
+                        chunk.remove(url)
+                        yield PageResult(url, error="invalid URL")
+                # Started and finished by hand: the job outlives any one block of this generator
+                span = sentry_sdk.start_span(op="firecrawl.batch", description=f"batch scrape of {len(chunk)} pages")
+                span.set_data("job_id", job_id)
+                span.set_data("pages", len(chunk))
+                active[job_id] = (set(chunk), time.monotonic(), span)
+                logger.info(f"Submitted batch {job_id} ({len(chunk)} pages)")
+
+            time.sleep(self.poll_interval_seconds)
+
+            for job_id in list(active):
+                remaining, submitted_at, span = active[job_id]
+                try:
+                    status = self.client.check_batch_scrape_status(job_id)
+                except Exception as e:
+                    logger.warning(f"Batch {job_id} status check failed: {e}")
+                    status = {}
+
+                for doc in status.get("data") or []:
+                    metadata = doc.get("metadata") or {}
+                    url = metadata.get("sourceURL") or metadata.get("url")
+                    if url not in remaining:
+                        continue
+                    remaining.discard(url)
+                    if metadata.get("error") or (metadata.get("statusCode") or 200) >= 400:
+                        yield PageResult(url, error=metadata.get("error") or f"HTTP {metadata.get('statusCode')}")
+                        continue
+                    listings = self._validate((doc.get("extract") or {}).get("listings", []), url)
+                    logger.info(f"Extracted {len(listings)} listings from: {url}")
+                    yield PageResult(url, listings=listings)
+
+                state = status.get("status")
+                timed_out = time.monotonic() - submitted_at > self.batch_timeout_seconds
+                if state in ("completed", "failed", "cancelled") or timed_out or not remaining:
+                    reason = "timed out" if timed_out else f"batch {state or 'finished'} without result"
+                    span.set_data("failed_pages", len(remaining))
+                    span.set_status("ok" if not remaining else "deadline_exceeded" if timed_out else "internal_error")
+                    span.finish()
+                    for url in remaining:
+                        yield PageResult(url, error=reason)
+                    del active[job_id]
@@ -0,0 +1,179 @@
+"""Hybrid extractor: deterministic parser first, AI extraction as fallback."""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+import httpx
+import sentry_sdk
+
+from ..models.listing import PropertyListing
+from .cache import PageFingerprint, fingerprint_html
+from .deterministic import completeness
+from .firecrawl_extractor import FirecrawlExtractor, PageResult
+from .pacing import Pacer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ParsedPage:
+    """Deterministic parse of one page and what still needs AI extraction."""
+
+    url: str
+    listings: List[PropertyListing] = field(default_factory=list)
+    # Listing URLs to take from AI extraction -> parsed version kept if AI has none (None if invalid)
+    incomplete: Dict[str, Optional[PropertyListing]] = field(default_factory=dict)
+    fallback: bool = False  # whole page goes to AI extraction
+    fingerprint: Optional[PageFingerprint] = None  # for the extraction cache, from the fetched HTML
+
+    @property
+    def needs_ai(self) -> bool:
+        return self.fallback or bool(self.incomplete)
+
+
+class HybridExtractor:
+    """Extractor chain for one source: selectors first, Firecrawl where they fail.
+
+    Listings scoring below `min_completeness` are replaced by the AI version
+    of the same listing; a page where fewer than `min_page_ratio` of the
+    listings parse completely (or none are found, e.g. after a redesign) is
+    extracted by AI entirely. Same interface as FirecrawlExtractor.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        parser: Callable[[str, str], List[dict]],
+        ai: FirecrawlExtractor,
+        min_completeness: float = 0.8,
+        min_page_ratio: float = 0.5,
+        proxy_url: Optional[str] = None,
+        fetch_timeout: float = 20.0,
+        pacer: Optional[Pacer] = None,
+    ):
+        """Initialize the chain.
+
+        Args:
+            source: Source identifier (for logs and stats)
+            parser: Deterministic parser (html, page_url) -> raw listing dicts
+            ai: Fallback AI extractor
+            min_completeness: Listings scoring below this fall back to AI
+            min_page_ratio: Pages with a smaller share of complete listings fall back entirely
+            proxy_url: Proxy for page fetches
+            fetch_timeout: Page fetch timeout (seconds)
+            pacer: Paces page fetches (shared with the cache's fingerprint requests)
+        """
+        self.source = source
+        self.parser = parser
+        self.ai = ai
+        self.min_completeness = min_completeness
+        self.min_page_ratio = min_page_ratio
+        self.pacer = pacer or Pacer()
+        self.http = httpx.Client(
+            proxy=proxy_url, timeout=fetch_timeout, follow_redirects=True,
+            headers={"User-Agent": "Mozilla/5.0 (compatible; property-scraper)"},
+        )
+        self.stats = {"pages": 0, "ai_pages": 0, "page_fallbacks": 0, "listings": 0, "listing_fallbacks": 0}
+
+    @property
+    def cache(self):
+        return self.ai.cache
+
+    def _parse(self, url: str) -> ParsedPage:
+        """Fetch and parse a page deterministically."""
+        fingerprint = None
+        try:
+            with sentry_sdk.start_span(op="http.client", description=f"GET {url}"):
+                with self.pacer:
+                    response = self.http.get(url)
+                response.raise_for_status()
+            if self.cache:
+                # The cache would otherwise fetch the page again to fingerprint it
+                fingerprint = PageFingerprint(
+                    fingerprint_html(response.text),
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                )
+            with sentry_sdk.start_span(op="scrape.parse", description=url) as span:
+                raw_listings = self.parser(response.text, url)
+                span.set_data("listings", len(raw_listings))
+        except Exception as e:
+            logger.warning(f"Deterministic parse failed for {url}, falling back to AI: {e}")
+            return ParsedPage(url, fallback=True, fingerprint=fingerprint)
+
+        complete = [raw for raw in raw_listings if completeness(raw) >= self.min_completeness]
+        if not raw_listings or len(complete) / len(raw_listings) < self.min_page_ratio:
+            logger.info(f"Selectors found {len(complete)}/{len(raw_listings)} complete listings on {url}, falling back to AI")
+            return ParsedPage(url, fallback=True, fingerprint=fingerprint)
+
+        incomplete = {}
+        for raw in raw_listings:
+            if completeness(raw) < self.min_completeness:
+                parsed = self.ai._validate([dict(raw)], url)
+                incomplete[raw["source_url"]] = parsed[0] if parsed else None
+        return ParsedPage(
+            url,
+            listings=self.ai._validate(complete, url),
+            incomplete=incomplete,
+            fingerprint=fingerprint,
+        )
+
+    def _record(self, page: ParsedPage) -> None:
+        self.stats["pages"] += 1
+        if page.needs_ai:
+            self.stats["ai_pages"] += 1
+        if page.fallback:
+            self.stats["page_fallbacks"] += 1
+        self.stats["listings"] += len(page.listings)
+        self.stats["listing_fallbacks"] += len(page.incomplete)
+
+    @staticmethod
+    def _merge(page: ParsedPage, ai_listings: List[PropertyListing]) -> List[PropertyListing]:
+        """Deterministic listings plus the AI version of the incomplete ones (parsed one if AI has none)."""
+        if page.fallback:
+            return ai_listings
+        by_url = {l.source_url: l for l in ai_listings}
+        merged = [by_url.get(source_url) or parsed for source_url, parsed in page.incomplete.items()]
+        return page.listings + [l for l in merged if l is not None]
+
+    def extract_listings(self, url: str) -> List[PropertyListing]:
+        """Extract listings from one page (AI only where the selectors fail)."""
+        page = self._parse(url)
+        self._record(page)
+        if not page.needs_ai:
+            logger.info(f"Extracted {len(page.listings)} listings deterministically from: {url}")
+            return page.listings
+        try:
+            return self._merge(page, self.ai.extract_listings(url, fingerprint=page.fingerprint))
+        except Exception:
+            if page.fallback:
+                raise
+            listings = self._merge(page, [])
+            logger.warning(f"AI fallback failed for {url}, keeping {len(listings)} parsed listings")
+            return listings
+
+    def extract_batch(self, urls: List[str]) -> Iterator[PageResult]:
+        """Extract many pages: parse each (paced), batch only the AI fallbacks."""
+        pages = {url: self._parse(url) for url in urls}
+
+        for page in pages.values():
+            self._record(page)
+            if not page.needs_ai:
+                yield PageResult(page.url, listings=page.listings)
+
+        fallback_urls = [url for url, page in pages.items() if page.needs_ai]
+        if fallback_urls:
+            logger.info(f"{self.source}: {len(fallback_urls)}/{len(urls)} pages need AI extraction")
+        fingerprints = {url: pages[url].fingerprint for url in fallback_urls if pages[url].fingerprint}
+        for result in self.ai.extract_batch(fallback_urls, fingerprints):
+            page = pages[result.url]
+            if result.error and page.fallback:
+                yield result
+            elif result.error:
+                yield PageResult(page.url, listings=self._merge(page, []))
+            else:
+                yield PageResult(page.url, listings=self._merge(page, result.listings))
+
+    def close(self) -> None:
+        self.http.close()
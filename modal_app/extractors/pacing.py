@@ -0,0 +1,32 @@
+"""Pacing of the requests a worker sends to a scraped site itself."""
+
+import threading
+import time
+
+
+class Pacer:
+    """One request at a time, started at least `interval` seconds after the last one ended.
+
+    Shared by everything in a worker that fetches pages directly (selector
+    parsing, cache fingerprints), so each worker has at most one request to
+    the site in flight and a source at most MAX_CONCURRENCY.
+
+        with pacer:
+            response = http.get(url)
+    """
+
+    def __init__(self, interval: float = 0.0):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._last = float("-inf")  # monotonic time the previous request ended
+
+    def __enter__(self) -> "Pacer":
+        self._lock.acquire()
+        delay = self._last + self.interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._last = time.monotonic()
+        self._lock.release()
@@ -5,20 +5,29 @@ This module defines the Modal app that runs weekly scraping jobs
 to aggregate property listings from Venezuelan real estate sites.
 
 Usage:
-    # Local testing
+    # Local testing (workers on Modal / on a local thread pool)
     modal run modal_app/main.py
+    modal run modal_app/main.py --local
 
     # Deploy to Modal
     modal deploy modal_app/main.py
 
     # Manual trigger
     modal run modal_app/main.py::scrape_all_sources
+
+    # Profile the workers (CPU stacks + memory, see scraper/profiling.py)
+    modal run modal_app/main.py --profile
 """
 
 import modal
 import logging
+import os
+import sys
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -27,6 +36,9 @@ logger = logging.getLogger(__name__)
 # Define Modal app
 app = modal.App("property-scraper-venezuela")
 
+# The profiler lives with the Playwright scraper and is shipped next to main.py
+SCRAPER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scraper")
+
 # Define container image with dependencies
 image = (
     modal.Image.debian_slim(python_version="3.11")
@@ -37,8 +49,11 @@ image = (
         "pydantic-settings>=2.0.0",
         "sentry-sdk>=1.30.0",
         "tenacity>=8.2.0",
-        "httpx>=0.25.0",
+        "httpx>=0.26.0",
+        "beautifulsoup4>=4.12.0",
+        "lxml>=5.0.0",
     )
+    .add_local_file(os.path.join(SCRAPER_DIR, "profiling.py"), "/root/profiling.py")
 )
 
 # Define secrets (configured in Modal dashboard)
@@ -49,6 +64,133 @@ image = (
 # modal secret create sentry-secret SENTRY_DSN=your_dsn
 
 
+# Extraction cache shared by all workers (unchanged pages skip Firecrawl credits)
+cache_volume = modal.Volume.from_name("property-scraper-cache", create_if_missing=True)
+CACHE_MOUNT = "/cache"
+EXTRACTION_CACHE_DIR = f"{CACHE_MOUNT}/extractions"
+PROFILE_DIR = f"{CACHE_MOUNT}/profiles"
+
+# Sources scraped by the scheduled run
+SOURCES = ("green-acres", "bienesonline")
+
+# Ceiling on page workers running at once across all sources; each source is
+# further capped by its scraper's MAX_CONCURRENCY
+MAX_WORKER_CONTAINERS = 8
+
+
+def make_scraper(source: str, extractor=None, rate_limit_seconds: float = 2.0, batch: bool = False):
+    """Create the scraper for a source ('green-acres' or 'bienesonline')."""
+    from scrapers import GreenAcresScraper, BienesOnlineScraper
+
+    scrapers = {"green-acres": GreenAcresScraper, "bienesonline": BienesOnlineScraper}
+    if source not in scrapers:
+        raise ValueError(f"Unknown source: {source}")
+    return scrapers[source](extractor=extractor, rate_limit_seconds=rate_limit_seconds, batch=batch)
+
+
+def make_extractor(settings, source: str = None):
+    """Create the extractor chain for a source.
+
+    Sources with a deterministic parser get a HybridExtractor (selectors
+    first, Firecrawl only where they fail); others use Firecrawl directly.
+    Firecrawl results are cached on the Modal volume; local runs use
+    EXTRACTION_CACHE_DIR if set and run uncached otherwise. Pages the
+    worker fetches itself (selector parsing, cache fingerprints) share one
+    pacer at the source's rate limit.
+    """
+    from extractors import PARSERS, ExtractionCache, FirecrawlExtractor, HybridExtractor, Pacer
+
+    pacer = Pacer(settings.rate_limit_seconds)
+    cache = None
+    cache_dir = settings.extraction_cache_dir or (None if modal.is_local() else EXTRACTION_CACHE_DIR)
+    if cache_dir:
+        cache = ExtractionCache(
+            cache_dir,
+            ttl_seconds=settings.extraction_cache_ttl_hours * 3600,
+            max_bytes=settings.extraction_cache_max_mb * 1024 * 1024,
+            proxy_url=settings.brightdata_proxy_url,
+            pacer=pacer,
+        )
+    extractor = FirecrawlExtractor(
+        proxy_url=settings.brightdata_proxy_url, api_url=settings.firecrawl_api_url, cache=cache
+    )
+    if source in PARSERS:
+        extractor = HybridExtractor(
+            source, PARSERS[source], extractor,
+            min_completeness=settings.min_completeness, proxy_url=settings.brightdata_proxy_url, pacer=pacer,
+        )
+    return extractor
+
+
+def extraction_stats(extractor, pages: int) -> dict:
+    """Deterministic vs. AI extraction counts of a worker."""
+    stats = getattr(extractor, "stats", None)
+    if stats is None:
+        return {"ai_pages": pages, "page_fallbacks": 0, "parsed_listings": 0, "listing_fallbacks": 0}
+    return {
+        "ai_pages": stats["ai_pages"],
+        "page_fallbacks": stats["page_fallbacks"],
+        "parsed_listings": stats["listings"],
+        "listing_fallbacks": stats["listing_fallbacks"],
+    }
+
+
+def close_extractor(extractor) -> None:
+    """Close the extractor chain and evict/persist the extraction cache."""
+    if hasattr(extractor, "close"):
+        extractor.close()
+    if not extractor.cache:
+        return
+    logger.info(f"Extraction cache: {extractor.cache.hits} hits, {extractor.cache.misses} misses")
+    extractor.cache.evict()
+    extractor.cache.close()
+    if not modal.is_local():
+        cache_volume.commit()
+
+
+def start_profiler(scrape_run_id: str, name: str):
+    """Start the built-in profiler for one function call.
+
+    Profiles go to PROFILE_DIR/<run id>/<name> on the cache volume (./profiles
+    locally) and are rewritten at every memory checkpoint, so a worker that
+    times out still leaves one behind.
+    """
+    try:
+        from profiling import Profiler
+    except ImportError:  # local run: only the image has profiling.py next to main.py
+        sys.path.append(SCRAPER_DIR)
+        from profiling import Profiler
+
+    root = "profiles" if modal.is_local() else PROFILE_DIR
+    return Profiler(os.path.join(root, scrape_run_id, name)).start()
+
+
+def stop_profiler(profiler) -> None:
+    if profiler is None:
+        return
+    profiler.stop()
+    if not modal.is_local():
+        cache_volume.commit()
+
+
+def plan_jobs(sources, max_pages: int, scrape_run_id: str) -> List[Tuple[str, List[str], str]]:
+    """Split each source's page URLs into at most MAX_CONCURRENCY worker jobs.
+
+    Pages are dealt round-robin so every worker gets a similar mix, and each
+    worker fetches its share one page at a time at the per-site rate limit
+    (see make_extractor), so a source never has more than MAX_CONCURRENCY of
+    our own requests in flight; Firecrawl paces the pages it scrapes itself.
+    """
+    jobs = []
+    for source in sources:
+        scraper = make_scraper(source)
+        urls = scraper.page_urls(max_pages)
+        workers = min(scraper.MAX_CONCURRENCY, len(urls))
+        for i in range(workers):
+            jobs.append((source, urls[i::workers], scrape_run_id))
+    return jobs
+
+
 @app.function(
     image=image,
     secrets=[
@@ -57,104 +199,221 @@ image = (
         modal.Secret.from_name("sentry-secret", required=False),
         modal.Secret.from_name("brightdata-secret", required=False),
     ],
-    schedule=modal.Cron("0 3 * * 0"),  # Every Sunday at 3am UTC
-    timeout=3600,  # 1 hour timeout
-    retries=2,
+    volumes={CACHE_MOUNT: cache_volume},
+    timeout=1800,
+    retries=1,
+    max_containers=MAX_WORKER_CONTAINERS,
 )
-def scrape_all_sources():
+def scrape_pages(
+    source: str, urls: List[str], scrape_run_id: str, profile: bool = False, trace: Optional[Dict[str, str]] = None
+) -> dict:
     """
-    Main scheduled function that orchestrates scraping.
+    Worker: scrape a share of one source's pages and upsert the listings.
 
-    Runs every Sunday at 3am UTC to:
-    1. Scrape Green-Acres Venezuela
-    2. Scrape BienesOnline Venezuela
-    3. Mark stale listings as inactive
-    4. Report metrics to Sentry
+    Args:
+        source: 'green-acres' or 'bienesonline'
+        urls: Page URLs assigned to this worker
+        scrape_run_id: Id of the orchestrating run
+        profile: Profile this worker (see start_profiler)
+        trace: Sentry trace headers of the orchestrating run
     """
-    from scrapers import GreenAcresScraper, BienesOnlineScraper
-    from extractors import FirecrawlExtractor
-    from storage import SupabaseStorage
-    from utils import init_sentry, capture_scrape_metrics, get_settings
+    from utils import init_sentry, set_scrape_measurements, start_scrape_transaction
 
-    # Initialize
     init_sentry()
-    settings = get_settings()
-    scrape_run_id = str(uuid.uuid4())[:8]
+    with start_scrape_transaction(
+        f"scrape_pages {source}", "scrape.worker", scrape_run_id, source=source, headers=trace
+    ) as transaction:
+        result = _scrape_pages(source, urls, scrape_run_id, profile)
+        set_scrape_measurements({**result, "failed_pages": len(result["failed_urls"])})
+        transaction.set_status("ok" if not result["failed_urls"] else "unknown_error")
+    return result
 
-    logger.info(f"Starting scrape run: {scrape_run_id}")
-    logger.info(f"Timestamp: {datetime.utcnow().isoformat()}")
 
-    # Initialize components
-    extractor = FirecrawlExtractor(proxy_url=settings.brightdata_proxy_url)
-    storage = SupabaseStorage()
+def _scrape_pages(source: str, urls: List[str], scrape_run_id: str, profile: bool) -> dict:
+    from storage import ListingBatchWriter, SupabaseStorage
+    from utils import get_settings
 
-    results = {}
+    profiler = start_profiler(scrape_run_id, f"{source}-{uuid.uuid4().hex[:6]}") if profile else None
+    settings = get_settings()
+    extractor = make_extractor(settings, source)
+    storage = SupabaseStorage()
+    scraper = make_scraper(source, extractor, settings.rate_limit_seconds, batch=settings.firecrawl_batch)
 
-    # Scrape Green-Acres
+    # Stream listings into batched upserts as pages complete
+    failed = []
     try:
-        logger.info("Scraping Green-Acres Venezuela...")
-        green_acres = GreenAcresScraper(
-            extractor=extractor, rate_limit_seconds=settings.rate_limit_seconds
-        )
-        listings = green_acres.scrape_all(max_pages=settings.max_pages_per_source)
+        with ListingBatchWriter(storage, source, scrape_run_id, batch_size=settings.write_batch_size) as writer:
+            for result in scraper.iter_page_results(urls):
+                if result.error:
+                    failed.append(result.url)
+                else:
+                    writer.add_many(l.model_dump() for l in result.listings)
+    finally:
+        close_extractor(extractor)
+        stop_profiler(profiler)
 
-        # Convert to dicts and upsert
-        listing_dicts = [l.model_dump() for l in listings]
-        upsert_result = storage.upsert_listings(
-            listing_dicts, source=green_acres.source_name, scrape_run_id=scrape_run_id
-        )
+    return {
+        "source": source,
+        "pages": len(urls),
+        "failed_urls": failed,
+        "scraped": writer.stats["written"],
+        "upserted": writer.stats["upserted"],
+        "errors": writer.stats["errors"],
+        "cache_hits": extractor.cache.hits if extractor.cache else 0,
+        **extraction_stats(extractor, len(urls)),
+    }
 
-        # Mark stale listings
-        stale_count = storage.mark_stale_listings(
-            source=green_acres.source_name, stale_after_days=settings.stale_after_days
-        )
 
-        results["green-acres"] = {
-            "scraped": len(listings),
-            "upserted": upsert_result["upserted"],
-            "errors": upsert_result["errors"],
-            "marked_stale": stale_count,
-        }
+def fan_out(
+    jobs: List[Tuple[str, List[str], str]],
+    local: bool = False,
+    profile: bool = False,
+    trace: Optional[Dict[str, str]] = None,
+) -> List[dict]:
+    """Run worker jobs on Modal containers (or a local thread pool).
 
-        capture_scrape_metrics("green-acres", results["green-acres"])
-        logger.info(f"Green-Acres complete: {results['green-acres']}")
+    A job that raises is reported as a result with all its pages failed,
+    so one bad worker never loses the rest of the run. With profile, each
+    container writes its own profile; local threads share the process, so
+    the caller profiles the whole pool instead. Workers continue the Sentry
+    trace given by `trace`.
+    """
+    if local:
+        def run_local(job):
+            try:
+                return scrape_pages.local(*job, trace=trace)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKER_CONTAINERS) as pool:
+            outputs = list(pool.map(run_local, jobs))
+    else:
+        outputs = list(scrape_pages.starmap(
+            jobs, kwargs={"profile": profile, "trace": trace}, return_exceptions=True
+        ))
+
+    results = []
+    for (source, urls, _), output in zip(jobs, outputs):
+        if isinstance(output, BaseException):
+            logger.error(f"Worker for {source} ({len(urls)} pages) failed: {output}")
+            output = {
+                "source": source, "pages": len(urls), "failed_urls": list(urls),
+                "scraped": 0, "upserted": 0, "errors": 0, "cache_hits": 0, "ai_pages": 0,
+                "page_fallbacks": 0, "parsed_listings": 0, "listing_fallbacks": 0, "worker_error": str(output),
+            }
+        results.append(output)
+    return results
 
-    except Exception as e:
-        logger.error(f"Green-Acres scraping failed: {e}")
-        results["green-acres"] = {"error": str(e)}
 
-    # Scrape BienesOnline
-    try:
-        logger.info("Scraping BienesOnline Venezuela...")
-        bienes_online = BienesOnlineScraper(
-            extractor=extractor, rate_limit_seconds=settings.rate_limit_seconds
-        )
-        listings = bienes_online.scrape_all(max_pages=settings.max_pages_per_source)
+def summarize(results: List[dict]) -> Dict[str, dict]:
+    """Aggregate worker results into per-source totals."""
+    summary: Dict[str, dict] = {}
+    for result in results:
+        stats = summary.setdefault(result["source"], {
+            "workers": 0, "failed_workers": 0, "pages": 0, "failed_pages": 0,
+            "scraped": 0, "upserted": 0, "errors": 0, "cache_hits": 0, "ai_pages": 0,
+            "page_fallbacks": 0, "parsed_listings": 0, "listing_fallbacks": 0, "failed_urls": [],
+        })
+        stats["workers"] += 1
+        stats["failed_workers"] += 1 if "worker_error" in result else 0
+        stats["pages"] += result["pages"]
+        stats["failed_pages"] += len(result["failed_urls"])
+        stats["failed_urls"].extend(result["failed_urls"])
+        for key in ("scraped", "upserted", "errors", "cache_hits", "ai_pages",
+                    "page_fallbacks", "parsed_listings", "listing_fallbacks"):
+            stats[key] += result[key]
+
+    # Fallback rates: how often selectors failed and AI extraction was needed
+    for stats in summary.values():
+        listings = stats["parsed_listings"] + stats["listing_fallbacks"]
+        stats["ai_page_rate"] = round(stats["ai_pages"] / stats["pages"], 3) if stats["pages"] else 0.0
+        stats["listing_fallback_rate"] = round(stats["listing_fallbacks"] / listings, 3) if listings else 0.0
+    return summary
 
-        # Convert to dicts and upsert
-        listing_dicts = [l.model_dump() for l in listings]
-        upsert_result = storage.upsert_listings(
-            listing_dicts, source=bienes_online.source_name, scrape_run_id=scrape_run_id
-        )
 
-        # Mark stale listings
-        stale_count = storage.mark_stale_listings(
-            source=bienes_online.source_name, stale_after_days=settings.stale_after_days
-        )
+@app.function(
+    image=image,
+    secrets=[
+        modal.Secret.from_name("firecrawl-secret"),
+        modal.Secret.from_name("supabase-secret"),
+        modal.Secret.from_name("sentry-secret", required=False),
+        modal.Secret.from_name("brightdata-secret", required=False),
+    ],
+    volumes={CACHE_MOUNT: cache_volume},
+    schedule=modal.Cron("0 3 * * 0"),  # Every Sunday at 3am UTC
+    timeout=3600,  # 1 hour timeout
+    retries=2,
+)
+def scrape_all_sources(local: bool = False, profile: bool = False):
+    """
+    Main scheduled function that orchestrates scraping.
+
+    Runs every Sunday at 3am UTC to:
+    1. Fan page URLs of Green-Acres and BienesOnline out to scrape_pages workers
+    2. Aggregate the worker results into one run summary
+    3. Mark stale listings as inactive
+    4. Report metrics to Sentry
 
-        results["bienesonline"] = {
-            "scraped": len(listings),
-            "upserted": upsert_result["upserted"],
-            "errors": upsert_result["errors"],
-            "marked_stale": stale_count,
-        }
+    Args:
+        local: Run the workers on a local thread pool instead of containers
+        profile: Write CPU/memory profiles of the workers (or, with local,
+            of this process) to PROFILE_DIR/<run id>
+    """
+    from utils import init_sentry, start_scrape_transaction
+
+    # Initialize
+    init_sentry()
+    scrape_run_id = str(uuid.uuid4())[:8]
+    with start_scrape_transaction("scrape_all_sources", "scrape.run", scrape_run_id):
+        return _scrape_all_sources(scrape_run_id, local, profile)
 
-        capture_scrape_metrics("bienesonline", results["bienesonline"])
-        logger.info(f"BienesOnline complete: {results['bienesonline']}")
 
-    except Exception as e:
-        logger.error(f"BienesOnline scraping failed: {e}")
-        results["bienesonline"] = {"error": str(e)}
+def _scrape_all_sources(scrape_run_id: str, local: bool, profile: bool) -> dict:
+    import sentry_sdk
+    from storage import SupabaseStorage
+    from utils import capture_scrape_metrics, get_settings, trace_headers
+
+    settings = get_settings()
+    started = time.time()
+
+    logger.info(f"Starting scrape run: {scrape_run_id}")
+    logger.info(f"Timestamp: {datetime.utcnow().isoformat()}")
+
+    with sentry_sdk.start_span(op="scrape.plan", description="plan page jobs"):
+        jobs = plan_jobs(SOURCES, settings.max_pages_per_source, scrape_run_id)
+    logger.info(f"Fanning out {len(jobs)} page jobs across {'threads' if local else 'containers'}")
+    profiler = start_profiler(scrape_run_id, "local") if profile and local else None
+    try:
+        with sentry_sdk.start_span(op="scrape.fan_out", description=f"{len(jobs)} page jobs"):
+            sources = summarize(fan_out(jobs, local=local, profile=profile and not local, trace=trace_headers()))
+    finally:
+        stop_profiler(profiler)
+
+    # Stale marking only once every worker of a source is done, and never
+    # for a source where nothing could be scraped
+    storage = SupabaseStorage()
+    for source, stats in sources.items():
+        if stats["failed_pages"] < stats["pages"]:
+            with sentry_sdk.start_span(op="db.mark_stale", description=f"mark stale {source} listings"):
+                stats["marked_stale"] = storage.mark_stale_listings(
+                    source=source, stale_after_days=settings.stale_after_days
+                )
+        else:
+            logger.error(f"{source}: every page failed, skipping stale marking")
+            stats["marked_stale"] = 0
+
+        capture_scrape_metrics(source, stats)
+        logger.info(f"{source} complete: {stats}")
+
+    results = {
+        "scrape_run_id": scrape_run_id,
+        "duration_seconds": round(time.time() - started, 1),
+        "sources": sources,
+        "totals": {
+            key: sum(stats[key] for stats in sources.values())
+            for key in ("pages", "failed_pages", "scraped", "upserted", "errors", "cache_hits", "marked_stale")
+        },
+    }
 
     # Summary
     logger.info(f"Scrape run {scrape_run_id} complete")
@@ -169,6 +428,7 @@ def scrape_all_sources():
         modal.Secret.from_name("firecrawl-secret"),
         modal.Secret.from_name("supabase-secret"),
     ],
+    volumes={CACHE_MOUNT: cache_volume},
 )
 def scrape_single_source(source: str):
     """
@@ -177,44 +437,45 @@ def scrape_single_source(source: str):
     Args:
         source: 'green-acres' or 'bienesonline'
     """
-    from scrapers import GreenAcresScraper, BienesOnlineScraper
-    from extractors import FirecrawlExtractor
-    from storage import SupabaseStorage
+    from storage import ListingBatchWriter, SupabaseStorage
     from utils import get_settings
 
     settings = get_settings()
     scrape_run_id = str(uuid.uuid4())[:8]
 
-    extractor = FirecrawlExtractor(proxy_url=settings.brightdata_proxy_url)
+    extractor = make_extractor(settings, source)
     storage = SupabaseStorage()
+    scraper = make_scraper(source, extractor, batch=settings.firecrawl_batch)
 
-    if source == "green-acres":
-        scraper = GreenAcresScraper(extractor=extractor)
-    elif source == "bienesonline":
-        scraper = BienesOnlineScraper(extractor=extractor)
-    else:
-        raise ValueError(f"Unknown source: {source}")
-
-    listings = scraper.scrape_all(max_pages=5)  # Limit for testing
-
-    listing_dicts = [l.model_dump() for l in listings]
-    result = storage.upsert_listings(
-        listing_dicts, source=scraper.source_name, scrape_run_id=scrape_run_id
-    )
+    try:
+        with ListingBatchWriter(storage, scraper.source_name, scrape_run_id, settings.write_batch_size) as writer:
+            writer.add_many(l.model_dump() for l in scraper.iter_listings(max_pages=5))  # Limit for testing
+    finally:
+        close_extractor(extractor)
 
     return {
         "source": source,
-        "scraped": len(listings),
-        "upserted": result["upserted"],
-        "errors": result["errors"],
+        "scraped": writer.stats["written"],
+        "upserted": writer.stats["upserted"],
+        "errors": writer.stats["errors"],
     }
 
 
 @app.local_entrypoint()
-def main():
-    """Local entrypoint for testing."""
+def main(local: bool = False, profile: bool = False):
+    """Local entrypoint for testing.
+
+    Args:
+        local: Run the orchestrator and its workers in this process, on a
+            thread pool (modal run modal_app/main.py --local)
+        profile: Profile the workers (modal run modal_app/main.py --profile);
+            fetch with `modal volume get property-scraper-cache profiles`
+    """
     logger.info("Running local test...")
-    result = scrape_all_sources.remote()
+    if local:
+        result = scrape_all_sources.local(local=True, profile=profile)
+    else:
+        result = scrape_all_sources.remote(profile=profile)
     logger.info(f"Result: {result}")
 
 
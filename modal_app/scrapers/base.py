@@ -3,10 +3,13 @@
 import time
 import logging
 from abc import ABC, abstractmethod
-from typing import List, Generator
+from itertools import islice
+from typing import List, Generator, Iterator, Tuple
+
+import sentry_sdk
 
 from ..models.listing import PropertyListing
-from ..extractors.firecrawl_extractor import FirecrawlExtractor
+from ..extractors.firecrawl_extractor import FirecrawlExtractor, PageResult
 
 logger = logging.getLogger(__name__)
 
@@ -14,12 +17,22 @@ logger = logging.getLogger(__name__)
 class BaseScraper(ABC):
     """Abstract base class for property scrapers."""
 
+    # Maximum number of containers scraping this source at once (politeness cap)
+    MAX_CONCURRENCY = 4
+
     def __init__(
-        self, extractor: FirecrawlExtractor, rate_limit_seconds: float = 2.0
+        self, extractor: FirecrawlExtractor, rate_limit_seconds: float = 2.0, batch: bool = False
     ):
-        """Initialize the scraper."""
+        """Initialize the scraper.
+
+        Args:
+            extractor: Firecrawl extractor
+            rate_limit_seconds: Delay between pages when scraping one by one
+            batch: Submit all pages as Firecrawl batch jobs instead of one by one
+        """
         self.extractor = extractor
         self.rate_limit_seconds = rate_limit_seconds
+        self.batch = batch
 
     @property
     @abstractmethod
@@ -38,34 +51,68 @@ class BaseScraper(ABC):
         """Generate URLs for all pages to scrape."""
         pass
 
-    def scrape_all(self, max_pages: int = 20) -> List[PropertyListing]:
-        """Scrape all pages and return validated listings."""
+    def page_urls(self, max_pages: int = 20) -> List[str]:
+        """Return the first `max_pages` page URLs (the unit of fan-out work)."""
+        return list(islice(self.get_page_urls(), max_pages))
+
+    def iter_page_results(self, urls: List[str]) -> Iterator[PageResult]:
+        """Scrape the given pages, yielding each page's result as soon as it is done.
+
+        Pages are scraped serially with the rate limit, or submitted as a
+        Firecrawl batch. Failed pages are yielded with an error.
+        """
+        if self.batch:
+            # Firecrawl paces the batch itself, no local rate limiting needed
+            for result in self.extractor.extract_batch(urls):
+                if result.error:
+                    logger.error(f"Failed to scrape {result.url}: {result.error}")
+                yield result
+            return
+
+        for i, url in enumerate(urls, 1):
+            # The span closes before the yield so it doesn't time the caller's writes
+            with sentry_sdk.start_span(op="scrape.page", description=url) as span:
+                try:
+                    listings = self.extractor.extract_listings(url)
+                    span.set_data("listings", len(listings))
+                    logger.info(f"Page {i}/{len(urls)}: Got {len(listings)} listings from {url}")
+                    result = PageResult(url, listings=listings)
+                except Exception as e:
+                    span.set_status("internal_error")
+                    logger.error(f"Failed to scrape {url}: {e}")
+                    result = PageResult(url, error=str(e))
+            yield result
+
+            # Rate limiting
+            if i < len(urls):
+                time.sleep(self.rate_limit_seconds)
+
+    def iter_listings(self, max_pages: int = 20) -> Iterator[PropertyListing]:
+        """Stream validated listings page by page (nothing is accumulated)."""
+        for result in self.iter_page_results(self.page_urls(max_pages)):
+            yield from result.listings
+
+    def scrape_urls(self, urls: List[str]) -> Tuple[List[PropertyListing], List[str]]:
+        """Scrape the given pages and collect the results.
+
+        Returns:
+            (validated listings, URLs that failed)
+        """
         all_listings: List[PropertyListing] = []
-        pages_scraped = 0
-
-        for url in self.get_page_urls():
-            if pages_scraped >= max_pages:
-                logger.info(f"Reached max pages limit ({max_pages})")
-                break
+        failed: List[str] = []
+        for result in self.iter_page_results(urls):
+            if result.error:
+                failed.append(result.url)
+            else:
+                all_listings.extend(result.listings)
+        return all_listings, failed
 
-            try:
-                listings = self.extractor.extract_listings(url)
-                all_listings.extend(listings)
-                pages_scraped += 1
-
-                logger.info(
-                    f"Page {pages_scraped}: Got {len(listings)} listings from {url}"
-                )
-
-                # Rate limiting
-                if pages_scraped < max_pages:
-                    time.sleep(self.rate_limit_seconds)
-
-            except Exception as e:
-                logger.error(f"Failed to scrape {url}: {e}")
-                continue
+    def scrape_all(self, max_pages: int = 20) -> List[PropertyListing]:
+        """Scrape all pages and return validated listings (see iter_listings to stream)."""
+        urls = self.page_urls(max_pages)
+        all_listings, failed = self.scrape_urls(urls)
 
         logger.info(
-            f"Scraping complete: {len(all_listings)} total listings from {pages_scraped} pages"
+            f"Scraping complete: {len(all_listings)} total listings from {len(urls) - len(failed)} pages"
         )
         return all_listings
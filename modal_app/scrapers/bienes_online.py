@@ -21,6 +21,7 @@ class BienesOnlineScraper(BaseScraper):
 
     # Configuration
     MAX_PAGES = 20  # Safety limit
+    MAX_CONCURRENCY = 4
 
     def get_page_urls(self) -> Generator[str, None, None]:
         """
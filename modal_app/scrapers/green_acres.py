@@ -22,6 +22,7 @@ class GreenAcresScraper(BaseScraper):
     # Pagination configuration
     LISTINGS_PER_PAGE = 24
     MAX_PAGES = 20  # Safety limit
+    MAX_CONCURRENCY = 3
 
     def get_page_urls(self) -> Generator[str, None, None]:
         """Generate paginated URLs for Green-Acres listings."""
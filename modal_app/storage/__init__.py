@@ -1,3 +1,3 @@
-from .supabase_client import SupabaseStorage
+from .supabase_client import ListingBatchWriter, SupabaseStorage
 
-__all__ = ["SupabaseStorage"]
+__all__ = ["ListingBatchWriter", "SupabaseStorage"]
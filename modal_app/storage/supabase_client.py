@@ -4,7 +4,9 @@ import os
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
+import sentry_sdk
 from supabase import create_client, Client
+from postgrest.types import CountMethod, ReturnMethod
 
 logger = logging.getLogger(__name__)
 
@@ -32,50 +34,59 @@ class SupabaseStorage:
 
         - If source_url exists: UPDATE with new data + last_seen_at
         - If source_url new: INSERT new record
+
+        One bulk request per call; falls back to row by row so one bad
+        row doesn't fail the batch.
         """
         if not listings:
             return {"upserted": 0, "errors": 0}
 
         now = datetime.utcnow().isoformat()
+        rows = [self._listing_row(listing, source, now) for listing in listings]
         upserted = 0
         errors = 0
 
-        for listing in listings:
-            try:
-                # Prepare listing data
-                data = {
-                    "source": source,
-                    "source_url": listing.get("source_url"),
-                    "title": listing.get("title"),
-                    "price": listing.get("price"),
-                    "currency": listing.get("currency", "USD"),
-                    "location": listing.get("location"),
-                    "region": self._extract_region(listing.get("location", "")),
-                    "bedrooms": listing.get("bedrooms"),
-                    "bathrooms": listing.get("bathrooms"),
-                    "area_sqm": listing.get("area_sqm"),
-                    "thumbnail_url": listing.get("thumbnail_url"),
-                    "description_short": listing.get("description", "")[:200] if listing.get("description") else None,
-                    "property_type": listing.get("property_type"),
-                    "scraped_at": now,
-                    "last_seen_at": now,
-                    "active": True,
-                }
-
-                # Upsert with conflict on source_url
-                self.client.table(self.TABLE_NAME).upsert(
-                    data, on_conflict="source_url"
-                ).execute()
-
-                upserted += 1
-
-            except Exception as e:
-                logger.error(f"Failed to upsert listing: {e}")
-                errors += 1
+        try:
+            self.client.table(self.TABLE_NAME).upsert(
+                rows, on_conflict="source_url", returning=ReturnMethod.minimal
+            ).execute()
+            upserted = len(rows)
+        except Exception as e:
+            logger.warning(f"Bulk upsert failed, retrying row by row: {e}")
+            for row in rows:
+                try:
+                    self.client.table(self.TABLE_NAME).upsert(
+                        row, on_conflict="source_url", returning=ReturnMethod.minimal
+                    ).execute()
+                    upserted += 1
+                except Exception as e:
+                    logger.error(f"Failed to upsert listing: {e}")
+                    errors += 1
 
         logger.info(f"Upserted {upserted} listings, {errors} errors")
         return {"upserted": upserted, "errors": errors}
 
+    def _listing_row(self, listing: Dict[str, Any], source: str, now: str) -> Dict[str, Any]:
+        """Prepare a listings row from a listing dict."""
+        return {
+            "source": source,
+            "source_url": listing.get("source_url"),
+            "title": listing.get("title"),
+            "price": listing.get("price"),
+            "currency": listing.get("currency", "USD"),
+            "location": listing.get("location"),
+            "region": self._extract_region(listing.get("location", "")),
+            "bedrooms": listing.get("bedrooms"),
+            "bathrooms": listing.get("bathrooms"),
+            "area_sqm": listing.get("area_sqm"),
+            "thumbnail_url": listing.get("thumbnail_url"),
+            "description_short": listing.get("description", "")[:200] if listing.get("description") else None,
+            "property_type": listing.get("property_type"),
+            "scraped_at": now,
+            "last_seen_at": now,
+            "active": True,
+        }
+
     def mark_stale_listings(self, source: str, stale_after_days: int = 14) -> int:
         """
         Mark listings as inactive if not seen in consecutive scrapes.
@@ -86,16 +97,17 @@ class SupabaseStorage:
         cutoff_date = datetime.utcnow() - timedelta(days=stale_after_days)
 
         try:
+            # Only the count comes back, not the updated rows
             result = (
                 self.client.table(self.TABLE_NAME)
-                .update({"active": False})
+                .update({"active": False}, count=CountMethod.exact, returning=ReturnMethod.minimal)
                 .eq("source", source)
                 .eq("active", True)
                 .lt("last_seen_at", cutoff_date.isoformat())
                 .execute()
             )
 
-            count = len(result.data) if result.data else 0
+            count = result.count or 0
             logger.info(f"Marked {count} stale listings as inactive for source: {source}")
             return count
 
@@ -172,3 +184,49 @@ class SupabaseStorage:
                 return region
 
         return ""
+
+
+class ListingBatchWriter:
+    """Write listings to Supabase in fixed-size batches as they are scraped.
+
+    Memory stays bounded by the batch size and the first rows reach the
+    database after the first batch instead of at the end of the run.
+    """
+
+    def __init__(self, storage: SupabaseStorage, source: str, scrape_run_id: str, batch_size: int = 50):
+        self.storage = storage
+        self.source = source
+        self.scrape_run_id = scrape_run_id
+        self.batch_size = batch_size
+        self.stats = {"written": 0, "upserted": 0, "errors": 0, "flushes": 0}
+        self._buffer: List[Dict[str, Any]] = []
+
+    def __enter__(self) -> "ListingBatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.flush()
+
+    def add(self, listing: Dict[str, Any]) -> None:
+        self._buffer.append(listing)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, listings) -> None:
+        for listing in listings:
+            self.add(listing)
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        with sentry_sdk.start_span(op="db.upsert", description=f"upsert {len(batch)} {self.source} listings") as span:
+            result = self.storage.upsert_listings(batch, source=self.source, scrape_run_id=self.scrape_run_id)
+            span.set_data("rows", len(batch))
+            span.set_data("errors", result["errors"])
+            if result["errors"]:
+                span.set_status("internal_error")
+        self.stats["written"] += len(batch)
+        self.stats["upserted"] += result["upserted"]
+        self.stats["errors"] += result["errors"]
+        self.stats["flushes"] += 1
@@ -1,4 +1,12 @@
-from .config import Settings
-from .monitoring import init_sentry, capture_scrape_metrics
+from .config import Settings, get_settings
+from .monitoring import init_sentry, capture_scrape_metrics, set_scrape_measurements, start_scrape_transaction, trace_headers
 
-__all__ = ["Settings", "init_sentry", "capture_scrape_metrics"]
+__all__ = [
+    "Settings",
+    "get_settings",
+    "init_sentry",
+    "capture_scrape_metrics",
+    "set_scrape_measurements",
+    "start_scrape_transaction",
+    "trace_headers",
+]
@@ -10,6 +10,16 @@ class Settings(BaseSettings):
 
     # Firecrawl
     firecrawl_api_key: str = ""
+    firecrawl_api_url: Optional[str] = None  # e.g. a local fake server for tests
+    firecrawl_batch: bool = True  # batch scrape jobs instead of one request per page
+
+    # Hybrid extraction: listings scoring below this fall back to AI extraction
+    min_completeness: float = 0.8
+
+    # Extraction cache (unchanged pages skip AI extraction)
+    extraction_cache_dir: Optional[str] = None  # None disables the cache
+    extraction_cache_ttl_hours: float = 504.0  # 3 weekly runs (must exceed the schedule interval)
+    extraction_cache_max_mb: int = 200
 
     # Bright Data proxy
     brightdata_proxy_url: Optional[str] = None
@@ -25,6 +35,7 @@ class Settings(BaseSettings):
     rate_limit_seconds: float = 2.0
     max_pages_per_source: int = 20
     request_timeout_seconds: int = 30
+    write_batch_size: int = 50  # listings per bulk upsert while streaming
 
     # Stale detection
     stale_after_days: int = 14  # 2 weekly scrapes
@@ -38,6 +49,12 @@ def get_settings() -> Settings:
     """Get settings from environment."""
     return Settings(
         firecrawl_api_key=os.environ.get("FIRECRAWL_API_KEY", ""),
+        firecrawl_api_url=os.environ.get("FIRECRAWL_API_URL"),
+        firecrawl_batch=os.environ.get("FIRECRAWL_BATCH", "true").lower() != "false",
+        min_completeness=float(os.environ.get("MIN_COMPLETENESS", 0.8)),
+        extraction_cache_dir=os.environ.get("EXTRACTION_CACHE_DIR"),
+        extraction_cache_ttl_hours=float(os.environ.get("EXTRACTION_CACHE_TTL_HOURS", 504)),
+        extraction_cache_max_mb=int(os.environ.get("EXTRACTION_CACHE_MAX_MB", 200)),
         brightdata_proxy_url=os.environ.get("BRIGHTDATA_PROXY_URL"),
         supabase_url=os.environ.get("SUPABASE_URL", ""),
         supabase_key=os.environ.get("SUPABASE_KEY", ""),
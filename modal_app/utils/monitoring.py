@@ -4,10 +4,28 @@ import os
 import sentry_sdk
 from sentry_sdk.integrations.logging import LoggingIntegration
 import logging
+from typing import Dict, Optional
+
+# Scrape transactions (one per run and per worker, weekly) are always traced;
+# everything else is sampled at the default rate
+SCRAPE_TRANSACTION_OPS = ("scrape.run", "scrape.worker")
+DEFAULT_TRACES_SAMPLE_RATE = 0.1
+
+# Stats reported as transaction measurements
+MEASURED_STATS = (
+    "pages", "failed_pages", "scraped", "upserted", "errors", "cache_hits",
+    "ai_pages", "page_fallbacks", "listing_fallbacks", "marked_stale",
+)
+
+_initialized = False
 
 
 def init_sentry() -> None:
     """Initialize Sentry SDK with Modal-appropriate configuration."""
+    global _initialized
+    if _initialized:  # warm containers run several calls
+        return
+
     dsn = os.environ.get("SENTRY_DSN")
     if not dsn:
         logging.warning("SENTRY_DSN not configured, skipping Sentry initialization")
@@ -16,12 +34,23 @@ def init_sentry() -> None:
     sentry_sdk.init(
         dsn=dsn,
         environment=os.environ.get("MODAL_ENVIRONMENT", "production"),
-        traces_sample_rate=0.1,  # 10% of transactions for performance
+        traces_sampler=_traces_sampler,
         integrations=[
             LoggingIntegration(level=logging.INFO, event_level=logging.ERROR),
         ],
         before_send=_add_scraper_context,
     )
+    _initialized = True
+
+
+def _traces_sampler(sampling_context: dict) -> float:
+    """Keep whole scrape runs: workers follow the run's decision."""
+    if sampling_context.get("parent_sampled") is not None:
+        return float(sampling_context["parent_sampled"])
+    op = (sampling_context.get("transaction_context") or {}).get("op")
+    if op in SCRAPE_TRANSACTION_OPS:
+        return 1.0
+    return float(os.environ.get("SENTRY_TRACES_SAMPLE_RATE", DEFAULT_TRACES_SAMPLE_RATE))
 
 
 def _add_scraper_context(event: dict, hint: dict) -> dict:
@@ -31,8 +60,51 @@ def _add_scraper_context(event: dict, hint: dict) -> dict:
     return event
 
 
+def trace_headers() -> Dict[str, str]:
+    """Headers that continue the current trace in another container."""
+    headers = {"sentry-trace": sentry_sdk.get_traceparent(), "baggage": sentry_sdk.get_baggage()}
+    return {key: value for key, value in headers.items() if value}
+
+
+def start_scrape_transaction(
+    name: str, op: str, scrape_run_id: str, source: Optional[str] = None, headers: Optional[Dict[str, str]] = None
+):
+    """Start a transaction for a scrape run or worker, tagged with run id and source.
+
+    Use as a context manager. `headers` (from trace_headers) make a worker's
+    transaction part of its orchestrating run's trace. Errors captured while
+    it is open carry the same tags.
+
+    Args:
+        name: Transaction name, e.g. "scrape_pages green-acres"
+        op: "scrape.run" or "scrape.worker"
+        scrape_run_id: Id of the orchestrating run
+        source: Source scraped, if the transaction covers one
+        headers: Trace headers of the parent run
+    """
+    transaction = sentry_sdk.continue_trace(headers or {}, op=op, name=name)
+    tags = {"scrape_run_id": scrape_run_id, **({"source": source} if source else {})}
+    for key, value in tags.items():
+        transaction.set_tag(key, value)
+        sentry_sdk.set_tag(key, value)
+    return sentry_sdk.start_transaction(transaction)
+
+
+def set_scrape_measurements(stats: dict, prefix: str = "") -> None:
+    """Record scrape stats as measurements of the current transaction."""
+    for key in MEASURED_STATS:
+        if isinstance(stats.get(key), (int, float)):
+            sentry_sdk.set_measurement(f"{prefix}{key}", stats[key])
+
+
 def capture_scrape_metrics(source: str, stats: dict) -> None:
-    """Send custom metrics to Sentry."""
+    """Send custom metrics to Sentry.
+
+    The stats are attached as context to a message event and recorded as
+    measurements of the run's transaction (prefixed with the source).
+    """
+    set_scrape_measurements(stats, prefix=f"{source}.")
+
     with sentry_sdk.push_scope() as scope:
         scope.set_tag("source", source)
         scope.set_context("scrape_stats", stats)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+End-to-end crawl throughput benchmark against the local mock site.
+
+Runs `run.py` in a subprocess against scraper/mock_site.py with the fake
+storage and translator (fakes.py), so nothing touches rentahouse.com.ve,
+Supabase or Gemini. Reports per run and as medians:
+
+- listings/min: listings written per minute of wall time
+- cpu: user + system CPU of run.py and its children (Playwright driver,
+  Chromium), and the share of one core that represents
+- rss: peak memory of the process tree (sum of PSS, sampled) and of the
+  Python process alone
+- stages: p50/p95 of the stage spans from run.py --metrics
+
+Usage:
+    python scraper/bench_crawl.py --pages 10 --runs 3
+    python scraper/bench_crawl.py --pages 10 --latency 0.5 --error-rate 0.05 --warm
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from mock_site import add_site_arguments, site_from_args
+from profiling import descendants, process_memory
+
+SCRAPER_DIR = os.path.dirname(os.path.abspath(__file__))
+RUN_PY = os.path.join(SCRAPER_DIR, "run.py")
+
+
+class MemorySampler:
+    """Samples the memory of a process tree in a background thread."""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.peak_tree = 0
+        self.peak_main = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+
+    def __enter__(self) -> "MemorySampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            main = process_memory(self.pid)
+            tree = main + sum(process_memory(pid) for pid in descendants(self.pid))
+            self.peak_main = max(self.peak_main, main)
+            self.peak_tree = max(self.peak_tree, tree)
+
+
+def _written(metrics: dict, results=("upserted", "touched")) -> int:
+    return int(sum(
+        entry["value"] for entry in metrics.get("counters", {}).get("listings_written", [])
+        if entry["labels"].get("result") in results
+    ))
+
+
+def _stages(metrics: dict) -> Dict[str, dict]:
+    return {
+        entry["labels"]["stage"]: {"count": entry["count"], "p50_s": entry["p50"], "p95_s": entry["p95"]}
+        for entry in metrics.get("histograms", {}).get("stage_seconds", [])
+    }
+
+
+def run_crawl(
+    base_url: str, max_pages: int, staging_db: str, workdir: str, translator: str, env: dict, extra: List[str]
+) -> dict:
+    """One end-to-end run.py crawl; returns throughput and resource usage."""
+    metrics_path = os.path.join(workdir, "metrics.json")
+    log_path = os.path.join(workdir, "run.log")
+    command = [
+        sys.executable, RUN_PY,
+        "--base-url", base_url,
+        "--storage", "fake",
+        "--staging-db", staging_db,
+        "--translator", translator,
+        "--rate-limit", "0",
+        "--max-pages", str(max_pages),
+        "--reconcile", "none",
+        "--metrics", metrics_path,
+        *extra,
+    ]
+
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    with open(log_path, "w") as log:
+        process = subprocess.Popen(command, cwd=SCRAPER_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        with MemorySampler(process.pid) as memory:
+            returncode = process.wait()
+    wall = time.perf_counter() - start
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    if returncode != 0:
+        with open(log_path) as f:
+            tail = "".join(f.readlines()[-20:])
+        raise RuntimeError(f"run.py exited with {returncode}:\n{tail}")
+
+    with open(metrics_path) as f:
+        metrics = json.load(f)
+    listings = _written(metrics)
+    cpu = (usage.ru_utime - usage_before.ru_utime) + (usage.ru_stime - usage_before.ru_stime)
+    return {
+        "listings": listings,
+        "upserted": _written(metrics, ("upserted",)),
+        "touched": _written(metrics, ("touched",)),  # unchanged: only last_seen_at bumped
+        "wall_s": round(wall, 2),
+        "listings_per_min": round(listings / wall * 60, 1) if wall else 0.0,
+        "cpu_s": round(cpu, 2),
+        "cpu_pct": round(cpu / wall * 100, 1) if wall else 0.0,
+        "peak_tree_mb": round(memory.peak_tree / 2 ** 20, 1),
+        "peak_python_mb": round(memory.peak_main / 2 ** 20, 1),
+        "stages": _stages(metrics),
+    }
+
+
+def summarize(runs: List[dict]) -> dict:
+    keys = ("listings", "wall_s", "listings_per_min", "cpu_s", "cpu_pct", "peak_tree_mb", "peak_python_mb")
+    return {key: statistics.median(run[key] for run in runs) for key in keys}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark crawl throughput against the local mock site")
+    add_site_arguments(parser)
+    parser.add_argument("--runs", type=int, default=3, help="Measured runs (default: 3)")
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="Crawl once before measuring and keep the store, so measured runs see unchanged listings "
+             "(the common case of the weekly crawl)"
+    )
+    parser.add_argument("--storage-latency", type=float, default=0.08, help="Fake storage round trip in seconds")
+    parser.add_argument("--translator-latency", type=float, default=0.8, help="Fake translation time in seconds")
+    parser.add_argument("--translator-error-rate", type=float, default=0.0, help="Share of failing translations")
+    parser.add_argument("--no-translator", action="store_true", help="Run without translation")
+    parser.add_argument("--output", default=None, help="Also write the results JSON here")
+    parser.add_argument("run_args", nargs=argparse.REMAINDER, help="Extra run.py arguments after --")
+    args = parser.parse_args()
+
+    extra = [arg for arg in args.run_args if arg != "--"]
+    env = {
+        **os.environ,
+        "FAKE_STORAGE_LATENCY": str(args.storage_latency),
+        "FAKE_TRANSLATOR_LATENCY": str(args.translator_latency),
+        "FAKE_TRANSLATOR_ERROR_RATE": str(args.translator_error_rate),
+    }
+    translator = "none" if args.no_translator else "fake"
+
+    site = site_from_args(args)
+    base_url = site.start()
+    runs = []
+    warmup: Optional[dict] = None
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            shared_db = os.path.join(tmp, "warm.db")
+            if args.warm:
+                warmup = run_crawl(base_url, args.pages + 1, shared_db, tmp, translator, env, extra)
+                print(f"warm-up: {json.dumps(warmup)}", file=sys.stderr)
+            for i in range(args.runs):
+                staging_db = shared_db if args.warm else os.path.join(tmp, f"run-{i}.db")
+                result = run_crawl(base_url, args.pages + 1, staging_db, tmp, translator, env, extra)
+                print(f"run {i + 1}/{args.runs}: {json.dumps(result)}", file=sys.stderr)
+                runs.append(result)
+    finally:
+        site.stop()
+
+    results = {
+        "site": {
+            "pages": site.pages,
+            "listings": site.listings,
+            "latency_s": site.latency,
+            "error_rate": site.error_rate,
+            "served": site.requests,
+        },
+        "warm": args.warm,
+        "median": summarize(runs),
+        "runs": runs,
+    }
+    if warmup:
+        results["warmup"] = warmup
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the scraper entry points.
+
+Each measurement runs in a fresh interpreter (cold module cache), so the
+numbers match what a GitHub Actions job or Modal container pays per start:
+
+- import: `import run` (what every entry point pays before doing anything)
+- help: `python run.py --help` wall time (no browser, no storage)
+- ready: `python run.py --startup-only` until browser and storage are ready
+
+Usage:
+    python scraper/bench_startup.py --runs 5
+    python scraper/bench_startup.py --runs 5 --storage supabase
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRAPER_DIR = os.path.dirname(os.path.abspath(__file__))
+RUN_PY = os.path.join(SCRAPER_DIR, "run.py")
+
+
+def time_command(command: list) -> float:
+    """Wall time of a command in seconds (raises if it fails)."""
+    start = time.perf_counter()
+    subprocess.run(command, check=True, cwd=SCRAPER_DIR, capture_output=True)
+    return time.perf_counter() - start
+
+
+def time_import(module: str) -> float:
+    """Import time of a module in a fresh interpreter (excluding interpreter start)."""
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - start)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, cwd=SCRAPER_DIR, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def time_ready(storage: str, staging_db: str) -> dict:
+    """Startup timings reported by run.py --startup-only."""
+    command = [sys.executable, RUN_PY, "--startup-only", "--storage", storage, "--staging-db", staging_db]
+    start = time.perf_counter()
+    output = subprocess.run(command, check=True, cwd=SCRAPER_DIR, capture_output=True, text=True).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["wall_s"] = time.perf_counter() - start
+    return timings
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "median_s": round(statistics.median(samples), 3),
+        "min_s": round(min(samples), 3),
+        "max_s": round(max(samples), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scraper startup time")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per measurement")
+    parser.add_argument(
+        "--storage",
+        choices=["sqlite", "supabase"],
+        default="sqlite",
+        help="Storage backend for the ready measurement (sqlite needs no credentials)"
+    )
+    parser.add_argument("--skip-ready", action="store_true", help="Skip the browser launch measurement")
+    args = parser.parse_args()
+
+    results = {
+        "import_run": summarize([time_import("run") for _ in range(args.runs)]),
+        "help": summarize([time_command([sys.executable, RUN_PY, "--help"]) for _ in range(args.runs)]),
+    }
+
+    if not args.skip_ready:
+        with tempfile.TemporaryDirectory() as tmp:
+            staging_db = os.path.join(tmp, "staging.db")
+            ready = [time_ready(args.storage, staging_db) for _ in range(args.runs)]
+        results["ready"] = summarize([r["ready_s"] for r in ready])
+        results["ready_wall"] = summarize([r["wall_s"] for r in ready])
+        results["browser"] = summarize([r["browser_s"] for r in ready])
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Health watchdog for the long-lived Chromium of a scrape job.
+
+One sync Chromium serves a job for hours. Renderer leaks and hangs show up
+as growing browser memory, tabs that are never closed and a rising share
+of navigation timeouts; once that starts, every later listing fails. The
+watchdog tracks those signals (and crashes) per page load and tells the
+extractor when to relaunch the browser. URLs whose loads failed while the
+browser degraded are handed back to be replayed on the fresh one.
+
+    watchdog = BrowserWatchdog(max_rss_mb=1536)
+    reason = watchdog.check(open_pages)  # before a load: "crash", "timeouts", ...
+    watchdog.record(url, error)          # after it (error=None on success)
+    replay = watchdog.reset()            # after relaunching the browser
+"""
+
+import logging
+from collections import deque
+from typing import List, Optional
+
+from profiling import children_memory
+
+logger = logging.getLogger(__name__)
+
+# Playwright error messages of a dead browser, context or page
+CRASH_MESSAGES = ("target closed", "has been closed", "crashed", "browser closed", "connection closed")
+
+
+def classify_error(error: Optional[BaseException]) -> Optional[str]:
+    """"timeout", "crash" or None (an error the browser is not to blame for)."""
+    if error is None:
+        return None
+    if type(error).__name__ == "TimeoutError":  # playwright's TimeoutError, imported lazily elsewhere
+        return "timeout"
+    message = str(error).lower()
+    if any(text in message for text in CRASH_MESSAGES):
+        return "crash"
+    return None
+
+
+class BrowserWatchdog:
+    """Decides when a long-running browser should be relaunched."""
+
+    def __init__(
+        self,
+        max_rss_mb: float = 1536,
+        max_open_pages: int = 8,
+        max_timeout_rate: float = 0.3,
+        window: int = 20,
+        min_loads: int = 5,
+        max_loads: int = 0,
+        rss_check_every: int = 25,
+    ):
+        """Initialize the watchdog.
+
+        Args:
+            max_rss_mb: Restart when Chromium's processes use more memory (0 disables)
+            max_open_pages: Restart when more tabs than this are open (leaked pages)
+            max_timeout_rate: Restart when this share of recent loads timed out
+            window: Recent loads the timeout rate is computed over
+            min_loads: Loads needed in the window before the rate counts
+            max_loads: Restart proactively after this many loads (0 disables)
+            rss_check_every: Loads between memory checks (reading /proc costs a few ms)
+        """
+        self.max_rss_mb = max_rss_mb
+        self.max_open_pages = max_open_pages
+        self.max_timeout_rate = max_timeout_rate
+        self.min_loads = min_loads
+        self.max_loads = max_loads
+        self.rss_check_every = rss_check_every
+        self.loads = 0  # since the last (re)start
+        self.crashed = False
+        self.restarts = 0
+        self.browser_mb = 0.0  # at the last memory check
+        self._recent = deque(maxlen=window)  # True for loads that timed out or crashed
+        self._replay: List[str] = []
+
+    def record(self, url: str, error: Optional[BaseException] = None, replay: bool = False) -> None:
+        """Record the outcome of a page load.
+
+        Args:
+            url: Page URL
+            error: Exception of a failed load (None on success)
+            replay: Hand the URL back from reset() if the browser was to blame
+        """
+        self.loads += 1
+        kind = classify_error(error)
+        self._recent.append(kind is not None)
+        if kind == "crash":
+            self.crashed = True
+        if kind and replay and url not in self._replay:
+            self._replay.append(url)
+
+    @property
+    def timeout_rate(self) -> float:
+        return sum(self._recent) / len(self._recent) if self._recent else 0.0
+
+    def check(self, open_pages: int = 0) -> Optional[str]:
+        """Reason to restart the browser before the next load, or None if it is healthy."""
+        if self.crashed:
+            return "crash"
+        if len(self._recent) >= self.min_loads and self.timeout_rate >= self.max_timeout_rate:
+            return "timeouts"
+        if open_pages > self.max_open_pages:
+            return "open_pages"
+        if self.max_loads and self.loads >= self.max_loads:
+            return "max_loads"
+        if self.max_rss_mb and self.loads and self.loads % self.rss_check_every == 0:
+            self.browser_mb = children_memory()["browser"] / 2 ** 20
+            if self.browser_mb > self.max_rss_mb:
+                return "memory"
+        return None
+
+    def reset(self) -> List[str]:
+        """Start over after a relaunch; returns the URLs to replay."""
+        replay, self._replay = self._replay, []
+        self.loads = 0
+        self.crashed = False
+        self.restarts += 1
+        self._recent.clear()
+        return replay
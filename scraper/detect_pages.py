@@ -1,142 +1,246 @@
 #!/usr/bin/env python3
 """
 Quick page detection for dynamic distributed scraping.
-Checks the pagination to find the total number of pages available.
+
+Finds the last search results page with plain HTTP requests (no browser):
+
+1. Start from a hint: the site's own result count divided by the listings
+   per page, else the total found by the previous run (cached on disk).
+2. Probe pages around the hint concurrently, galloping outwards until the
+   last page with listings is bracketed.
+3. Narrow the bracket with concurrent k-ary search.
+
+When the hint is right this costs two rounds of requests (a few seconds).
+
+Usage:
+    python scraper/detect_pages.py --jobs 18
 """
 
-import sys
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
-import re
+import argparse
+import json
 import logging
+import math
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
 
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=logging.INFO, stream=sys.stderr)
 logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# URL for Rent-A-House for-sale residential listings
+DEFAULT_URL = "https://rentahouse.com.ve/buscar-propiedades?tipo_negocio=venta&tipo_inmueble=Apartamento,Casa,Townhouse"
+
+DEFAULT_CACHE = os.getenv("PAGE_COUNT_CACHE", ".cache/page-count.json")
+DEFAULT_PAGES = 1284  # last resort when nothing can be probed
+MAX_PAGES = 10000
+
+# Same listing pattern as the scraper: ..._rah-26-11502.html
+LISTING_LINK = re.compile(r'href="([^"]*_rah-\d+[^"]*\.html)"')
+PAGE_PARAM = re.compile(r'[?&]page=(\d+)')
+# "15.405 propiedades", "15,405 resultados", "15405 inmuebles encontrados"
+RESULT_COUNT = re.compile(r'(\d{1,3}(?:[.,]\d{3})+|\d+)\s*(?:propiedades|inmuebles|resultados)', re.I)
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+    ),
+    "Accept-Language": "es-VE,es;q=0.9",
+}
+
+
+def page_url(url: str, page: int) -> str:
+    """Search URL for a results page."""
+    return f"{url}{'&' if '?' in url else '?'}page={page}"
+
+
+def count_listings(html: str) -> int:
+    """Number of unique listing links on a results page."""
+    return len(set(LISTING_LINK.findall(html)))
+
+
+def parse_result_count(html: str) -> Optional[int]:
+    """Total result count the site reports, if it shows one."""
+    counts = [int(re.sub(r'[.,]', '', match)) for match in RESULT_COUNT.findall(html)]
+    return max(counts) if counts else None
+
+
+class PageProber:
+    """Checks results pages for listings with concurrent HTTP requests."""
+
+    def __init__(self, url: str, workers: int = 8, timeout: float = 20.0):
+        """Initialize the prober.
+
+        Args:
+            url: Base search URL
+            workers: Concurrent requests per round
+            timeout: Request timeout (seconds)
+        """
+        self.url = url
+        self.workers = workers
+        self.client = httpx.Client(headers=HEADERS, timeout=timeout, follow_redirects=True)
+        self.requests = 0
+        self._results: Dict[int, bool] = {}
+
+    def fetch(self, page: int) -> httpx.Response:
+        self.requests += 1
+        response = self.client.get(page_url(self.url, page))
+        response.raise_for_status()
+        return response
+
+    def has_listings(self, page: int) -> bool:
+        """True if the page exists and shows listings.
+
+        Sites that redirect out-of-range pages to the last (or first) page
+        count as having no listings on the requested page.
+        """
+        if page in self._results:
+            return self._results[page]
+        try:
+            response = self.fetch(page)
+            match = PAGE_PARAM.search(str(response.url))
+            redirected = page > 1 and (not match or int(match.group(1)) != page)
+            result = not redirected and count_listings(response.text) > 0
+        except httpx.HTTPStatusError as e:
+            # 404 / 410 past the last page; server errors abort detection
+            if e.response.status_code >= 500:
+                raise
+            result = False
+        self._results[page] = result
+        return result
+
+    def probe(self, pages: List[int]) -> Dict[int, bool]:
+        """Probe pages concurrently."""
+        pages = sorted(set(pages))
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return dict(zip(pages, pool.map(self.has_listings, pages)))
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def find_last_page(
+    has_listings: Callable[[List[int]], Dict[int, bool]],
+    hint: int,
+    width: int = 8,
+    max_pages: int = MAX_PAGES,
+) -> int:
+    """Last page with listings, assuming listings fill pages 1..N and page 1 has some.
 
+    Args:
+        has_listings: Probes a set of pages concurrently
+        hint: Expected last page
+        width: Pages probed per round
+        max_pages: Upper bound of the search
 
-def detect_total_pages(url: str) -> int:
-    """Detect the total number of pages by checking pagination.
+    Returns:
+        Last page with listings
+    """
+    hint = min(max(hint, 1), max_pages)
+    lo, hi = 1, max_pages + 1  # lo has listings, hi has none
+
+    def update(results: Dict[int, bool]) -> None:
+        nonlocal lo, hi
+        for page, found in results.items():
+            if found:
+                lo = max(lo, page)
+        for page, found in results.items():
+            if not found and page > lo:
+                hi = min(hi, page)
+
+    # Round 1: the hint, its successor and galloping steps on both sides
+    steps = [2 ** i for i in range(1, width // 2)]
+    candidates = [hint, hint + 1] + [hint + s for s in steps] + [hint - s for s in steps]
+    update(has_listings([p for p in candidates if 1 < p <= max_pages]))
+
+    # Gallop upwards while every probe found listings
+    step = 2 ** (width // 2)
+    while hi > max_pages and lo < max_pages:
+        update(has_listings([min(lo + step * 2 ** i, max_pages) for i in range(width)]))
+        step *= 2 ** width
+
+    # k-ary search inside the bracket
+    while hi - lo > 1:
+        span = hi - lo
+        candidates = {lo + math.ceil(span * (i + 1) / (width + 1)) for i in range(width)}
+        update(has_listings([p for p in candidates if lo < p < hi]))
+
+    return lo
+
+
+def load_cache(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path: str, cache: dict) -> None:
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(cache, f, indent=2)
+    except OSError as e:
+        logger.warning(f"Could not write page count cache {path}: {e}")
+
+
+def detect_total_pages(
+    url: str,
+    cache_path: Optional[str] = DEFAULT_CACHE,
+    workers: int = 8,
+) -> Tuple[int, str]:
+    """Detect the total number of result pages.
 
     Args:
         url: Base search URL
+        cache_path: JSON file with the totals found by previous runs (None to disable)
+        workers: Concurrent probes per round
 
     Returns:
-        Total number of pages available
+        (total pages, how it was found: "result_count", "cache", "search" or "fallback")
     """
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-
-            # Strategy 1: Try the high page number redirect test FIRST
-            # This is most reliable for sites that only show nearby pagination links
-            logger.info("Trying high page number to find limit...")
-            page = browser.new_page()
-            try:
-                page.goto(f"{url}{'&' if '?' in url else '?'}page=9999",
-                         wait_until="networkidle", timeout=60000)
-
-                # Check if we got redirected to a specific max page
-                current_url = page.url
-                match = re.search(r'[?&]page=(\d+)', current_url)
-                if match:
-                    detected_page = int(match.group(1))
-
-                    # If we got 9999 back, the site doesn't redirect - verify it has properties
-                    if detected_page >= 9999:
-                        html = page.content()
-                        soup = BeautifulSoup(html, 'lxml')
-                        # Check using the same pattern as the actual scraper
-                        property_links = soup.find_all('a', href=re.compile(r'_rah-\d+.*\.html'))
-                        if len(property_links) == 0:
-                            logger.warning(f"Page 9999 has no properties - site doesn't redirect, need different strategy")
-                        else:
-                            logger.info(f"✅ Detected max page from redirect: {detected_page}")
-                            browser.close()
-                            return detected_page
-                    # Only trust redirect if it's a reasonable number (100-9000)
-                    elif detected_page > 100:
-                        logger.info(f"✅ Detected max page from redirect: {detected_page}")
-                        browser.close()
-                        return detected_page
-                    else:
-                        logger.warning(f"Redirect gave suspiciously low page: {detected_page}")
-
-            except Exception as e:
-                logger.warning(f"High page test failed: {e}")
-
-            # Strategy 2: Load first page and check pagination links
-            logger.info(f"Checking pagination at: {url}")
-            page.goto(url, wait_until="networkidle", timeout=60000)
-            html = page.content()
-            soup = BeautifulSoup(html, 'lxml')
-
-            # Find all page number links and use binary search if needed
-            page_links = soup.find_all('a', href=re.compile(r'[?&]page=(\d+)'))
-            if page_links:
-                page_numbers = []
-                for link in page_links:
-                    href = link.get('href', '')
-                    match = re.search(r'[?&]page=(\d+)', href)
-                    if match:
-                        page_numbers.append(int(match.group(1)))
-
-                if page_numbers:
-                    max_visible = max(page_numbers)
-                    logger.info(f"Found max visible page link: {max_visible}")
-                    # Only trust if it's high enough
-                    if max_visible > 1000:
-                        logger.info(f"✅ Using max visible page: {max_visible}")
-                        browser.close()
-                        return max_visible
-                    else:
-                        logger.warning(f"Max visible page ({max_visible}) seems too low, trying binary search")
-
-                        # Strategy 3: Binary search to find actual max page
-                        # This is needed for sites that only show nearby pagination links
-                        logger.info("Binary searching for actual max page...")
-
-                        def has_properties_on_page(page_num: int) -> bool:
-                            """Check if a specific page has property listings"""
-                            try:
-                                test_url = f"{url}{'&' if '?' in url else '?'}page={page_num}"
-                                page.goto(test_url, wait_until="networkidle", timeout=60000)
-                                html = page.content()
-                                soup = BeautifulSoup(html, 'lxml')
-                                # Use the same pattern as the actual scraper
-                                property_links = soup.find_all('a', href=re.compile(r'_rah-\d+.*\.html'))
-                                return len(property_links) > 0
-                            except Exception as e:
-                                logger.warning(f"Error checking page {page_num}: {e}")
-                                return False
-
-                        # Binary search between max_visible and a reasonable upper bound
-                        low = max_visible
-                        high = 10000
-                        actual_max = max_visible
-
-                        while low <= high:
-                            mid = (low + high) // 2
-                            logger.info(f"  Checking page {mid}...")
-
-                            if has_properties_on_page(mid):
-                                actual_max = mid
-                                low = mid + 1
-                            else:
-                                high = mid - 1
-
-                        logger.info(f"✅ Binary search found max page: {actual_max}")
-                        browser.close()
-                        return actual_max
-
-            browser.close()
-
-            # Fallback: return a safe default
-            logger.warning("Could not reliably detect page count, using default: 1284")
-            return 1284
+    cache = load_cache(cache_path) if cache_path else {}
+    cached = cache.get(url, {}).get("total_pages")
+    prober = PageProber(url, workers=workers)
 
+    try:
+        # The first page gives the result count and the page size
+        first = prober.fetch(1)
+        per_page = count_listings(first.text)
+        if not per_page:
+            raise ValueError("no listings on page 1 (blocked or markup changed)")
+        result_count = parse_result_count(first.text)
+
+        hint, method = cached or DEFAULT_PAGES, "cache" if cached else "search"
+        if result_count:
+            hint, method = math.ceil(result_count / per_page), "result_count"
+            logger.info(f"Site reports {result_count} results, {per_page} per page -> ~{hint} pages")
+        elif cached:
+            logger.info(f"Starting from last known total: {cached} pages")
+
+        total = find_last_page(prober.probe, hint, width=workers)
+        if total != hint:
+            method = "search"
+        logger.info(f"✅ Detected {total} pages ({method}, {prober.requests} requests)")
     except Exception as e:
         logger.error(f"Error detecting pages: {e}")
-        return 1284  # Fallback to known value
+        total = cached or DEFAULT_PAGES
+        logger.warning(f"Using {'last known' if cached else 'default'} page count: {total}")
+        return total, "fallback"
+    finally:
+        prober.close()
+
+    if cache_path:
+        cache[url] = {"total_pages": total, "detected_at": datetime.utcnow().isoformat()}
+        save_cache(cache_path, cache)
+    return total, method
 
 
 def calculate_page_ranges(total_pages: int, num_jobs: int = 9) -> list:
@@ -172,18 +276,21 @@ def calculate_page_ranges(total_pages: int, num_jobs: int = 9) -> list:
 
 
 if __name__ == "__main__":
-    # URL for Rent-A-House for-sale residential listings
-    url = "https://rentahouse.com.ve/buscar-propiedades?tipo_negocio=venta&tipo_inmueble=Apartamento,Casa,Townhouse"
-
-    # Detect total pages
-    total_pages = detect_total_pages(url)
-
-    # Calculate ranges for 9 parallel jobs
-    ranges = calculate_page_ranges(total_pages, num_jobs=9)
+    parser = argparse.ArgumentParser(description="Detect result pages and split them into job ranges")
+    parser.add_argument('--url', default=DEFAULT_URL, help='Search URL')
+    parser.add_argument('--jobs', type=int, default=9, help='Number of parallel jobs (default: 9)')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent probes per round (default: 8)')
+    parser.add_argument('--cache', default=DEFAULT_CACHE, help=f'Page count cache file (default: {DEFAULT_CACHE})')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore and do not update the cache')
+    args = parser.parse_args()
+
+    total_pages, method = detect_total_pages(
+        args.url, cache_path=None if args.no_cache else args.cache, workers=args.workers
+    )
 
     # Output JSON for GitHub Actions
-    import json
     print(json.dumps({
         "total_pages": total_pages,
-        "ranges": ranges
+        "method": method,
+        "ranges": calculate_page_ranges(total_pages, num_jobs=min(args.jobs, total_pages))
     }))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Offline stand-ins for the scraper's external backends.
+
+Used with the mock Rent-A-House site (mock_site.py) to run the full crawl
+without Gemini or Supabase, e.g. for throughput benchmarks:
+
+    python scraper/run.py --storage fake --translator fake --base-url http://127.0.0.1:8765
+
+Latencies and error rates mimic the real services and are configured via
+environment variables so that subprocess runs can be tuned:
+
+- FAKE_STORAGE_LATENCY: seconds per storage round trip (default 0.08)
+- FAKE_TRANSLATOR_LATENCY: seconds per translation (default 0.8)
+- FAKE_TRANSLATOR_ERROR_RATE: share of translations that fail (default 0)
+"""
+
+import logging
+import os
+import random
+import time
+from typing import Dict, List, Optional
+
+from staging import SQLiteStagingStore
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={os.environ[name]!r}, using {default}")
+        return default
+
+
+class FakeTranslator:
+    """Translator with the PropertyTranslator interface and a simulated API latency."""
+
+    def __init__(self, latency: Optional[float] = None, error_rate: Optional[float] = None):
+        """Initialize the translator.
+
+        Args:
+            latency: Seconds per translation (default: FAKE_TRANSLATOR_LATENCY)
+            error_rate: Share of calls that raise (default: FAKE_TRANSLATOR_ERROR_RATE)
+        """
+        self.latency = _env_float("FAKE_TRANSLATOR_LATENCY", 0.8) if latency is None else latency
+        self.error_rate = _env_float("FAKE_TRANSLATOR_ERROR_RATE", 0.0) if error_rate is None else error_rate
+        self.model_name = "fake-translator"
+        self.calls = 0
+        logger.info(f"✅ Fake translator ({self.latency:.2f}s per listing, {self.error_rate:.0%} errors)")
+
+    def translate_listing(self, listing_data: Dict) -> Dict:
+        self.calls += 1
+        time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            raise RuntimeError("simulated translation failure")
+
+        title_es = listing_data.get('title', '')
+        desc_short_es = listing_data.get('description_short', '')
+        desc_full_es = listing_data.get('description_full', '')
+        listing_data['title_en'] = f"[en] {title_es}"
+        listing_data['description_short_en'] = desc_short_es
+        listing_data['description_full_en'] = desc_full_es
+        listing_data['title_es'] = title_es
+        listing_data['description_short_es'] = desc_short_es
+        listing_data['description_full_es'] = desc_full_es
+        listing_data['translation_model'] = self.model_name
+        return listing_data
+
+    def translate_amenities(self, amenities_es: List[str]) -> List[str]:
+        return list(amenities_es)
+
+
+class FakeStorage(SQLiteStagingStore):
+    """Local staging store that adds a simulated Supabase round trip to every call."""
+
+    def __init__(self, path: str = "staging.db", run_id: Optional[str] = None, latency: Optional[float] = None):
+        """Open the store.
+
+        Args:
+            path: SQLite database file
+            run_id: Scrape run id stamped on every listing seen
+            latency: Seconds per round trip (default: FAKE_STORAGE_LATENCY)
+        """
+        super().__init__(path, run_id=run_id)
+        self.latency = _env_float("FAKE_STORAGE_LATENCY", 0.08) if latency is None else latency
+        logger.info(f"Fake storage adds {self.latency * 1000:.0f}ms per round trip")
+
+    def get_translation_state(self, source_url: str) -> Optional[dict]:
+        time.sleep(self.latency)
+        return super().get_translation_state(source_url)
+
+    def upsert_listings(self, listings: list, source: str) -> dict:
+        # Hash lookup plus bulk upsert, like SupabaseStorage
+        time.sleep(2 * self.latency)
+        return super().upsert_listings(listings, source)
+
+    def seen_in_run(self, source_urls: List[str], chunk_size: int = 500) -> set:
+        time.sleep(self.latency)
+        return super().seen_in_run(source_urls, chunk_size)
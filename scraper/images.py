@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+"""
+Concurrent image re-hosting pipeline for property listings.
+Downloads listing photos and uploads them to Supabase Storage in parallel
+on a shared async HTTP client, preserving the original image order.
+Transfers are streamed so memory stays flat regardless of concurrency.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlparse
+
+from metrics import get_metrics
+from transport import Transport, get_transport
+
+logger = logging.getLogger(__name__)
+
+# Pillow is optional - without it the original image is hosted as-is
+try:
+    from PIL import Image, ImageOps
+    VARIANTS_ENABLED = True
+except ImportError:
+    VARIANTS_ENABLED = False
+    logger.warning("Pillow not available - images will be hosted without resized variants")
+
+BUCKET = "property-images"
+
+# Resized WebP variants generated for every image (widths in px)
+VARIANT_WIDTHS = (320, 768, 1600)
+CARD_VARIANT_WIDTH = 768  # used for thumbnail_small_url (listing cards)
+WEBP_QUALITY = 78
+JPEG_QUALITY = 82
+
+# Streaming transfer limits
+STREAM_CHUNK_BYTES = 64 * 1024
+SPOOL_THRESHOLD_BYTES = 1024 * 1024     # larger images are spooled to a temp file
+MAX_IMAGE_BYTES = 15 * 1024 * 1024      # larger images are skipped
+MIN_IMAGE_BYTES = 2 * 1024              # smaller "images" are placeholders / tracking pixels
+
+
+class ImageRejected(Exception):
+    """Image skipped based on its headers or size (placeholder, too large, not an image)."""
+
+
+@dataclass
+class HostedImage:
+    """A re-hosted image: full-size URL plus resized variants keyed by width."""
+
+    url: str
+    variants: Dict[str, str] = field(default_factory=dict)
+
+    def card_url(self) -> Optional[str]:
+        """Variant sized for listing cards (largest available if the source is smaller)."""
+        if not self.variants:
+            return None
+        fitting = [w for w in self.variants if int(w) >= CARD_VARIANT_WIDTH]
+        return self.variants[min(fitting, key=int) if fitting else max(self.variants, key=int)]
+
+
+def render_variants(source: Union[bytes, bytearray, str], widths: Sequence[int] = VARIANT_WIDTHS) -> Dict[str, Tuple[bytes, str]]:
+    """Decode an image and encode its resized variants.
+
+    Runs in a worker process. Produces one WebP per width (never upscaled)
+    and a JPEG capped at the largest width that replaces the original.
+
+    Args:
+        source: Image bytes (or bytearray), or path of a spooled temp file for large images
+        widths: Variant widths in px
+
+    Returns:
+        {name: (data, content_type)} where name is the width ("320", ...)
+        for WebP variants and "full" for the JPEG
+    """
+    variants = {}
+    with Image.open(source if isinstance(source, str) else io.BytesIO(source)) as src:
+        # Let the JPEG decoder downscale while decoding instead of materializing full resolution
+        src.draft("RGB", (max(widths), max(widths)))
+        img = ImageOps.exif_transpose(src).convert("RGB")
+
+    for width in sorted(widths):
+        resized = img
+        if img.width > width:
+            resized = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+
+        buf = io.BytesIO()
+        resized.save(buf, "WEBP", quality=WEBP_QUALITY, method=4)
+        variants[str(width)] = (buf.getvalue(), "image/webp")
+
+        # Source is smaller than the remaining widths - larger variants would be identical
+        if resized is img:
+            break
+
+    buf = io.BytesIO()
+    resized.save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    variants["full"] = (buf.getvalue(), "image/jpeg")
+    return variants
+
+
+class SpooledImage:
+    """Image body buffered in memory up to a threshold, then on disk.
+
+    Hashes the content incrementally while it is written so the full
+    image never has to be held in memory for the manifest lookup.
+    """
+
+    def __init__(self, threshold: int = SPOOL_THRESHOLD_BYTES, max_size: int = MAX_IMAGE_BYTES):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.size = 0
+        self.path: Optional[str] = None
+        self._buffer = bytearray()
+        self._file = None
+        self._sha256 = hashlib.sha256()
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise ImageRejected(f"image larger than {self.max_size} bytes")
+        self._sha256.update(chunk)
+
+        if self._file is None and self.size > self.threshold:
+            # Roll over to disk
+            fd, self.path = tempfile.mkstemp(prefix="image-", suffix=".part")
+            self._file = os.fdopen(fd, "w+b")
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._buffer.extend(chunk)
+
+    @property
+    def memory_size(self) -> int:
+        """Bytes held in memory (0 once spooled to disk)."""
+        return len(self._buffer)
+
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+    def source(self) -> Union[bytearray, str]:
+        """What to hand to ``render_variants``: the in-memory buffer (not a copy), or the temp file path."""
+        if self._file is not None:
+            self._file.flush()
+            return self.path
+        return self._buffer
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """Stream the body back out in chunks (for the upload request)."""
+        if self._file is None:
+            for i in range(0, len(self._buffer), STREAM_CHUNK_BYTES):
+                yield bytes(self._buffer[i:i + STREAM_CHUNK_BYTES])
+            return
+
+        self._file.flush()
+        self._file.seek(0)
+        while True:
+            chunk = self._file.read(STREAM_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+    def cleanup(self) -> None:
+        self._buffer = bytearray()
+        if self._file is not None:
+            self._file.close()
+            os.unlink(self.path)
+            self._file = None
+
+
+class ByteBudget:
+    """Async semaphore measured in bytes instead of slots.
+
+    Caps how many image bytes are held in memory at once across all
+    in-flight downloads/uploads. A single image larger than the whole
+    budget is still admitted once nothing else is in flight.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self, size: int) -> int:
+        size = min(max(size, 1), self.limit)
+        async with self._cond:
+            await self._cond.wait_for(
+                lambda: self.in_flight == 0 or self.in_flight + size <= self.limit
+            )
+            self.in_flight += size
+        return size
+
+    async def release(self, size: int) -> None:
+        async with self._cond:
+            self.in_flight -= size
+            self._cond.notify_all()
+
+    async def resize(self, held: int, size: int) -> int:
+        """Change a held reservation to `size` bytes without waiting.
+
+        Growing is only for memory that is already allocated (a body longer
+        than its Content-Length, rendered variants): waiting for it while
+        holding a reservation could deadlock. Later acquires wait for it.
+        """
+        async with self._cond:
+            self.in_flight += size - held
+            if size < held:
+                self._cond.notify_all()
+        return size
+
+
+class ImageManifest:
+    """Map of source image URL (and content hash) to the hosted copy.
+
+    Loaded in bulk from the ``image_manifest`` table at startup so images
+    that were already re-hosted in a previous run are reused without any
+    network calls. New uploads are recorded as they finish and written back
+    with ``flush()``.
+    """
+
+    TABLE_NAME = "image_manifest"
+
+    def __init__(self):
+        self.by_url: Dict[str, dict] = {}
+        self.by_hash: Dict[str, dict] = {}
+        self._pending: List[dict] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.by_url)
+
+    def load(self, client, page_size: int = 1000) -> int:
+        """Load every manifest entry from Supabase. Returns number of entries."""
+        offset = 0
+        while True:
+            result = (
+                client.table(self.TABLE_NAME)
+                .select("source_url, content_hash, storage_path, public_url, variants")
+                .range(offset, offset + page_size - 1)
+                .execute()
+            )
+            rows = result.data or []
+            with self._lock:
+                for row in rows:
+                    self._index(row)
+            if len(rows) < page_size:
+                break
+            offset += page_size
+
+        logger.info(f"Loaded image manifest: {len(self)} hosted images")
+        return len(self)
+
+    def _index(self, entry: dict) -> None:
+        self.by_url[entry["source_url"]] = entry
+        if entry.get("content_hash"):
+            self.by_hash[entry["content_hash"]] = entry
+
+    def lookup_url(self, source_url: str) -> Optional[dict]:
+        with self._lock:
+            return self.by_url.get(source_url)
+
+    def lookup_hash(self, content_hash: str) -> Optional[dict]:
+        with self._lock:
+            return self.by_hash.get(content_hash)
+
+    def record(
+        self,
+        source_url: str,
+        content_hash: str,
+        storage_path: str,
+        public_url: str,
+        variants: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Record a hosted image (kept in memory until the next flush)."""
+        entry = {
+            "source_url": source_url,
+            "content_hash": content_hash,
+            "storage_path": storage_path,
+            "public_url": public_url,
+            "variants": variants or {},
+        }
+        with self._lock:
+            self._index(entry)
+            self._pending.append(entry)
+
+    def flush(self, client, chunk_size: int = 500) -> int:
+        """Write newly recorded entries to Supabase. Returns number written."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+
+        written = 0
+        for i in range(0, len(pending), chunk_size):
+            chunk = pending[i:i + chunk_size]
+            try:
+                client.table(self.TABLE_NAME).upsert(chunk, on_conflict="source_url").execute()
+                written += len(chunk)
+            except Exception as e:
+                logger.warning(f"Failed to write image manifest entries: {e}")
+                with self._lock:
+                    self._pending.extend(chunk)
+        return written
+
+
+class ImagePipeline:
+    """Re-host listing images concurrently on a background event loop.
+
+    The pipeline owns one ``httpx.AsyncClient`` from the shared transport and
+    an event loop running in a daemon thread, so the synchronous scraper can
+    submit whole batches of images and block until they are all done.
+    Decoding and resizing run in a process pool so they never hold the GIL
+    of the download/upload loop.
+    """
+
+    def __init__(
+        self,
+        supabase_url: str,
+        supabase_key: str,
+        bucket: str = BUCKET,
+        max_connections: int = 32,
+        per_host_connections: int = 6,
+        storage_connections: int = 16,
+        max_inflight_bytes: int = 64 * 1024 * 1024,
+        spool_threshold: int = SPOOL_THRESHOLD_BYTES,
+        max_image_bytes: int = MAX_IMAGE_BYTES,
+        min_image_bytes: int = MIN_IMAGE_BYTES,
+        manifest: Optional[ImageManifest] = None,
+        variant_widths: Optional[Sequence[int]] = VARIANT_WIDTHS,
+        variant_workers: Optional[int] = None,
+        transport: Optional[Transport] = None,
+    ):
+        """Initialize the pipeline.
+
+        Args:
+            supabase_url: Supabase project URL
+            supabase_key: Supabase service role key
+            bucket: Storage bucket to upload into
+            max_connections: Total connection pool size
+            per_host_connections: Concurrent requests per image host
+            storage_connections: Concurrent uploads to Supabase Storage
+            max_inflight_bytes: Global budget of image bytes held in memory
+            spool_threshold: Images larger than this are spooled to a temp file
+            max_image_bytes: Images larger than this are skipped
+            min_image_bytes: Images smaller than this are treated as placeholders
+            manifest: Already-hosted images to reuse instead of re-uploading
+            variant_widths: Widths of resized variants (None/empty disables them)
+            variant_workers: Size of the image-processing pool (default: CPU count)
+            transport: Shared transport (pool settings, timeouts, reuse stats)
+        """
+        self.supabase_url = supabase_url.rstrip("/")
+        self.supabase_key = supabase_key
+        self.bucket = bucket
+        self.max_connections = max_connections
+        self.per_host_connections = per_host_connections
+        self.storage_connections = storage_connections
+        self.max_inflight_bytes = max_inflight_bytes
+        self.spool_threshold = spool_threshold
+        self.max_image_bytes = max_image_bytes
+        self.min_image_bytes = min_image_bytes
+        self.skipped = 0
+        self.transport = transport or get_transport()
+        self.manifest = manifest if manifest is not None else ImageManifest()
+        self.reused = 0
+
+        self.variant_widths = tuple(variant_widths or ()) if VARIANTS_ENABLED else ()
+        self._pool = None
+        if self.variant_widths:
+            self._pool = ProcessPoolExecutor(
+                max_workers=variant_workers or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+        self._storage_host = urlparse(self.supabase_url).netloc
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="image-pipeline", daemon=True
+        )
+        self._thread.start()
+        self._run(self._start())
+
+    # -------------------------------------------------------------------------
+    # Event loop plumbing
+    # -------------------------------------------------------------------------
+
+    def _run(self, coro):
+        """Run a coroutine on the pipeline loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _start(self) -> None:
+        self.client = self.transport.async_client(max_connections=self.max_connections)
+        self.budget = ByteBudget(self.max_inflight_bytes)
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        """Per-host concurrency limit (Supabase Storage gets its own, larger limit)."""
+        host = urlparse(url).netloc
+        if host not in self._host_slots:
+            limit = self.storage_connections if host == self._storage_host else self.per_host_connections
+            self._host_slots[host] = asyncio.Semaphore(limit)
+        return self._host_slots[host]
+
+    def close(self) -> None:
+        """Close the HTTP client and stop the background loop."""
+        if not self._loop.is_running():
+            return
+        self._run(self.client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        if self._pool:
+            self._pool.shutdown()
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+
+    def public_url(self, path: str) -> str:
+        """Public URL of an object in the (public) bucket."""
+        return f"{self.supabase_url}/storage/v1/object/public/{self.bucket}/{path}"
+
+    def rehost(self, jobs: Sequence[Tuple[str, str]]) -> List[Optional[HostedImage]]:
+        """Re-host a batch of images concurrently.
+
+        Args:
+            jobs: (image_url, property_id) tuples
+
+        Returns:
+            Hosted images in the same order as ``jobs`` (None for failures)
+        """
+        if not jobs:
+            return []
+        return self._run(self._rehost_all(jobs))
+
+    def rehost_listings(self, listings: Sequence[Tuple[str, Sequence[str]]]) -> List[List[HostedImage]]:
+        """Re-host the images of several listings in one concurrent batch.
+
+        Args:
+            listings: (property_id, image_urls) per listing
+
+        Returns:
+            Hosted images per listing, in listing and image order, failures dropped
+        """
+        jobs = [
+            (img_url, property_id)
+            for property_id, image_urls in listings
+            for img_url in image_urls
+        ]
+        results = iter(self.rehost(jobs))
+
+        hosted = []
+        for _, image_urls in listings:
+            urls = [next(results) for _ in image_urls]
+            hosted.append([u for u in urls if u])
+        return hosted
+
+    # -------------------------------------------------------------------------
+    # Pipeline stages
+    # -------------------------------------------------------------------------
+
+    async def _rehost_all(self, jobs: Sequence[Tuple[str, str]]) -> List[Optional[HostedImage]]:
+        return await asyncio.gather(*(self._rehost_one(*job) for job in jobs))
+
+    async def _rehost_one(self, image_url: str, property_id: str) -> Optional[HostedImage]:
+        # Already hosted in a previous run - no network calls at all
+        known = self.manifest.lookup_url(image_url)
+        if known:
+            self.reused += 1
+            get_metrics().inc("image_cache_hits", kind="url")
+            return HostedImage(known["public_url"], known.get("variants") or {})
+
+        reserved = 0
+        body = SpooledImage(self.spool_threshold, self.max_image_bytes)
+        try:
+            async with self._host_slot(image_url):
+                async with self.client.stream("GET", image_url) as response:
+                    response.raise_for_status()
+                    content_type = response.headers.get("content-type", "image/jpeg")
+                    length = response.headers.get("content-length")
+                    self._check_headers(content_type, int(length) if length else None)
+
+                    # Only the in-memory part of the body counts against the budget: reserve
+                    # the most that can be buffered (up to the spool threshold without a
+                    # Content-Length) and trim it to what was actually buffered afterwards
+                    size = int(length) if length else self.spool_threshold
+                    reserved = await self.budget.acquire(min(size, self.spool_threshold))
+                    async for chunk in response.aiter_bytes(STREAM_CHUNK_BYTES):
+                        body.write(chunk)
+                        if body.memory_size > reserved:  # longer than its Content-Length said
+                            reserved = await self.budget.resize(reserved, body.memory_size)
+                    reserved = await self.budget.resize(reserved, body.memory_size)
+
+            get_metrics().inc("image_bytes", body.size)
+            if body.size < self.min_image_bytes:
+                raise ImageRejected(f"placeholder image ({body.size} bytes)")
+
+            # Same bytes under a new URL (e.g. CDN cache-busting) - reuse the hosted copy
+            content_hash = body.hexdigest()
+            known = self.manifest.lookup_hash(content_hash)
+            if known:
+                self.reused += 1
+                get_metrics().inc("image_cache_hits", kind="content_hash")
+                variants = known.get("variants") or {}
+                self.manifest.record(image_url, content_hash, known["storage_path"], known["public_url"], variants)
+                return HostedImage(known["public_url"], variants)
+
+            # Content-addressed filenames: property-id/image-<hash>.jpg, image-<hash>-320w.webp
+            stem = f"{property_id}/image-{content_hash[:16]}"
+            ext = Path(urlparse(image_url).path).suffix or ".jpg"
+            filename = f"{stem}{ext}"
+
+            rendered = await self._render(image_url, body.source())
+            if rendered:
+                # Hold the encoded outputs until they are uploaded; the original is not needed
+                body.cleanup()
+                reserved = await self.budget.resize(reserved, sum(len(data) for data, _ in rendered.values()))
+                # The capped JPEG replaces the (often multi-megabyte) original
+                full_data, content_type = rendered.pop("full")
+                filename = f"{stem}.jpg"
+                uploads = [self._upload(filename, full_data, content_type, len(full_data))]
+            else:
+                uploads = [self._upload(filename, body.chunks(), content_type, body.size)]
+
+            variants = {}
+            for width, (data, variant_type) in (rendered or {}).items():
+                variant_path = f"{stem}-{width}w.webp"
+                uploads.append(self._upload(variant_path, data, variant_type, len(data)))
+                variants[width] = self.public_url(variant_path)
+
+            await asyncio.gather(*uploads)
+            public_url = self.public_url(filename)
+            self.manifest.record(image_url, content_hash, filename, public_url, variants)
+            logger.debug(f"Uploaded image: {filename} (+{len(variants)} variants)")
+            return HostedImage(public_url, variants)
+
+        except ImageRejected as e:
+            self.skipped += 1
+            get_metrics().inc("images_skipped")
+            logger.debug(f"Skipping image {image_url}: {e}")
+            return None
+
+        except Exception as e:
+            logger.warning(f"Failed to download/upload image {image_url}: {e}")
+            return None
+
+        finally:
+            body.cleanup()
+            if reserved:
+                await self.budget.release(reserved)
+
+    def _check_headers(self, content_type: str, length: Optional[int]) -> None:
+        """Reject non-images, placeholders and oversized images before reading the body."""
+        if not content_type.startswith("image/"):
+            raise ImageRejected(f"not an image ({content_type})")
+        if length is not None and length > self.max_image_bytes:
+            raise ImageRejected(f"image larger than {self.max_image_bytes} bytes ({length})")
+        if length is not None and length < self.min_image_bytes:
+            raise ImageRejected(f"placeholder image ({length} bytes)")
+
+    async def _render(self, image_url: str, source: Union[bytearray, str]) -> Optional[Dict[str, Tuple[bytes, str]]]:
+        """Generate resized variants in the process pool (None if disabled or undecodable)."""
+        if not self._pool:
+            return None
+        try:
+            return await self._loop.run_in_executor(
+                self._pool, render_variants, source, self.variant_widths
+            )
+        except Exception as e:
+            logger.warning(f"Could not generate variants for {image_url}, hosting original: {e}")
+            return None
+
+    async def _upload(
+        self, path: str, content: Union[bytes, AsyncIterator[bytes]], content_type: str, size: int
+    ) -> None:
+        """Upload an object via the Storage REST API (upsert), streaming if given chunks."""
+        url = f"{self.supabase_url}/storage/v1/object/{self.bucket}/{path}"
+        async with self._host_slot(url):
+            response = await self.client.post(
+                url,
+                content=content,
+                headers={
+                    "Authorization": f"Bearer {self.supabase_key}",
+                    "apikey": self.supabase_key,
+                    "content-type": content_type,
+                    "content-length": str(size),
+                    "x-upsert": "true",
+                },
+            )
+            response.raise_for_status()
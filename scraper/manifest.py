@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Per-job run manifests and the merge step of a distributed scrape.
+
+Every scrape job writes one compact manifest: the listings it saw, what it
+wrote, what failed (and at which stage) and per-stage timings. The merge
+step combines the manifests of a run into one report, re-queues the URLs
+that failed in a retryable stage (as a discovery file for run.py
+--discovered) and leaves stale reconciliation to a single final pass.
+
+Usage:
+    python scraper/manifest.py merge manifests/ --report report.json --requeue requeue.jsonl
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sharding import listing_key, write_discovery
+
+logger = logging.getLogger(__name__)
+
+# Failures worth another attempt (listing never reached storage); e.g.
+# translation failures still wrote the Spanish listing
+REQUEUE_STAGES = ("detail_page", "write")
+
+
+class RunManifest:
+    """What one job of a scrape run did."""
+
+    def __init__(self, run_id: Optional[str] = None, job: Optional[str] = None, source: Optional[str] = None):
+        self.run_id = run_id
+        self.job = job
+        self.source = source
+        self.started_at = datetime.utcnow().isoformat()
+        self.seen = set()  # listing keys processed
+        self.counts: Dict[str, int] = {}
+        self.failures: Dict[str, dict] = {}  # url -> {"stage", "error"} (last failure wins)
+        self.timings: Dict[str, dict] = {}  # stage -> {"count", "total_s", "max_s"} (from the metrics registry)
+        self._lock = threading.Lock()  # the listing writer records from its own thread
+
+    def record_seen(self, url: str) -> None:
+        self.seen.add(listing_key(url))
+
+    def record_failure(self, url: str, stage: str, error) -> None:
+        with self._lock:
+            self.failures[url] = {"stage": stage, "error": str(error)[:300]}
+
+    def clear_failure(self, url: str) -> None:
+        """Forget a failure (the URL is being retried)."""
+        with self._lock:
+            self.failures.pop(url, None)
+
+    def add_counts(self, counts: Dict[str, int]) -> None:
+        with self._lock:
+            for key, value in counts.items():
+                if isinstance(value, int):
+                    self.counts[key] = self.counts.get(key, 0) + value
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "job": self.job,
+                "source": self.source,
+                "started_at": self.started_at,
+                "finished_at": datetime.utcnow().isoformat(),
+                "seen": sorted(self.seen),
+                "counts": dict(self.counts),
+                "failures": [{"url": url, **failure} for url, failure in sorted(self.failures.items())],
+                "timings": dict(self.timings),
+            }
+
+    def save(self, path: str) -> None:
+        """Write the manifest (gzipped when the path ends in .gz)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        data = json.dumps(self.to_dict(), separators=(",", ":")).encode()
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "wb") as f:
+            f.write(data)
+        logger.info(
+            f"📒 Manifest: {len(self.seen)} seen, {len(self.failures)} failed, "
+            f"{self.counts} -> {path}"
+        )
+
+
+def load_manifests(paths: List[str]) -> List[dict]:
+    """Manifests from files or directories (*.json, *.json.gz)."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in ("*.json", "*.json.gz"):
+                files.extend(glob.glob(os.path.join(path, "**", pattern), recursive=True))
+        else:
+            files.append(path)
+
+    manifests = []
+    for file in sorted(files):
+        opener = gzip.open if file.endswith(".gz") else open
+        try:
+            with opener(file, "rb") as f:
+                manifests.append(json.loads(f.read()))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable manifest {file}: {e}")
+    return manifests
+
+
+def merge_manifests(manifests: List[dict]) -> dict:
+    """Combine job manifests into a whole-run report.
+
+    A URL counts as failed only if no job processed it successfully (a
+    failure in one job followed by success in another, e.g. a requeue
+    pass, is resolved).
+    """
+    seen = set()
+    counts: Dict[str, int] = {}
+    timings: Dict[str, dict] = {}
+    failures: Dict[str, dict] = {}
+    resolved = set()
+
+    for manifest in manifests:
+        seen.update(manifest.get("seen", []))
+        for key, value in manifest.get("counts", {}).items():
+            counts[key] = counts.get(key, 0) + value
+        for stage, timing in manifest.get("timings", {}).items():
+            total = timings.setdefault(stage, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+            total["count"] += timing["count"]
+            total["total_s"] += timing["total_s"]
+            total["max_s"] = max(total["max_s"], timing["max_s"])
+
+    for manifest in manifests:
+        manifest_failed = set()
+        for failure in manifest.get("failures", []):
+            failures[failure["url"]] = failure
+            manifest_failed.add(listing_key(failure["url"]))
+        # Listings this job saw and did not fail resolve failures of other jobs
+        resolved |= set(manifest.get("seen", [])) - manifest_failed
+
+    open_failures = [
+        failure for url, failure in sorted(failures.items())
+        if listing_key(url) not in resolved
+    ]
+
+    by_stage: Dict[str, int] = {}
+    for failure in open_failures:
+        by_stage[failure["stage"]] = by_stage.get(failure["stage"], 0) + 1
+
+    for timing in timings.values():
+        timing["avg_s"] = round(timing["total_s"] / timing["count"], 3) if timing["count"] else 0.0
+        timing["total_s"] = round(timing["total_s"], 3)
+
+    return {
+        "run_ids": sorted({m.get("run_id") for m in manifests if m.get("run_id")}),
+        "jobs": len(manifests),
+        "job_names": [m.get("job") for m in manifests],
+        "seen": len(seen),
+        "counts": counts,
+        "failed": len(open_failures),
+        "failed_by_stage": by_stage,
+        "requeue": [f["url"] for f in open_failures if f["stage"] in REQUEUE_STAGES],
+        "failures": open_failures,
+        "timings": timings,
+    }
+
+
+def markdown_report(report: dict) -> str:
+    """Human-readable run report (for $GITHUB_STEP_SUMMARY)."""
+    lines = [
+        f"## Scrape run {', '.join(report['run_ids']) or '-'}",
+        "",
+        f"- Jobs: {report['jobs']}",
+        f"- Listings seen: {report['seen']}",
+    ]
+    lines += [f"- {key.capitalize()}: {value}" for key, value in sorted(report["counts"].items())]
+    lines.append(f"- Failed: {report['failed']} {report['failed_by_stage'] or ''}".rstrip())
+    lines.append(f"- Re-queued: {len(report['requeue'])}")
+    if report["timings"]:
+        lines += ["", "| Stage | Count | Total (s) | Avg (s) | Max (s) |", "|---|---:|---:|---:|---:|"]
+        for stage, t in sorted(report["timings"].items(), key=lambda item: -item[1]["total_s"]):
+            lines.append(f"| {stage} | {t['count']} | {t['total_s']:.0f} | {t['avg_s']:.2f} | {t['max_s']:.2f} |")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Merge per-job scrape manifests")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    merge = commands.add_parser("merge", help="Combine manifests into a run report")
+    merge.add_argument("paths", nargs="+", help="Manifest files or directories")
+    merge.add_argument("--report", default=None, help="Write the JSON report here")
+    merge.add_argument("--requeue", default=None, help="Write re-queued URLs here (discovery file for run.py --discovered)")
+    merge.add_argument("--summary", default=os.environ.get("GITHUB_STEP_SUMMARY"), help="Append a markdown report here")
+
+    args = parser.parse_args()
+
+    report = merge_manifests(load_manifests(args.paths))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.requeue:
+        if os.path.exists(args.requeue):
+            os.remove(args.requeue)
+        write_discovery(args.requeue, [(0, url) for url in report["requeue"]])
+    if args.summary:
+        with open(args.summary, "a") as f:
+            f.write(markdown_report(report))
+
+    logger.info(
+        f"Merged {report['jobs']} manifests: {report['seen']} seen, {report['failed']} failed, "
+        f"{len(report['requeue'])} re-queued"
+    )
+    print(json.dumps({key: report[key] for key in ("jobs", "seen", "counts", "failed", "failed_by_stage")}))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
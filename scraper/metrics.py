@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+In-process metrics for the scraper: named spans, histograms and counters.
+
+Every stage (index page load, detail parse, translation, writes, images)
+is timed as a span into a per-stage histogram; counters track bytes,
+requests, retries and cache hits. At the end of a run the registry is
+exported as a JSON report (p50/p95/p99 per stage) or in the Prometheus
+text format, so concurrency can be tuned from data instead of log greps.
+
+    metrics = get_metrics()
+    with metrics.span("detail_page") as span:
+        ...
+    logger.info(f"Parse: {span.elapsed:.2f}s")
+    metrics.inc("page_bytes", len(html))
+"""
+
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+MAX_SAMPLES = 10_000  # per histogram; reservoir-sampled beyond that
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class Histogram:
+    """Distribution of observed values with exact count/sum/min/max and sampled quantiles."""
+
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        self.max_samples = max_samples
+        self.samples: List[float] = []
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self.samples) < self.max_samples:
+            self.samples.append(value)
+        else:
+            # Reservoir sampling keeps a uniform sample of all observations
+            slot = random.randrange(self.count)
+            if slot < self.max_samples:
+                self.samples[slot] = value
+
+    def quantiles(self, qs=QUANTILES) -> Dict[float, float]:
+        """Nearest-rank quantiles of the sampled observations."""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: 0.0 for q in qs}
+        return {q: ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))] for q in qs}
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "min": round(self.min, 4) if self.count else 0.0,
+            "max": round(self.max, 4),
+            "avg": round(self.sum / self.count, 4) if self.count else 0.0,
+            **{f"p{round(q * 100)}": round(value, 4) for q, value in self.quantiles().items()},
+        }
+
+
+class Span:
+    """A timed block; records its duration into the stage histogram on exit."""
+
+    def __init__(self, metrics: "Metrics", stage: str, labels: Dict[str, str]):
+        self.metrics = metrics
+        self.stage = stage
+        self.labels = labels
+        self.start = 0.0
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "Span":
+        self.metrics._active.setdefault(threading.get_ident(), []).append(self.stage)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.elapsed = time.perf_counter() - self.start
+        self.metrics._active[threading.get_ident()].pop()
+        self.metrics.observe("stage_seconds", self.elapsed, stage=self.stage, **self.labels)
+        if exc_type is not None:
+            self.metrics.inc("stage_errors", stage=self.stage)
+
+
+class Metrics:
+    """Thread-safe registry of histograms and counters."""
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._active: Dict[int, List[str]] = {}  # thread ident -> open spans (innermost last)
+
+    def span(self, stage: str, **labels) -> Span:
+        """Time a block as one occurrence of a stage."""
+        return Span(self, stage, labels)
+
+    def active_stage(self, thread_ident: int) -> Optional[str]:
+        """Innermost open span of a thread (for the sampling profiler)."""
+        spans = self._active.get(thread_ident)
+        return spans[-1] if spans else None
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(_label_key(labels))
+            if histogram is None:
+                histogram = series[_label_key(labels)] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def stage_totals(self) -> Dict[str, dict]:
+        """Per-stage count/total/max (the shape run manifests store)."""
+        with self._lock:
+            stages = self._histograms.get("stage_seconds", {})
+            return {
+                dict(labels)["stage"]: {
+                    "count": h.count, "total_s": round(h.sum, 3), "max_s": round(h.max, 3),
+                }
+                for labels, h in stages.items()
+            }
+
+    def report(self) -> dict:
+        """JSON-serializable run summary."""
+        with self._lock:
+            histograms = {
+                name: [{"labels": dict(labels), **h.summary()} for labels, h in sorted(series.items())]
+                for name, series in self._histograms.items()
+            }
+            counters = {
+                name: [{"labels": dict(labels), "value": value} for labels, value in sorted(series.items())]
+                for name, series in self._counters.items()
+            }
+        return {
+            "started_at": self.started,
+            "duration_s": round(time.time() - self.started, 3),
+            "histograms": histograms,
+            "counters": counters,
+        }
+
+    def to_prometheus(self, prefix: str = "scraper") -> str:
+        """Prometheus text exposition format (histograms as summaries)."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                metric = f"{prefix}_{name}"
+                lines.append(f"# TYPE {metric} summary")
+                for labels, h in sorted(series.items()):
+                    for q, value in h.quantiles().items():
+                        lines.append(f"{metric}{_format_labels(labels, ('quantile', str(q)))} {value:.6f}")
+                    lines.append(f"{metric}_sum{_format_labels(labels)} {h.sum:.6f}")
+                    lines.append(f"{metric}_count{_format_labels(labels)} {h.count}")
+            for name, series in sorted(self._counters.items()):
+                metric = f"{prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, path: str) -> None:
+        """Write the report: Prometheus text for .prom/.txt paths, JSON otherwise."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            if path.endswith((".prom", ".txt")):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.report(), f, indent=2)
+        logger.info(f"📈 Metrics written to {path}")
+
+    def log_summary(self) -> None:
+        report = self.report()
+        for entry in report["histograms"].get("stage_seconds", []):
+            logger.info(
+                f"📈 {entry['labels'].get('stage')}: {entry['count']}x, "
+                f"p50 {entry['p50']:.2f}s, p95 {entry['p95']:.2f}s, p99 {entry['p99']:.2f}s, "
+                f"total {entry['sum']:.1f}s"
+            )
+        for name, series in sorted(report["counters"].items()):
+            for entry in series:
+                labels = ",".join(f"{k}={v}" for k, v in entry["labels"].items())
+                logger.info(f"📈 {name}{f' [{labels}]' if labels else ''}: {entry['value']:g}")
+
+
+_default: Optional[Metrics] = None
+_default_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """The process-wide metrics registry."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Metrics()
+        return _default
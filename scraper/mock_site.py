@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Local mock of the Rent-A-House search and listing pages.
+
+Serves index pages (/buscar-propiedades?page=N) and listing pages with the
+markup run.py parses, so the whole crawl can run offline. Pages are either
+replayed from recorded HTML (see `record`) with their listing links
+rewritten, or generated. Latency, error rates, page weight and pagination
+depth are configurable.
+
+Usage:
+    python scraper/mock_site.py record --out fixtures/rentahouse --details 10
+    python scraper/mock_site.py serve --pages 50 --latency 0.3 --error-rate 0.02
+    python scraper/run.py --base-url http://127.0.0.1:8765 --storage fake --translator fake --rate-limit 0
+"""
+
+import argparse
+import glob
+import hashlib
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import unicodedata
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+SEARCH_PATH = "/buscar-propiedades"
+LISTING_HREF = re.compile(r'href="([^"]*_rah-\d+[^"]*\.html)"')
+CODE_IN_PATH = re.compile(r'_rah-(\d+)-(\d+)\.html$')
+
+CITIES = [
+    ("Distrito Capital", "Caracas", ["Altamira", "Los Palos Grandes", "El Cafetal", "La Castellana"]),
+    ("Miranda", "Los Teques", ["El Tambor", "San Pedro"]),
+    ("Carabobo", "Valencia", ["El Viñedo", "Prebo", "La Trigaleña"]),
+    ("Zulia", "Maracaibo", ["Tierra Negra", "Bella Vista"]),
+    ("Nueva Esparta", "Porlamar", ["Costa Azul", "Pampatar"]),
+]
+TYPES = [("Apartamento", "apartamento"), ("Casa", "casa"), ("Townhouse", "townhouse")]
+AMENITIES = ["Ascensor", "Piscina", "Vigilancia", "Gimnasio", "Planta Eléctrica", "Parque Infantil", "Portero"]
+PHRASES = [
+    "Amplio inmueble con excelente iluminación natural y ventilación cruzada.",
+    "Ubicado en zona residencial tranquila, cerca de colegios y centros comerciales.",
+    "Cocina empotrada con topes de granito y área de lavandería independiente.",
+    "Conjunto con vigilancia privada las 24 horas y planta eléctrica para áreas comunes.",
+    "Vista panorámica a la montaña, pisos de porcelanato y closets en todas las habitaciones.",
+    "Excelente oportunidad de inversión, documentos en regla y listo para mudarse.",
+]
+
+
+def listing_number(page: int, slot: int, per_page: int) -> int:
+    return (page - 1) * per_page + slot + 1
+
+
+def _slug(text: str) -> str:
+    ascii_text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return ascii_text.lower().replace(" ", "-")
+
+
+def listing_path(number: int) -> str:
+    """Path of the mock listing with the given number (stable across runs)."""
+    _, city, hoods = CITIES[number % len(CITIES)]
+    kind = TYPES[number % len(TYPES)][1]
+    return f"/{kind}_en_venta_en_{_slug(city)}_en_{_slug(hoods[number % len(hoods)])}_rah-26-{10000 + number}.html"
+
+
+def _padding(kb: int) -> str:
+    """Boilerplate markup (menus, footer) to bring a page up to a realistic weight."""
+    item = '<li class="nav-item"><a class="nav-link" href="/buscar-propiedades?tipo_negocio=venta">Propiedades en venta</a></li>'
+    return f'<ul class="navbar-nav d-none">{item * max(0, kb * 1024 // len(item))}</ul>'
+
+
+def generated_index(page: int, pages: int, per_page: int, page_kb: int) -> str:
+    if page > pages:
+        return f"<html><body><p>No se encontraron propiedades</p>{_padding(page_kb)}</body></html>"
+    cards = []
+    for slot in range(per_page):
+        path = listing_path(listing_number(page, slot, per_page))
+        cards.append(
+            f'<div class="property-card"><a href="{path}"><img src="/img/{slot}.jpg"></a>'
+            f'<h3><a href="{path}">Ver inmueble</a></h3></div>'
+        )
+    return (
+        f"<html><body><h1>{pages * per_page} propiedades</h1>"
+        f"{''.join(cards)}{_padding(page_kb)}</body></html>"
+    )
+
+
+def generated_detail(number: int, page_kb: int) -> str:
+    rng = random.Random(number)
+    state, city, hoods = CITIES[number % len(CITIES)]
+    type_label = TYPES[number % len(TYPES)][0]
+    hood = hoods[number % len(hoods)]
+    code = f"rah-26-{10000 + number}"
+    price = rng.randrange(25, 600) * 1000
+    description = " ".join(rng.choice(PHRASES) for _ in range(rng.randint(4, 12)))
+    amenities = "".join(
+        f"<li>{name} <span class=\"float-right\">{'✅' if rng.random() < 0.5 else '❌'}</span></li>"
+        for name in AMENITIES
+    )
+    images = "".join(
+        f'<img data-srcset="https://images.mock.invalid/{code}/{i}-640.jpg 640w, '
+        f'https://images.mock.invalid/{code}/{i}-1024.jpg 1024w">'
+        for i in range(rng.randint(3, 15))
+    )
+    return f"""<html><head><meta property="og:title" content="{type_label} en venta en {hood}, {city} ({code})"></head>
+<body>
+<div class="price"><strong>USD {price:,}</strong></div>
+<ul class="property-detailes-list">
+<li>Código RAH: <span class="float-right">{code.upper()}</span></li>
+<li>Tipo de Propiedad: <span class="float-right">{type_label}</span></li>
+<li>Área Privada: <span class="float-right">{rng.randint(45, 400)} m²</span></li>
+<li>Estado Del Inmueble: <span class="float-right">{rng.choice(['Usado', 'Nuevo'])}</span></li>
+<li>Dormitorios: <span class="float-right">{rng.randint(1, 5)}</span></li>
+<li>Total Baños: <span class="float-right">{rng.randint(1, 4)}</span></li>
+<li>Puestos De Estacionamiento: <span class="float-right">{rng.randint(0, 3)}</span></li>
+<li>Amoblado: <span class="float-right">{rng.choice(['Sí', 'No'])}</span></li>
+</ul>
+<h2>Ubicación</h2>
+<ul class="property-detailes-list-min">
+<li>Estado: <span class="float-right">{state}</span></li>
+<li>Ciudad: <span class="float-right">{city}</span></li>
+<li>Urbanización: <span class="float-right">{hood}</span></li>
+</ul>
+<h2>Detalles</h2>
+<ul class="property-detailes-list-min">{amenities}</ul>
+{images}
+<h2>Descripción</h2>
+<p>{description}</p>
+<div class="agent-card"><h2 itemprop="name">Agente {rng.randint(1, 400)}</h2><span class="agent-office">Rent-A-House {city}</span></div>
+{_padding(page_kb)}
+</body></html>"""
+
+
+class Fixtures:
+    """Recorded index and listing pages (fixtures/index/*.html, fixtures/detail/*.html)."""
+
+    def __init__(self, path: str):
+        self.index = self._read(os.path.join(path, "index"))
+        self.detail = self._read(os.path.join(path, "detail"))
+        if not self.index or not self.detail:
+            raise ValueError(f"No recorded pages in {path} (expected index/*.html and detail/*.html)")
+
+    @staticmethod
+    def _read(directory: str) -> List[str]:
+        pages = []
+        for file in sorted(glob.glob(os.path.join(directory, "*.html"))):
+            with open(file, encoding="utf-8") as f:
+                pages.append(f.read())
+        return pages
+
+    def index_page(self, page: int, per_page: int) -> str:
+        """A recorded index page whose listing links point at this page's mock listings."""
+        html = self.index[(page - 1) % len(self.index)]
+        slots: Dict[str, str] = {}
+
+        def rewrite(match) -> str:
+            href = match.group(1)
+            if href not in slots and len(slots) < per_page:
+                slots[href] = listing_path(listing_number(page, len(slots), per_page))
+            return f'href="{slots.get(href, "#")}"'
+
+        return LISTING_HREF.sub(rewrite, html)
+
+    def detail_page(self, number: int) -> str:
+        return self.detail[number % len(self.detail)]
+
+
+class MockSite:
+    """Threaded HTTP server imitating rentahouse.com.ve."""
+
+    def __init__(
+        self,
+        pages: int = 20,
+        per_page: int = 12,
+        latency: float = 0.2,
+        jitter: float = 0.1,
+        error_rate: float = 0.0,
+        index_error_rate: float = 0.0,
+        page_kb: int = 80,
+        fixtures: Optional[str] = None,
+        seed: int = 1,
+    ):
+        """Configure the site.
+
+        Args:
+            pages: Index pages with listings (later pages are empty)
+            per_page: Listings per index page
+            latency: Mean response delay (seconds)
+            jitter: Standard deviation of the delay (seconds)
+            error_rate: Share of listing pages answered with 503
+            index_error_rate: Share of index pages answered with 503
+            page_kb: Boilerplate added to generated pages (real pages weigh ~100 KB)
+            fixtures: Directory of recorded pages to replay instead of generating
+            seed: Seed for latency and error draws
+        """
+        self.pages = pages
+        self.per_page = per_page
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.index_error_rate = index_error_rate
+        self.page_kb = page_kb
+        self.fixtures = Fixtures(fixtures) if fixtures else None
+        self.requests = {"index": 0, "detail": 0, "errors": 0, "not_found": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def listings(self) -> int:
+        return self.pages * self.per_page
+
+    def _draw(self, error_rate: float) -> tuple:
+        with self._lock:
+            delay = max(0.0, self._rng.gauss(self.latency, self.jitter))
+            return delay, self._rng.random() < error_rate
+
+    def respond(self, path: str) -> tuple:
+        """(status, html) for a request path."""
+        parts = urlsplit(path)
+        if parts.path == SEARCH_PATH:
+            page = int(parse_qs(parts.query).get("page", ["1"])[0])
+            delay, failed = self._draw(self.index_error_rate)
+            kind = "index"
+            if self.fixtures and page <= self.pages:
+                html = self.fixtures.index_page(page, self.per_page)
+            else:
+                html = generated_index(page, self.pages, self.per_page, self.page_kb)
+        else:
+            match = CODE_IN_PATH.search(parts.path)
+            number = int(match.group(2)) - 10000 if match else 0
+            if not 1 <= number <= self.listings:
+                self._count("not_found")
+                return 404, "<html><body>Not found</body></html>"
+            delay, failed = self._draw(self.error_rate)
+            kind = "detail"
+            html = self.fixtures.detail_page(number) if self.fixtures else generated_detail(number, self.page_kb)
+
+        time.sleep(delay)
+        if failed:
+            self._count("errors")
+            return 503, "<html><body>Service Unavailable</body></html>"
+        self._count(kind)
+        return 200, html
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.requests[key] += 1
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve in a background thread. Returns the base URL."""
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status, html = site.respond(self.path)
+                body = html.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="mock-site", daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}"
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def record(out: str, base_url: str, details: int, delay: float = 2.0) -> None:
+    """Save the first index page and some listing pages of the real site as fixtures."""
+    import httpx
+
+    os.makedirs(os.path.join(out, "index"), exist_ok=True)
+    os.makedirs(os.path.join(out, "detail"), exist_ok=True)
+    search_url = f"{base_url}{SEARCH_PATH}?tipo_negocio=venta&tipo_inmueble=Apartamento,Casa,Townhouse&page=1"
+
+    with httpx.Client(follow_redirects=True, timeout=30.0, headers={"User-Agent": "Mozilla/5.0"}) as client:
+        index_html = client.get(search_url).raise_for_status().text
+        with open(os.path.join(out, "index", "page-1.html"), "w", encoding="utf-8") as f:
+            f.write(index_html)
+
+        hrefs = list(dict.fromkeys(LISTING_HREF.findall(index_html)))[:details]
+        for i, href in enumerate(hrefs):
+            time.sleep(delay)
+            url = href if href.startswith("http") else f"{base_url}/{href.lstrip('/')}"
+            html = client.get(url).raise_for_status().text
+            name = hashlib.sha1(url.encode()).hexdigest()[:12]
+            with open(os.path.join(out, "detail", f"{name}.html"), "w", encoding="utf-8") as f:
+                f.write(html)
+            logger.info(f"Recorded {i + 1}/{len(hrefs)}: {url}")
+
+
+def add_site_arguments(parser: argparse.ArgumentParser) -> None:
+    """Mock site options (shared with bench_crawl.py)."""
+    parser.add_argument("--pages", type=int, default=20, help="Index pages with listings (default: 20)")
+    parser.add_argument("--per-page", type=int, default=12, help="Listings per index page (default: 12)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean response delay in seconds (default: 0.2)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Delay standard deviation in seconds (default: 0.1)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of listing pages answered with 503")
+    parser.add_argument("--index-error-rate", type=float, default=0.0, help="Share of index pages answered with 503")
+    parser.add_argument("--page-kb", type=int, default=80, help="Boilerplate KB added to generated pages (default: 80)")
+    parser.add_argument("--fixtures", default=None, help="Replay recorded pages from this directory")
+
+
+def site_from_args(args) -> MockSite:
+    return MockSite(
+        pages=args.pages,
+        per_page=args.per_page,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        index_error_rate=args.index_error_rate,
+        page_kb=args.page_kb,
+        fixtures=args.fixtures,
+    )
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Local mock of the Rent-A-House site")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Serve the mock site until interrupted")
+    add_site_arguments(serve)
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+
+    rec = commands.add_parser("record", help="Record real pages as fixtures")
+    rec.add_argument("--out", required=True, help="Fixture directory")
+    rec.add_argument("--base-url", default="https://rentahouse.com.ve")
+    rec.add_argument("--details", type=int, default=10, help="Listing pages to record (default: 10)")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.out, args.base_url, args.details)
+        return
+
+    site = site_from_args(args)
+    base_url = site.start(args.host, args.port)
+    logger.info(f"Mock Rent-A-House at {base_url} ({site.pages} pages, {site.listings} listings)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.stop()
+        logger.info(f"Served: {site.requests}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Built-in profiler for long scraper runs (standard library only).
+
+- CPU: a background thread samples every thread's Python stack at a fixed
+  interval and counts collapsed stacks ("thread;[stage];frame;frame N"),
+  the input format of flamegraph.pl, speedscope and inferno. The current
+  stage (detail_page, translation, ...) comes from the metrics spans.
+- Memory: tracemalloc snapshots at checkpoints (startup, periodically,
+  end) are diffed against the first one, alongside the RSS of this
+  process and of child processes such as Chromium. Tracing every
+  allocation slows HTML parsing ~3x; trace_allocations=False keeps only
+  the RSS figures for timing-sensitive runs.
+
+Output (rewritten at every checkpoint, so a job killed midway still
+leaves a profile):
+
+- stacks.folded: collapsed stacks with sample counts
+- stages.json: share of samples per stage
+- memory.json / memory.txt: checkpoints and the top allocation growth
+
+Used by run.py --profile and the Modal workers; render a flamegraph with
+e.g. `flamegraph.pl stacks.folded > cpu.svg` or https://speedscope.app.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+BROWSER_NAMES = ("chrom", "headless_shell")
+
+
+# -----------------------------------------------------------------------------
+# Process memory (Linux /proc; zero elsewhere)
+# -----------------------------------------------------------------------------
+
+def children(pid: int) -> List[int]:
+    """Direct children of a process."""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def descendants(pid: int) -> List[int]:
+    """All processes below a process."""
+    found, pending = [], children(pid)
+    while pending:
+        child = pending.pop()
+        found.append(child)
+        pending.extend(children(child))
+    return found
+
+
+def process_memory(pid: int) -> int:
+    """Proportional set size of a process in bytes (RSS where PSS is unavailable).
+
+    PSS splits shared pages between the processes sharing them, so summing
+    it over Chromium's many processes does not count shared libraries twice.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return 0
+
+
+def process_name(pid: int) -> str:
+    try:
+        with open(f"/proc/{pid}/comm") as f:
+            return f.read().strip()
+    except OSError:
+        return "?"
+
+
+def children_memory(pid: Optional[int] = None) -> Dict[str, int]:
+    """Memory of a process's descendants, grouped into "browser" and "other"."""
+    usage = {"browser": 0, "other": 0}
+    for child in descendants(pid or os.getpid()):
+        group = "browser" if any(name in process_name(child).lower() for name in BROWSER_NAMES) else "other"
+        usage[group] += process_memory(child)
+    return usage
+
+
+# -----------------------------------------------------------------------------
+# CPU stack sampling
+# -----------------------------------------------------------------------------
+
+def _frame_label(code) -> str:
+    parts = code.co_filename.replace("\\", "/").split("/")
+    return f"{code.co_name} ({'/'.join(parts[-2:])})"
+
+
+class StackSampler:
+    """Counts collapsed Python stacks of all threads, sampled at a fixed interval."""
+
+    def __init__(self, interval: float = 0.02, stage_of: Optional[Callable[[int], Optional[str]]] = None):
+        """Initialize the sampler.
+
+        Args:
+            interval: Seconds between samples
+            stage_of: Current stage of a thread (by ident), e.g. Metrics.active_stage
+        """
+        self.interval = interval
+        self.stage_of = stage_of
+        self.stacks: Counter = Counter()
+        self.stages: Counter = Counter()
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.on_tick: Optional[Callable[[], None]] = None  # called from the sampler thread
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            sampled = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stage = (self.stage_of(ident) if self.stage_of else None) or "-"
+                root = [names.get(ident, f"thread-{ident}"), f"[{stage}]"]
+                sampled.append((";".join(root + frames[::-1]), stage))
+            with self._lock:
+                self.samples += 1
+                for stack, stage in sampled:
+                    self.stacks[stack] += 1
+                    self.stages[stage] += 1
+            if self.on_tick:
+                self.on_tick()
+
+    def folded(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def stage_report(self) -> dict:
+        with self._lock:
+            total = sum(self.stages.values()) or 1
+            return {
+                "interval_s": self.interval,
+                "samples": self.samples,
+                "stages": {
+                    stage: {"samples": count, "share": round(count / total, 4)}
+                    for stage, count in self.stages.most_common()
+                },
+            }
+
+
+# -----------------------------------------------------------------------------
+# Memory checkpoints
+# -----------------------------------------------------------------------------
+
+class MemoryTracker:
+    """tracemalloc snapshots and process memory at checkpoints."""
+
+    def __init__(self, trace: bool = True, top: int = 15, frames: int = 1):
+        """Initialize the tracker.
+
+        Args:
+            trace: Trace allocations with tracemalloc (slows allocation-heavy
+                code such as HTML parsing ~3x); otherwise only RSS is recorded
+            top: Allocation sites listed per checkpoint
+            frames: Traceback depth stored per allocation
+        """
+        self.trace = trace
+        self.top = top
+        self.frames = frames
+        self.checkpoints: List[dict] = []
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._started = time.time()
+
+    def start(self) -> None:
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self) -> None:
+        if self.trace:
+            tracemalloc.stop()
+
+    def checkpoint(self, label: str) -> dict:
+        growth, traced, peak = [], 0, 0
+        if self.trace:
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ])
+            if self._baseline is None:
+                self._baseline = snapshot
+            growth = snapshot.compare_to(self._baseline, "lineno")[:self.top]
+            traced, peak = tracemalloc.get_traced_memory()
+        child = children_memory()
+
+        entry = {
+            "label": label,
+            "elapsed_s": round(time.time() - self._started, 1),
+            "python_rss_mb": round(process_memory(os.getpid()) / 2 ** 20, 1),
+            "browser_rss_mb": round(child["browser"] / 2 ** 20, 1),
+            "other_children_rss_mb": round(child["other"] / 2 ** 20, 1),
+            "traced_mb": round(traced / 2 ** 20, 1),
+            "traced_peak_mb": round(peak / 2 ** 20, 1),
+            "growth": [
+                {
+                    "where": str(stat.traceback[0]) if stat.traceback else "?",
+                    "size_kb": round(stat.size_diff / 1024, 1),
+                    "count": stat.count_diff,
+                }
+                for stat in growth if stat.size_diff > 0
+            ],
+        }
+        self.checkpoints.append(entry)
+        return entry
+
+    def report_text(self) -> str:
+        lines = [
+            f"{'checkpoint':<24} {'elapsed':>9} {'python':>9} {'browser':>9} {'other':>9} {'traced':>9}",
+        ]
+        for c in self.checkpoints:
+            lines.append(
+                f"{c['label'][:24]:<24} {c['elapsed_s']:>8.0f}s {c['python_rss_mb']:>7.1f}MB "
+                f"{c['browser_rss_mb']:>7.1f}MB {c['other_children_rss_mb']:>7.1f}MB {c['traced_mb']:>7.1f}MB"
+            )
+        if self.trace and self.checkpoints:
+            last = self.checkpoints[-1]
+            lines += ["", f"Top allocation growth since '{self.checkpoints[0]['label']}' (at '{last['label']}'):"]
+            lines += [f"  {g['size_kb']:>10.1f} KB  {g['count']:>+8} blocks  {g['where']}" for g in last["growth"]]
+        return "\n".join(lines) + "\n"
+
+
+# -----------------------------------------------------------------------------
+# Profiler
+# -----------------------------------------------------------------------------
+
+class Profiler:
+    """CPU stack sampling plus memory checkpoints, written to a directory."""
+
+    def __init__(
+        self,
+        out_dir: str,
+        interval: float = 0.02,
+        checkpoint_every: float = 300.0,
+        stage_of: Optional[Callable[[int], Optional[str]]] = None,
+        trace_allocations: bool = True,
+    ):
+        """Initialize the profiler.
+
+        Args:
+            out_dir: Directory for stacks.folded, stages.json and memory reports
+            interval: Seconds between stack samples
+            checkpoint_every: Seconds between periodic memory checkpoints
+            stage_of: Current stage of a thread (by ident), e.g. Metrics.active_stage
+            trace_allocations: Diff tracemalloc snapshots (see MemoryTracker)
+        """
+        self.out_dir = out_dir
+        self.checkpoint_every = checkpoint_every
+        self.sampler = StackSampler(interval, stage_of)
+        self.memory = MemoryTracker(trace=trace_allocations)
+        self._lock = threading.Lock()
+        self._next_checkpoint = 0.0
+
+    def __enter__(self) -> "Profiler":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self) -> "Profiler":
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.memory.start()
+        self.checkpoint("start")
+        self._next_checkpoint = time.time() + self.checkpoint_every
+        self.sampler.on_tick = self._tick
+        self.sampler.start()
+        logger.info(f"🔬 Profiling to {self.out_dir} (stack sample every {self.sampler.interval * 1000:.0f}ms)")
+        return self
+
+    def _tick(self) -> None:
+        if time.time() >= self._next_checkpoint:
+            self._next_checkpoint = time.time() + self.checkpoint_every
+            self.checkpoint("periodic")
+
+    def checkpoint(self, label: str) -> None:
+        """Take a memory checkpoint and rewrite the output files."""
+        with self._lock:
+            try:
+                entry = self.memory.checkpoint(label)
+                self._write()
+            except Exception as e:
+                logger.warning(f"Profiler checkpoint '{label}' failed: {e}")
+                return
+        logger.info(
+            f"🔬 Checkpoint '{label}': python {entry['python_rss_mb']:.0f}MB, "
+            f"browser {entry['browser_rss_mb']:.0f}MB, traced {entry['traced_mb']:.0f}MB"
+        )
+
+    def stop(self) -> None:
+        self.sampler.stop()
+        self.checkpoint("end")
+        self.memory.stop()
+        stages = self.sampler.stage_report()["stages"]
+        top = ", ".join(f"{stage} {s['share']:.0%}" for stage, s in list(stages.items())[:5])
+        logger.info(f"🔬 Profile written to {self.out_dir} ({self.sampler.samples} samples; {top})")
+
+    def _write(self) -> None:
+        files = {
+            "stacks.folded": self.sampler.folded(),
+            "stages.json": json.dumps(self.sampler.stage_report(), indent=2),
+            "memory.json": json.dumps(self.memory.checkpoints, indent=2),
+            "memory.txt": self.memory.report_text(),
+        }
+        for name, content in files.items():
+            path = os.path.join(self.out_dir, name)
+            with open(f"{path}.tmp", "w") as f:
+                f.write(content)
+            os.replace(f"{path}.tmp", path)
@@ -10,21 +10,31 @@ import sys
 import logging
 import uuid
 import time
+_PROCESS_START = time.perf_counter()  # for the startup timing log
 import argparse
+import queue
+import signal
+import threading
 from datetime import datetime, timedelta
-from typing import List, Optional, Generator, Tuple
+from typing import TYPE_CHECKING, List, Optional, Generator, Tuple
+from collections import deque
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 
-from playwright.sync_api import sync_playwright, Browser, Page
-from bs4 import BeautifulSoup
-from supabase import create_client, Client
 from pydantic import BaseModel, Field, field_validator
 from tenacity import retry, stop_after_attempt, wait_exponential
 import re
-import httpx
 import hashlib
+import json
 from pathlib import Path
 
+# Heavy modules (Playwright, Supabase, BeautifulSoup, Gemini, httpx) are imported
+# where they are first used, so --help, --reconcile-only and imports of this
+# module stay fast and the browser launch can overlap storage setup.
+if TYPE_CHECKING:
+    from playwright.sync_api import Browser
+    from supabase import Client
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -32,13 +42,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Import translator for English conversion
-try:
-    from translator import PropertyTranslator
-    TRANSLATION_ENABLED = True
-except ImportError:
-    TRANSLATION_ENABLED = False
-    logger.warning("Translation module not available - listings will be stored in Spanish")
+from browser_health import BrowserWatchdog
+from manifest import RunManifest
+from metrics import get_metrics
+from seen_filter import SeenSet
+from sharding import Shard, listing_key, read_discovery, write_discovery
+from staging import SQLiteStagingStore, TRANSLATION_FIELDS, content_hash
 
 
 # =============================================================================
@@ -114,37 +123,144 @@ class PropertyListing(BaseModel):
 # Playwright Extractor
 # =============================================================================
 
+def _soup(html: str):
+    """Parse HTML with BeautifulSoup/lxml (imported on first use)."""
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, 'lxml')
+
+
 class PlaywrightExtractor:
     """Extract listings using Playwright and BeautifulSoup - $0 cost!"""
 
-    def __init__(self, storage=None):
-        self.browser: Browser = None
+    def __init__(self, storage=None, translator: str = "gemini", watchdog: Optional[BrowserWatchdog] = None):
+        """Initialize the extractor.
+
+        Args:
+            storage: Storage backend (for smart translation; may be set later)
+            translator: "gemini", "fake" (simulated, see fakes.py) or "none"
+            watchdog: Browser health limits (default: BrowserWatchdog())
+        """
+        self.browser: Optional["Browser"] = None
         self.playwright = None
         self.translator = None
         self.storage = storage
-
-        # Initialize translator if enabled
-        if TRANSLATION_ENABLED:
-            try:
-                self.translator = PropertyTranslator()
-                logger.info("✅ Translation enabled - listings will be converted to English")
-                logger.info("💡 Smart translation: Only new/changed listings will be translated")
-            except Exception as e:
-                logger.warning(f"Translation initialization failed: {e}")
-                self.translator = None
+        self.seen = SeenSet()  # known / already processed listings (replaced once storage is up)
+        self.manifest = RunManifest()  # what this job saw, wrote and failed (saved with --manifest)
+        self.metrics = get_metrics()  # stage spans and counters (exported with --metrics)
+        self.watchdog = watchdog or BrowserWatchdog()
+        self.replay: List[str] = []  # detail URLs to retry after a browser restart
+        self._replayed = set()  # each URL is replayed at most once
+
+        if translator == "none":
+            logger.info("Translation disabled - listings will be stored in Spanish")
+            return
+        if translator == "fake":
+            from fakes import FakeTranslator
+            self.translator = FakeTranslator()
+            return
+
+        # Initialize translator if available (imports Gemini, so only done here)
+        try:
+            from translator import PropertyTranslator
+        except ImportError:
+            logger.warning("Translation module not available - listings will be stored in Spanish")
+            return
+        try:
+            self.translator = PropertyTranslator()
+            logger.info("✅ Translation enabled - listings will be converted to English")
+            logger.info("💡 Smart translation: Only new/changed listings will be translated")
+        except Exception as e:
+            logger.warning(f"Translation initialization failed: {e}")
+            self.translator = None
 
     def __enter__(self):
         """Context manager entry - start browser."""
+        return self.start()
+
+    def start(self) -> "PlaywrightExtractor":
+        """Launch the browser (must be used from the thread that launched it)."""
+        from playwright.sync_api import sync_playwright
+
         self.playwright = sync_playwright().start()
         self.browser = self.playwright.chromium.launch(headless=True)
         return self
 
+    def restart_browser(self, reason: str) -> None:
+        """Relaunch Chromium after a crash, or before leaks and hangs fail every listing."""
+        logger.warning(
+            f"♻️  Restarting browser ({reason}) after {self.watchdog.loads} page loads "
+            f"(timeouts {self.watchdog.timeout_rate:.0%}, browser {self.watchdog.browser_mb:.0f}MB)"
+        )
+        with self.metrics.span("browser_restart"):
+            try:
+                self.browser.close()
+            except Exception as e:
+                logger.debug(f"Closing the old browser failed: {e}")
+            self.browser = self.playwright.chromium.launch(headless=True)
+        self.metrics.inc("browser_restarts", reason=reason)
+
+        replay = [url for url in self.watchdog.reset() if url not in self._replayed]
+        self._replayed.update(replay)
+        self.replay.extend(replay)
+        if replay:
+            logger.info(f"♻️  Replaying {len(replay)} listings that failed while the browser degraded")
+
+    def _open_pages(self) -> int:
+        try:
+            return sum(len(context.pages) for context in self.browser.contexts)
+        except Exception:
+            return 0
+
+    def load_page(self, url: str, timeout: float = 30000, replay: bool = False) -> str:
+        """Load a page in a new tab and return its HTML.
+
+        Restarts the browser first if the watchdog says so. A load that fails
+        because the browser crashed is retried once on a relaunched browser.
+
+        Args:
+            url: Page URL
+            timeout: Navigation timeout (milliseconds)
+            replay: Queue the URL in self.replay if a later restart shows
+                the browser was to blame for its failure
+        """
+        reason = self.watchdog.check(self._open_pages())
+        if reason:
+            self.restart_browser(reason)
+
+        for attempt in (1, 2):
+            page = None
+            try:
+                page = self.browser.new_page()
+                page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+                html = page.content()
+            except Exception as e:
+                self.watchdog.record(url, e, replay=replay)
+                if attempt == 1 and self.watchdog.crashed:
+                    self._replayed.add(url)  # retried right here
+                    self.restart_browser("crash")
+                    continue
+                raise
+            finally:
+                if page:
+                    try:
+                        page.close()
+                    except Exception:
+                        pass  # the tab went down with the browser
+            self.watchdog.record(url)
+            return html
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit - close browser."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the browser and stop Playwright."""
         if self.browser:
             self.browser.close()
+            self.browser = None
         if self.playwright:
             self.playwright.stop()
+            self.playwright = None
 
     def needs_translation(self, source_url: str, title: str, description_full: str) -> Tuple[bool, dict]:
         """Check if a listing needs translation.
@@ -166,13 +282,15 @@ class PlaywrightExtractor:
             # No storage connection - translate everything
             return True, {}
 
-        try:
-            # Query database for existing listing
-            result = self.storage.client.table("listings").select(
-                "title_en, title_es, description_short_en, description_full_en, description_full_es, translation_model"
-            ).eq("source_url", source_url).single().execute()
+        if not self.seen.is_known(source_url):
+            # Definitely new (not in the seen filter) - no need to ask storage
+            logger.debug(f"New listing, needs translation: {source_url}")
+            self.metrics.inc("seen_filter_hits", check="translation")
+            return True, {}
 
-            existing = result.data if result.data else None
+        try:
+            # Query storage for existing listing
+            existing = self.storage.get_translation_state(source_url)
 
             if not existing:
                 # New listing - needs translation
@@ -196,12 +314,7 @@ class PlaywrightExtractor:
 
             # Already translated and content unchanged - return existing translations
             logger.debug(f"Already translated, skipping: {source_url}")
-            existing_translations = {
-                'title_en': existing.get('title_en'),
-                'description_short_en': existing.get('description_short_en'),
-                'description_full_en': existing.get('description_full_en'),
-                'translation_model': existing.get('translation_model')
-            }
+            existing_translations = {field: existing.get(field) for field in TRANSLATION_FIELDS}
             return False, existing_translations
 
         except Exception as e:
@@ -209,20 +322,21 @@ class PlaywrightExtractor:
             logger.debug(f"Error checking translation status, defaulting to translate: {e}")
             return True, {}
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=2, max=30))
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(min=2, max=30),
+        before_sleep=lambda state: get_metrics().inc("retries", stage="index_page"),
+    )
     def extract_listings(self, url: str, base_url: str) -> List[PropertyListing]:
         """Extract ALL listings from a BienesOnline page."""
         logger.info(f"Scraping: {url}")
 
         try:
             # Load page with Playwright
-            page = self.browser.new_page()
-            page.goto(url, wait_until="domcontentloaded")
-            html = page.content()
-            page.close()
+            html = self.load_page(url)
 
             # Parse with BeautifulSoup
-            soup = BeautifulSoup(html, 'lxml')
+            soup = _soup(html)
             listings = []
 
             # Find all property cards - BienesOnline specific selectors
@@ -371,10 +485,11 @@ class PlaywrightExtractor:
         max_pages: int = 5,
         start_page: int = 1,
         end_page: Optional[int] = None,
-        storage=None,
-        source_id: str = None
+        writer: Optional["ListingWriter"] = None,
+        shard: Optional[Shard] = None,
+        rate_limit: float = 10.0
     ) -> List[PropertyListing]:
-        """Extract listings from Rent-A-House with pagination support and batch uploads.
+        """Extract listings from Rent-A-House with pagination support.
 
         Args:
             url: Base search URL (can include filters)
@@ -382,155 +497,230 @@ class PlaywrightExtractor:
             max_pages: Maximum pages to scrape (used if end_page not specified)
             start_page: Starting page number (for distributed scraping)
             end_page: Ending page number (for distributed scraping)
-            storage: SupabaseStorage instance for batch uploads
-            source_id: Source identifier for database
+            writer: Write-behind buffer; listings are handed to it as soon as
+                they are parsed instead of being collected
+            shard: Only fetch details of the listings this shard owns
+            rate_limit: Delay between index pages (seconds)
 
         Returns:
-            List of PropertyListing objects
+            List of PropertyListing objects (empty when a writer is given)
+        """
+        all_listings = []
+
+        for page_num, page_urls in self.discover_rentahouse_urls(
+            url, base_url, max_pages, start_page, end_page, rate_limit=rate_limit
+        ):
+            page_start_time = time.time()
+            all_listings.extend(self.extract_rentahouse_details(page_urls, base_url, writer=writer, shard=shard))
+
+            # Page timing summary
+            page_total_time = time.time() - page_start_time
+            logger.info(f"⏱️  Page {page_num} total: {page_total_time:.2f}s")
+
+        if writer:
+            logger.info(f"Total Rent-A-House listings extracted: {writer.stats['submitted']} (handed to writer)")
+        else:
+            logger.info(f"Total Rent-A-House listings extracted: {len(all_listings)}")
+        return all_listings
+
+    def discover_rentahouse_urls(
+        self,
+        url: str,
+        base_url: str,
+        max_pages: int = 5,
+        start_page: int = 1,
+        end_page: Optional[int] = None,
+        rate_limit: float = 10.0
+    ) -> Generator[Tuple[int, List[str]], None, None]:
+        """Walk Rent-A-House index pages, yielding (page number, listing URLs) per page.
+
+        Index pages are only used for discovery; listing details are fetched
+        by extract_rentahouse_details().
         """
         actual_end_page = end_page if end_page is not None else (start_page + max_pages - 1)
 
         logger.info(f"Scraping Rent-A-House: {url}")
         logger.info(f"📄 Page range: {start_page} to {actual_end_page} ({actual_end_page - start_page + 1} pages)")
 
-        all_listings = []
-        batch_size = 10  # Upload every 10 pages
-        total_uploaded = 0
-
         for page_num in range(start_page, actual_end_page + 1):
             try:
-                page_start_time = time.time()
-
                 # Append page parameter (handle existing query params)
                 separator = '&' if '?' in url else '?'
                 page_url = f"{url}{separator}page={page_num}"
                 logger.info(f"Scraping page {page_num}: {page_url}")
 
                 # Load page
-                load_start = time.time()
-                page = self.browser.new_page()
-                page.goto(page_url, wait_until="domcontentloaded")
-                html = page.content()
-                page.close()
-                load_time = time.time() - load_start
-                logger.info(f"⏱️  Page load: {load_time:.2f}s")
+                with self.metrics.span("index_page") as span:
+                    html = self.load_page(page_url)
+                self.metrics.inc("page_bytes", len(html), kind="index")
+                logger.info(f"⏱️  Page load: {span.elapsed:.2f}s")
 
                 # Parse with BeautifulSoup
-                soup = BeautifulSoup(html, 'lxml')
+                soup = _soup(html)
 
                 # Find all property links
                 # Pattern: /[property-type]_en_[sale/rental]_en_[city]_en_[neighborhood]_rah-[code].html
                 property_links = soup.find_all('a', href=re.compile(r'_rah-\d+.*\.html'))
+            except Exception as e:
+                logger.error(f"Failed to scrape page {page_num}: {e}")
+                self.manifest.record_failure(page_url, "index_page", e)
+                continue
 
-                if not property_links:
-                    logger.info(f"No properties found on page {page_num}, stopping pagination")
-                    break
+            if not property_links:
+                logger.info(f"No properties found on page {page_num}, stopping pagination")
+                break
 
-                logger.info(f"Found {len(property_links)} property links on page {page_num}")
+            logger.info(f"Found {len(property_links)} property links on page {page_num}")
 
-                # Extract unique URLs
-                seen_urls = set()
-                for link in property_links:
-                    source_url = link.get('href', '')
-                    if not source_url or source_url in seen_urls:
-                        continue
+            # Unique, absolute URLs
+            page_urls = []
+            for link in property_links:
+                source_url = link.get('href', '')
+                if not source_url:
+                    continue
+                if not source_url.startswith('http'):
+                    source_url = f"{base_url.rstrip('/')}/{source_url.lstrip('/')}"
+                if source_url not in page_urls:
+                    page_urls.append(source_url)
 
-                    seen_urls.add(source_url)
+            yield page_num, page_urls
 
-                    # Make URL absolute
-                    if not source_url.startswith('http'):
-                        source_url = f"{base_url.rstrip('/')}/{source_url.lstrip('/')}"
+            # Rate limiting between pages
+            if page_num < actual_end_page:
+                time.sleep(rate_limit)
 
-                    # Visit individual listing page to get all details
-                    try:
-                        parse_start = time.time()
-                        raw_data = self._parse_rentahouse_listing(source_url, base_url)
-                        parse_time = time.time() - parse_start
-
-                        if raw_data and raw_data.get('title'):
-                            logger.info(f"⏱️  Property parse: {parse_time:.2f}s")
-
-                            # Filter: Only residential properties (apartment, house)
-                            property_type = raw_data.get('property_type', '').lower()
-                            if property_type in ['commercial', 'office', 'building']:
-                                logger.info(f"Skipping commercial property: {raw_data.get('title', '')[:60]}")
-                                continue
-
-                            # Filter: Only for-sale properties (exclude rentals)
-                            transaction_type = raw_data.get('transaction_type', '').lower()
-                            if transaction_type == 'rent':
-                                logger.info(f"Skipping rental property: {raw_data.get('title', '')[:60]}")
-                                continue
-
-                            # Smart translation: Only translate new or changed listings
-                            if self.translator:
-                                try:
-                                    # Check if translation is needed
-                                    title = raw_data.get('title', '')
-                                    desc_full = raw_data.get('description_full', '')
-
-                                    trans_check_start = time.time()
-                                    needs_trans, existing_trans = self.needs_translation(source_url, title, desc_full)
-                                    trans_check_time = time.time() - trans_check_start
-
-                                    if needs_trans:
-                                        # Translate the listing
-                                        trans_start = time.time()
-                                        raw_data = self.translator.translate_listing(raw_data)
-                                        trans_time = time.time() - trans_start
-                                        logger.info(f"✅ Translated: {title[:60]}... (check: {trans_check_time:.2f}s, translate: {trans_time:.2f}s)")
-                                    else:
-                                        # Use existing translations from database
-                                        raw_data.update(existing_trans)
-                                        logger.debug(f"⏭️  Skipped translation (unchanged): {title[:60]}... (check: {trans_check_time:.2f}s)")
-                                except Exception as e:
-                                    logger.warning(f"Translation failed for {source_url}: {e}")
-
-                            listing = PropertyListing(**raw_data)
-                            all_listings.append(listing)
-                            title_display = raw_data.get('title_en') or listing.title
-                            logger.info(f"Extracted: {title_display[:60]}...")
-                        else:
-                            logger.warning(f"No data extracted for {source_url}")
-                    except Exception as e:
-                        logger.warning(f"Failed to parse {source_url}: {e}")
-                        continue
+    def extract_rentahouse_details(
+        self,
+        urls: List[str],
+        base_url: str,
+        writer: Optional["ListingWriter"] = None,
+        shard: Optional[Shard] = None
+    ) -> List[PropertyListing]:
+        """Fetch and parse Rent-A-House listing pages.
 
-                # Batch upload every 10 pages
-                if storage and source_id and page_num % batch_size == 0 and all_listings:
-                    logger.info(f"📦 Uploading batch of {len(all_listings)} listings after page {page_num}...")
-                    upload_start = time.time()
-                    result = storage.upsert_listings(all_listings, source_id)
-                    upload_time = time.time() - upload_start
-                    total_uploaded += result.get('upserted', 0)
-                    logger.info(f"✅ Batch uploaded: {result.get('upserted', 0)} upserted, {result.get('errors', 0)} errors. Total uploaded so far: {total_uploaded} (upload time: {upload_time:.2f}s)")
-                    all_listings = []  # Clear batch
+        Skips listings another shard owns and listings this run already
+        processed, so no detail page is fetched twice per run. The seen
+        filter answers from memory; only its (possibly false) positives for
+        other jobs of the run are confirmed against storage (last_seen_run_id).
 
-                # Page timing summary
-                page_total_time = time.time() - page_start_time
-                logger.info(f"⏱️  Page {page_num} total: {page_total_time:.2f}s")
+        Args:
+            urls: Absolute listing URLs
+            base_url: Base domain URL
+            writer: Write-behind buffer (listings are collected when None)
+            shard: Only fetch the listings this shard owns
 
-                # Rate limiting between pages
-                if page_num < max_pages:
-                    time.sleep(10)
+        Returns:
+            List of PropertyListing objects (empty when a writer is given)
+        """
+        listings = []
 
-            except Exception as e:
-                logger.error(f"Failed to scrape page {page_num}: {e}")
+        pending = []
+        maybe_seen = []
+        for source_url in urls:
+            if shard and not shard.owns(source_url):
+                continue
+            if listing_key(source_url) in self.seen.processed:
+                self.metrics.inc("listings_skipped", reason="processed")
                 continue
+            if self.seen.maybe_processed(source_url):
+                maybe_seen.append(source_url)
+            else:
+                pending.append(source_url)
+            self.seen.add(source_url)
 
-        logger.info(f"Total Rent-A-House listings extracted: {len(all_listings)} (plus {total_uploaded} already uploaded)")
-        return all_listings
+        if maybe_seen:
+            seen = set()
+            if self.storage:
+                try:
+                    seen = self.storage.seen_in_run(maybe_seen)
+                except Exception as e:
+                    logger.warning(f"Could not check listings seen by other jobs: {e}")
+            if seen:
+                logger.info(f"⏭️  Skipping {len(seen)} listings already scraped in this run")
+                self.metrics.inc("listings_skipped", len(seen), reason="seen_in_run")
+            pending += [source_url for source_url in maybe_seen if source_url not in seen]
+
+        todo = deque(pending)
+        while todo:
+            source_url = todo.popleft()
+            self.manifest.record_seen(source_url)
+            try:
+                with self.metrics.span("detail_page") as parse_span:
+                    raw_data = self._parse_rentahouse_listing(source_url, base_url)
+
+                if raw_data and raw_data.get('title'):
+                    logger.info(f"⏱️  Property parse: {parse_span.elapsed:.2f}s")
+
+                    # Filter: Only residential properties (apartment, house)
+                    property_type = raw_data.get('property_type', '').lower()
+                    if property_type in ['commercial', 'office', 'building']:
+                        logger.info(f"Skipping commercial property: {raw_data.get('title', '')[:60]}")
+                        continue
+
+                    # Filter: Only for-sale properties (exclude rentals)
+                    transaction_type = raw_data.get('transaction_type', '').lower()
+                    if transaction_type == 'rent':
+                        logger.info(f"Skipping rental property: {raw_data.get('title', '')[:60]}")
+                        continue
+
+                    # Smart translation: Only translate new or changed listings
+                    if self.translator:
+                        try:
+                            # Check if translation is needed
+                            title = raw_data.get('title', '')
+                            desc_full = raw_data.get('description_full', '')
+
+                            with self.metrics.span("translation_check") as check_span:
+                                needs_trans, existing_trans = self.needs_translation(source_url, title, desc_full)
+
+                            if needs_trans:
+                                # Translate the listing
+                                with self.metrics.span("translation") as trans_span:
+                                    raw_data = self.translator.translate_listing(raw_data)
+                                logger.info(f"✅ Translated: {title[:60]}... (check: {check_span.elapsed:.2f}s, translate: {trans_span.elapsed:.2f}s)")
+                            else:
+                                # Use existing translations from database
+                                raw_data.update(existing_trans)
+                                self.metrics.inc("translation_cache_hits")
+                                logger.debug(f"⏭️  Skipped translation (unchanged): {title[:60]}... (check: {check_span.elapsed:.2f}s)")
+                        except Exception as e:
+                            logger.warning(f"Translation failed for {source_url}: {e}")
+                            self.manifest.record_failure(source_url, "translation", e)
+
+                    listing = PropertyListing(**raw_data)
+                    if writer:
+                        writer.add(listing)
+                    else:
+                        listings.append(listing)
+                    title_display = raw_data.get('title_en') or listing.title
+                    logger.info(f"Extracted: {title_display[:60]}...")
+                else:
+                    logger.warning(f"No data extracted for {source_url}")
+                    self.manifest.record_failure(source_url, "detail_page", "no data extracted")
+            except Exception as e:
+                logger.warning(f"Failed to parse {source_url}: {e}")
+                self.manifest.record_failure(source_url, "detail_page", e)
+            finally:
+                # Listings that failed while the browser degraded get another try on the new one
+                while self.replay:
+                    replay_url = self.replay.pop(0)
+                    self.manifest.clear_failure(replay_url)
+                    self.metrics.inc("listings_replayed")
+                    todo.append(replay_url)
+
+        return listings
 
     def _parse_rentahouse_listing(self, url: str, base_url: str) -> dict:
-        """Parse a single Rent-A-House listing page with proper HTML structure parsing."""
-        try:
-            # Load listing page
-            page = self.browser.new_page()
-            page.goto(url, wait_until="domcontentloaded", timeout=30000)
-            html = page.content()
-            page.close()
+        """Parse a single Rent-A-House listing page with proper HTML structure parsing.
 
-            soup = BeautifulSoup(html, 'lxml')
+        Page load failures propagate (the browser watchdog counts them and
+        the caller records them); parse errors return an empty dict.
+        """
+        html = self.load_page(url, timeout=30000, replay=True)
+        self.metrics.inc("page_bytes", len(html), kind="detail")
+
+        try:
+            soup = _soup(html)
             data = {"source_url": url}
 
             # Title - from meta tag or h1
@@ -726,7 +916,7 @@ class PlaywrightExtractor:
                             amenities.append('concierge')
 
             if amenities:
-                data['amenities'] = list(set(amenities))  # Remove duplicates
+                data['amenities'] = sorted(set(amenities))  # Remove duplicates (stable order for content hash)
 
             # Agent name and office
             agent_card = soup.find('div', class_='agent-card')
@@ -816,13 +1006,36 @@ class SupabaseStorage:
         "Falcon", "Portuguesa", "Barinas", "Guarico", "Monagas", "Sucre",
     ]
 
-    def __init__(self):
+    def __init__(self, run_id: Optional[str] = None):
         url = os.environ.get("SUPABASE_URL")
         key = os.environ.get("SUPABASE_KEY")
         if not url or not key:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY required")
-        self.client: Client = create_client(url, key)
-        self.http_client = httpx.Client(timeout=30.0, follow_redirects=True)
+        from images import ImageManifest, ImagePipeline
+        from transport import get_transport
+
+        # PostgREST, Storage and image traffic share one pooled transport
+        self.transport = get_transport()
+        self.client: "Client" = self.transport.supabase_client(url, key)
+
+        # Every row this run writes or touches is stamped with the run id (for reconciliation)
+        self.run_id = run_id or str(uuid.uuid4())[:8]
+        self.started_at = datetime.utcnow().isoformat()
+        self.seen = 0  # listings upserted or touched by this run
+
+        # Load already-hosted images up front so unchanged photos are never re-downloaded
+        manifest = ImageManifest()
+        try:
+            manifest.load(self.client)
+        except Exception as e:
+            logger.warning(f"Could not load image manifest, all images will be uploaded: {e}")
+        self.images = ImagePipeline(url, key, manifest=manifest, transport=self.transport)
+
+    def close(self):
+        """Shut down the image pipeline and the shared transport."""
+        self.images.close()
+        self.transport.stats.log_summary()
+        self.transport.close()
 
     @staticmethod
     def _slugify(text: str) -> str:
@@ -867,153 +1080,371 @@ class SupabaseStorage:
 
         return '-'.join(parts)
 
-    def download_and_upload_image(self, image_url: str, property_id: str, index: int = 0) -> Optional[str]:
-        """Download image and upload to Supabase Storage. Returns public URL or None."""
-        try:
-            # Download image
-            response = self.http_client.get(image_url)
-            response.raise_for_status()
-            image_data = response.content
-
-            # Generate filename: property-id/image-0.jpg
-            ext = Path(image_url).suffix or '.jpg'
-            filename = f"{property_id}/image-{index}{ext}"
-
-            # Upload to Supabase Storage bucket 'property-images'
-            # Note: Bucket must be created in Supabase dashboard first
-            self.client.storage.from_("property-images").upload(
-                filename,
-                image_data,
-                file_options={"content-type": response.headers.get("content-type", "image/jpeg"), "upsert": "true"}
+    @staticmethod
+    def _content_hash(listing: PropertyListing) -> str:
+        """Stable hash of the scraped fields of a listing (used for change detection)."""
+        return content_hash(listing.model_dump())
+
+    def get_translation_state(self, source_url: str) -> Optional[dict]:
+        """Stored translation fields for a listing (None if unknown)."""
+        result = self.client.table("listings").select(
+            ", ".join(TRANSLATION_FIELDS)
+        ).eq("source_url", source_url).single().execute()
+        return result.data if result.data else None
+
+    def _existing_hashes(self, source_urls: List[str], chunk_size: int = 50) -> dict:
+        """Fetch stored content hashes for a batch of listings, keyed by source_url."""
+        hashes = {}
+        for i in range(0, len(source_urls), chunk_size):
+            result = (
+                self.client.table("listings")
+                .select("source_url, content_hash")
+                .in_("source_url", source_urls[i:i + chunk_size])
+                .execute()
+            )
+            for row in result.data or []:
+                hashes[row["source_url"]] = row.get("content_hash")
+        return hashes
+
+    def iter_source_urls(self, source: str, page_size: int = 1000) -> Generator[str, None, None]:
+        """All stored listing URLs of a source (keyset pagination, for building the seen filter)."""
+        last = ""
+        while True:
+            result = (
+                self.client.table("listings")
+                .select("source_url")
+                .eq("source", source)
+                .gt("source_url", last)
+                .order("source_url")
+                .limit(page_size)
+                .execute()
             )
+            rows = result.data or []
+            for row in rows:
+                yield row["source_url"]
+            if len(rows) < page_size:
+                return
+            last = rows[-1]["source_url"]
+
+    def seen_in_run(self, source_urls: List[str], chunk_size: int = 50) -> set:
+        """Listings already stored or touched by this run (e.g. by another shard)."""
+        seen = set()
+        for i in range(0, len(source_urls), chunk_size):
+            result = (
+                self.client.table("listings")
+                .select("source_url")
+                .in_("source_url", source_urls[i:i + chunk_size])
+                .eq("last_seen_run_id", self.run_id)
+                .execute()
+            )
+            seen.update(row["source_url"] for row in result.data or [])
+        return seen
 
-            # Get public URL
-            public_url = self.client.storage.from_("property-images").get_public_url(filename)
-            logger.info(f"Uploaded image: {filename}")
-            return public_url
+    def touch_listings(self, source_urls: List[str], now: str, chunk_size: int = 200) -> int:
+        """Mark unchanged listings as seen with one set-based update per chunk.
 
-        except Exception as e:
-            logger.warning(f"Failed to download/upload image {image_url}: {e}")
-            return None
+        Only last_seen_at/active are written; scraped_at and content stay as they are.
+        """
+        from postgrest.types import ReturnMethod
+
+        touched = 0
+        for i in range(0, len(source_urls), chunk_size):
+            chunk = source_urls[i:i + chunk_size]
+            (
+                self.client.table("listings")
+                .update(
+                    {"last_seen_at": now, "active": True, "last_seen_run_id": self.run_id},
+                    returning=ReturnMethod.minimal,
+                )
+                .in_("source_url", chunk)
+                .execute()
+            )
+            touched += len(chunk)
+        return touched
 
     def upsert_listings(self, listings: List[PropertyListing], source: str) -> dict:
-        """Upsert listings to database."""
+        """Upsert listings to database.
+
+        Listings whose content hash matches the stored row only get their
+        last_seen_at/active bumped in bulk; changed and new listings get
+        their images re-hosted and a full upsert.
+        """
+        from postgrest.types import ReturnMethod
+
         if not listings:
-            return {"upserted": 0, "errors": 0}
+            return {"upserted": 0, "touched": 0, "errors": 0}
 
         now = datetime.utcnow().isoformat()
         upserted = 0
+        touched = 0
         errors = 0
+        failed = []  # source URLs that were not written
 
-        for listing in listings:
-            try:
-                # Generate unique property ID from source URL
-                property_id = hashlib.md5(listing.source_url.encode()).hexdigest()[:12]
-
-                # Download and re-host images
-                original_image_urls = getattr(listing, 'image_urls', None) or []
-                hosted_image_urls = []
-
-                images_start = time.time()
-                for idx, img_url in enumerate(original_image_urls):
-                    hosted_url = self.download_and_upload_image(img_url, property_id, idx)
-                    if hosted_url:
-                        hosted_image_urls.append(hosted_url)
-                images_time = time.time() - images_start
-                if original_image_urls:
-                    logger.debug(f"⏱️  Images ({len(original_image_urls)}): {images_time:.2f}s ({images_time/len(original_image_urls):.2f}s/image)")
-
-                # Use first hosted image as thumbnail
-                thumbnail = hosted_image_urls[0] if hosted_image_urls else None
-
-                # Generate SEO-friendly URL slug
-                url_slug = self._generate_url_slug(listing, property_id)
-
-                data = {
-                    "source": source,
-                    "source_url": listing.source_url,
-                    "title": listing.title,
-                    "url_slug": url_slug,
-                    "price": listing.price,
-                    "currency": listing.currency,
-                    "location": listing.location,
-                    "region": self._extract_region(listing.location or listing.city or ""),
-                    "bedrooms": listing.bedrooms,
-                    "bathrooms": listing.bathrooms,
-                    "area_sqm": listing.area_sqm,
-                    "thumbnail_url": thumbnail,
-                    "description_short": listing.description,
-                    "description_full": getattr(listing, 'description_full', None),
-                    "property_type": listing.property_type,
-                    "image_urls": hosted_image_urls,  # Store self-hosted images
-                    "scraped_at": now,
-                    "last_seen_at": now,
-                    "active": True,
-
-                    # Enhanced fields
-                    "parking_spaces": getattr(listing, 'parking_spaces', None),
-                    "condition": getattr(listing, 'condition', None),
-                    "furnished": getattr(listing, 'furnished', None),
-                    "transaction_type": getattr(listing, 'transaction_type', None),
-                    "property_style": getattr(listing, 'property_style', None),
-                    "city": getattr(listing, 'city', None),
-                    "neighborhood": getattr(listing, 'neighborhood', None),
-                    "state": getattr(listing, 'state', None),
-                    "total_area_sqm": getattr(listing, 'total_area_sqm', None),
-                    "land_area_sqm": getattr(listing, 'land_area_sqm', None),
-                    "amenities": getattr(listing, 'amenities', None),
-                    "features": getattr(listing, 'features', None),
-                    "agent_name": getattr(listing, 'agent_name', None),
-                    "agent_office": getattr(listing, 'agent_office', None),
-                    "reference_code": getattr(listing, 'reference_code', None),
-                    "photo_count": getattr(listing, 'photo_count', None) or len(hosted_image_urls),
-
-                    # English translations
-                    "title_en": getattr(listing, 'title_en', None),
-                    "description_short_en": getattr(listing, 'description_short_en', None),
-                    "description_full_en": getattr(listing, 'description_full_en', None),
-
-                    # Spanish originals
-                    "title_es": getattr(listing, 'title_es', None),
-                    "description_short_es": getattr(listing, 'description_short_es', None),
-                    "description_full_es": getattr(listing, 'description_full_es', None),
-
-                    # Translation metadata
-                    "translation_model": getattr(listing, 'translation_model', None),
-                    "translated_at": now if getattr(listing, 'title_en', None) else None,
-                }
-
-                self.client.table("listings").upsert(
-                    data, on_conflict="source_url"
-                ).execute()
-                upserted += 1
+        # Split into unchanged vs changed/new listings by content hash
+        content_hashes = [self._content_hash(l) for l in listings]
+        try:
+            existing = self._existing_hashes([l.source_url for l in listings])
+        except Exception as e:
+            logger.warning(f"Could not fetch content hashes, doing full upserts: {e}")
+            existing = {}
+
+        unchanged_urls = []
+        changed = []
+        for listing, content_hash in zip(listings, content_hashes):
+            if existing.get(listing.source_url) == content_hash:
+                unchanged_urls.append(listing.source_url)
+            else:
+                changed.append((listing, content_hash))
 
+        if unchanged_urls:
+            try:
+                touched = self.touch_listings(unchanged_urls, now)
             except Exception as e:
-                logger.error(f"Upsert failed: {e}")
-                errors += 1
+                logger.error(f"Touch update failed: {e}")
+                errors += len(unchanged_urls)
+                failed += unchanged_urls
+
+        self.seen += touched
+        if not changed:
+            return {"upserted": 0, "touched": touched, "errors": errors, "failed": failed}
+
+        # Generate unique property IDs from source URLs
+        property_ids = [hashlib.md5(l.source_url.encode()).hexdigest()[:12] for l, _ in changed]
+
+        # Download and re-host images for the changed listings concurrently
+        image_jobs = [
+            (property_id, getattr(listing, 'image_urls', None) or [])
+            for (listing, _), property_id in zip(changed, property_ids)
+        ]
+        image_count = sum(len(urls) for _, urls in image_jobs)
+        reused_before = self.images.reused
+        with get_metrics().span("images") as images_span:
+            hosted_images = self.images.rehost_listings(image_jobs)
+            self.images.manifest.flush(self.client)
+        if image_count:
+            reused = self.images.reused - reused_before
+            images_time = images_span.elapsed
+            logger.info(f"⏱️  Images ({image_count}, {reused} reused from manifest): {images_time:.2f}s ({images_time/image_count:.2f}s/image)")
+
+        rows = [
+            self._listing_row(listing, source, property_id, hosted, content_hash, now)
+            for (listing, content_hash), property_id, hosted in zip(changed, property_ids, hosted_images)
+        ]
+
+        # One bulk upsert; fall back to row-by-row so one bad row doesn't fail the batch
+        try:
+            self.client.table("listings").upsert(
+                rows, on_conflict="source_url", returning=ReturnMethod.minimal
+            ).execute()
+            upserted = len(rows)
+        except Exception as e:
+            logger.warning(f"Bulk upsert failed, retrying row by row: {e}")
+            get_metrics().inc("retries", len(rows), stage="write")
+            for row in rows:
+                try:
+                    self.client.table("listings").upsert(
+                        row, on_conflict="source_url", returning=ReturnMethod.minimal
+                    ).execute()
+                    upserted += 1
+                except Exception as e:
+                    logger.error(f"Upsert failed: {e}")
+                    errors += 1
+                    failed.append(row["source_url"])
+
+        self.seen += upserted
+        return {"upserted": upserted, "touched": touched, "errors": errors, "failed": failed}
 
-        return {"upserted": upserted, "errors": errors}
+    def _listing_row(
+        self,
+        listing: PropertyListing,
+        source: str,
+        property_id: str,
+        hosted: list,
+        content_hash: str,
+        now: str,
+    ) -> dict:
+        """Build the full listings row for a new or changed listing.
+
+        Listings with images that failed to re-host get no content hash, so the
+        next run upserts them again and retries the missing photos.
+        """
+        hosted_image_urls = [image.url for image in hosted]
+        if len(hosted) < len(getattr(listing, 'image_urls', None) or []):
+            content_hash = None
+        image_variants = [image.variants for image in hosted]
+
+        # Use first hosted image as thumbnail (and its card-sized variant)
+        thumbnail = hosted_image_urls[0] if hosted_image_urls else None
+        thumbnail_small = hosted[0].card_url() if hosted else None
+
+        # Generate SEO-friendly URL slug
+        url_slug = self._generate_url_slug(listing, property_id)
+
+        return {
+            "source": source,
+            "source_url": listing.source_url,
+            "title": listing.title,
+            "url_slug": url_slug,
+            "price": listing.price,
+            "currency": listing.currency,
+            "location": listing.location,
+            "region": self._extract_region(listing.location or listing.city or ""),
+            "bedrooms": listing.bedrooms,
+            "bathrooms": listing.bathrooms,
+            "area_sqm": listing.area_sqm,
+            "thumbnail_url": thumbnail,
+            "description_short": listing.description,
+            "description_full": getattr(listing, 'description_full', None),
+            "property_type": listing.property_type,
+            "image_urls": hosted_image_urls,  # Store self-hosted images
+            "thumbnail_small_url": thumbnail_small,
+            "image_variants": image_variants,  # Resized WebP URLs per image, keyed by width
+            "scraped_at": now,
+            "last_seen_at": now,
+            "last_seen_run_id": self.run_id,
+            "active": True,
+            "content_hash": content_hash,
+
+            # Enhanced fields
+            "parking_spaces": getattr(listing, 'parking_spaces', None),
+            "condition": getattr(listing, 'condition', None),
+            "furnished": getattr(listing, 'furnished', None),
+            "transaction_type": getattr(listing, 'transaction_type', None),
+            "property_style": getattr(listing, 'property_style', None),
+            "city": getattr(listing, 'city', None),
+            "neighborhood": getattr(listing, 'neighborhood', None),
+            "state": getattr(listing, 'state', None),
+            "total_area_sqm": getattr(listing, 'total_area_sqm', None),
+            "land_area_sqm": getattr(listing, 'land_area_sqm', None),
+            "amenities": getattr(listing, 'amenities', None),
+            "features": getattr(listing, 'features', None),
+            "agent_name": getattr(listing, 'agent_name', None),
+            "agent_office": getattr(listing, 'agent_office', None),
+            "reference_code": getattr(listing, 'reference_code', None),
+            "photo_count": getattr(listing, 'photo_count', None) or len(hosted_image_urls),
+
+            # English translations
+            "title_en": getattr(listing, 'title_en', None),
+            "description_short_en": getattr(listing, 'description_short_en', None),
+            "description_full_en": getattr(listing, 'description_full_en', None),
+
+            # Spanish originals
+            "title_es": getattr(listing, 'title_es', None),
+            "description_short_es": getattr(listing, 'description_short_es', None),
+            "description_full_es": getattr(listing, 'description_full_es', None),
+
+            # Translation metadata
+            "translation_model": getattr(listing, 'translation_model', None),
+            "translated_at": now if getattr(listing, 'title_en', None) else None,
+        }
+
+    def deactivate_listings(self, source_urls: List[str], chunk_size: int = 200) -> int:
+        """Mark specific listings inactive with one set-based update per chunk."""
+        from postgrest.types import CountMethod, ReturnMethod
+
+        count = 0
+        for i in range(0, len(source_urls), chunk_size):
+            result = (
+                self.client.table("listings")
+                .update({"active": False}, count=CountMethod.exact, returning=ReturnMethod.minimal)
+                .in_("source_url", source_urls[i:i + chunk_size])
+                .execute()
+            )
+            count += result.count or 0
+        return count
 
     def mark_stale_listings(self, source: str, days: int = 14) -> int:
-        """Mark old listings as inactive."""
+        """Mark listings not seen for `days` as inactive (used by partial runs)."""
+        from postgrest.types import CountMethod, ReturnMethod
+
         cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
 
         try:
+            # Only the count comes back, not the updated rows
             result = (
                 self.client.table("listings")
-                .update({"active": False})
+                .update({"active": False}, count=CountMethod.exact, returning=ReturnMethod.minimal)
                 .eq("source", source)
                 .eq("active", True)
                 .lt("last_seen_at", cutoff)
                 .execute()
             )
-            count = len(result.data) if result.data else 0
+            count = result.count or 0
             logger.info(f"Marked {count} stale listings for {source}")
             return count
         except Exception as e:
             logger.error(f"Failed to mark stale: {e}")
             return 0
 
+    def reconcile_stale_listings(self, source: str, run_id: Optional[str] = None, started_at: Optional[str] = None) -> int:
+        """Deactivate listings of `source` that the run did not see.
+
+        Must only run once every part of a (possibly distributed) full crawl
+        has finished. Safe to re-run: rows already deactivated are not counted again.
+
+        Args:
+            source: Source identifier
+            run_id: Run to reconcile (defaults to this storage's run)
+            started_at: Run start time; rows seen by other runs after it are kept
+
+        Returns:
+            Number of listings deactivated
+        """
+        run_id = run_id or self.run_id
+        if started_at is None and run_id == self.run_id:
+            started_at = self.started_at
+
+        try:
+            result = self.client.rpc(
+                "reconcile_stale_listings",
+                {"p_source": source, "p_run_id": run_id, "p_started_at": started_at},
+            ).execute()
+            count = result.data or 0
+            logger.info(f"Reconciled run {run_id}: marked {count} unseen listings inactive for {source}")
+            return count
+        except Exception as e:
+            logger.error(f"Failed to reconcile stale listings: {e}")
+            return 0
+
+    def read_changes(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 1000,
+        source: Optional[str] = None,
+        change_types: Optional[List[str]] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Read the listing change feed (listing_changes) after a cursor.
+
+        Entries are appended by a trigger on listings for inserts, updates,
+        price changes and deactivations, so consumers can process deltas
+        instead of rescanning the whole table. The read_listing_changes RPC
+        only returns changes of transactions older than every running one,
+        in (transaction, id) order, so a change that commits late is never
+        skipped; the newest changes appear once earlier writers finish.
+
+        Args:
+            cursor: Cursor returned by the previous call (None = from the beginning)
+            limit: Maximum number of changes to return
+            source: Only changes for this source
+            change_types: Only these change types
+
+        Returns:
+            (changes in commit-safe order, cursor to pass to the next call)
+        """
+        after_xact, after_id = (cursor or "0:0").split(":")
+        changes = self.client.rpc(
+            "read_listing_changes",
+            {
+                "p_after_xact": after_xact,
+                "p_after_id": int(after_id),
+                "p_limit": limit,
+                "p_source": source,
+                "p_change_types": change_types,
+            },
+        ).execute().data or []
+        next_cursor = f"{changes[-1]['xact_id']}:{changes[-1]['id']}" if changes else cursor
+        return changes, next_cursor
+
     def _extract_region(self, location: str) -> str:
         location_lower = location.lower()
         for region in self.REGIONS:
@@ -1022,6 +1453,147 @@ class SupabaseStorage:
         return ""
 
 
+def create_storage(backend: str = "supabase", run_id: Optional[str] = None, staging_db: str = "staging.db"):
+    """Create the storage backend.
+
+    Args:
+        backend: "supabase" (live database), "sqlite" (local staging store,
+            pushed to Supabase later with scraper/sync.py) or "fake" (staging
+            store with simulated Supabase latency, for offline benchmarks)
+        run_id: Scrape run id stamped on every listing seen
+        staging_db: SQLite file for the sqlite and fake backends
+    """
+    if backend == "sqlite":
+        return SQLiteStagingStore(staging_db, run_id=run_id)
+    if backend == "fake":
+        from fakes import FakeStorage
+        return FakeStorage(staging_db, run_id=run_id)
+    return SupabaseStorage(run_id=run_id)
+
+
+# =============================================================================
+# Write-behind Buffer
+# =============================================================================
+
+class ListingWriter:
+    """Write-behind buffer between the crawl loop and storage.
+
+    The crawler hands listings over with ``add()`` and keeps going while a
+    worker thread upserts them in batches - by size, or once the oldest
+    buffered listing is ``max_age`` seconds old. A bounded queue applies
+    backpressure when storage falls behind, and ``close()`` drains everything
+    still buffered (also on SIGTERM, via SystemExit unwinding the ``with`` block).
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        storage: "SupabaseStorage",
+        source_id: str,
+        batch_size: int = 25,
+        max_age: float = 5.0,
+        max_queue: int = 200,
+        manifest: Optional[RunManifest] = None,
+    ):
+        """Initialize the writer.
+
+        Args:
+            storage: Storage backend to upsert into
+            source_id: Source identifier for database
+            batch_size: Flush once this many listings are buffered
+            max_age: Flush once the oldest buffered listing is this old (seconds)
+            max_queue: Queue length at which add() blocks (backpressure)
+            manifest: Run manifest to record failed listings in
+        """
+        self.storage = storage
+        self.source_id = source_id
+        self.manifest = manifest or RunManifest()
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.stats = {"submitted": 0, "upserted": 0, "touched": 0, "errors": 0, "flushes": 0}
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="listing-writer", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            logger.warning(f"Draining listing writer after {exc_type.__name__}...")
+        self.close()
+
+    def add(self, listing: PropertyListing) -> None:
+        """Queue a listing for writing (blocks while the queue is full)."""
+        try:
+            self._queue.put_nowait(listing)
+        except queue.Full:
+            logger.info(f"⏳ Write queue full ({self._queue.maxsize}), waiting for storage...")
+            with get_metrics().span("write_backpressure") as span:
+                self._queue.put(listing)
+            logger.info(f"⏳ Backpressure wait: {span.elapsed:.2f}s")
+        self.stats["submitted"] += 1
+
+    def close(self) -> dict:
+        """Flush everything still buffered and stop the worker. Returns stats."""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        return self.stats
+
+    def _run(self) -> None:
+        batch: List[PropertyListing] = []
+        oldest = 0.0
+
+        while True:
+            timeout = max(0.0, self.max_age - (time.time() - oldest)) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                # Oldest listing reached max_age
+                self._flush(batch)
+                batch = []
+                continue
+
+            if item is self._STOP:
+                self._flush(batch)
+                return
+
+            if not batch:
+                oldest = time.time()
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+
+    def _flush(self, batch: List[PropertyListing]) -> None:
+        if not batch:
+            return
+
+        metrics = get_metrics()
+        with metrics.span("write") as span:
+            try:
+                result = self.storage.upsert_listings(batch, self.source_id)
+            except Exception as e:
+                logger.error(f"Batch write failed: {e}")
+                result = {"upserted": 0, "touched": 0, "errors": len(batch), "failed": [l.source_url for l in batch]}
+        metrics.observe("write_batch_size", len(batch))
+        for source_url in result.get("failed", []):
+            self.manifest.record_failure(source_url, "write", "upsert failed")
+
+        self.stats["flushes"] += 1
+        for key in ("upserted", "touched", "errors"):
+            self.stats[key] += result.get(key, 0)
+            metrics.inc("listings_written", result.get(key, 0), result=key)
+        logger.info(
+            f"📦 Wrote batch of {len(batch)}: {result.get('upserted', 0)} upserted, "
+            f"{result.get('touched', 0)} unchanged, {result.get('errors', 0)} errors "
+            f"(upload time: {span.elapsed:.2f}s, queued: {self._queue.qsize()})"
+        )
+
+
 # =============================================================================
 # Scrapers
 # =============================================================================
@@ -1064,7 +1636,7 @@ def get_bienes_online_config() -> ScraperConfig:
     )
 
 
-def get_rentahouse_config() -> ScraperConfig:
+def get_rentahouse_config(base_url: Optional[str] = None) -> ScraperConfig:
     """Rent-A-House Venezuela scraper config.
 
     Uses filtered search to only get for-sale residential properties:
@@ -1072,8 +1644,12 @@ def get_rentahouse_config() -> ScraperConfig:
     - tipo_inmueble=Apartamento,Casa,Townhouse (residential only)
 
     Total: 15,405 listings across 1,284 pages (as of Jan 2026)
+
+    Args:
+        base_url: Site to crawl instead of rentahouse.com.ve (e.g. the local
+            mock site, scraper/mock_site.py)
     """
-    base = "https://rentahouse.com.ve"
+    base = (base_url or "https://rentahouse.com.ve").rstrip("/")
     urls = []
 
     # Filtered search: for-sale residential properties only
@@ -1095,7 +1671,10 @@ def scrape_source(
     rate_limit: float = 10.0,
     max_pages: int = 5,
     start_page: int = 1,
-    end_page: Optional[int] = None
+    end_page: Optional[int] = None,
+    reconcile: str = "days",
+    shard: Optional[Shard] = None,
+    discovered: Optional[List[str]] = None
 ) -> dict:
     """Scrape a single source.
 
@@ -1107,53 +1686,127 @@ def scrape_source(
         max_pages: Maximum pages to scrape (if end_page not specified)
         start_page: Starting page number (for distributed scraping)
         end_page: Ending page number (for distributed scraping)
+        reconcile: Stale handling after the scrape - "run" (deactivate listings
+            this run did not see; full crawls only), "days" (not seen for 14 days)
+            or "none" (distributed shards; a final step reconciles once)
+        shard: Only fetch details of the listings this shard owns (Rent-A-House)
+        discovered: Listing URLs from discovery files; skips the index pages (Rent-A-House)
 
     Returns:
         Dictionary with scrape results and statistics
     """
     logger.info(f"Starting scrape: {config.name}")
 
-    all_listings: List[PropertyListing] = []
-
-    for i, url in enumerate(config.page_urls):
-        try:
-            # Rent-A-House uses special pagination extraction with batch uploads
-            if config.source_id == "rentahouse":
-                listings = extractor.extract_rentahouse_listings(
-                    url,
-                    config.base_url,
-                    max_pages=max_pages,
-                    start_page=start_page,
-                    end_page=end_page,
-                    storage=storage,
-                    source_id=config.source_id
-                )
-            else:
-                # BienesOnline and others use standard extraction
-                listings = extractor.extract_listings(url, config.base_url)
-
-            all_listings.extend(listings)
+    # Listings are written in the background while crawling continues
+    with ListingWriter(storage, config.source_id, manifest=extractor.manifest) as writer:
+        for i, url in enumerate(config.page_urls):
+            try:
+                # Rent-A-House uses special pagination extraction, streaming into the writer
+                if config.source_id == "rentahouse" and discovered is not None:
+                    _extract_discovered(extractor, discovered, config.base_url, writer, shard, rate_limit)
+                    break
+                elif config.source_id == "rentahouse":
+                    extractor.extract_rentahouse_listings(
+                        url,
+                        config.base_url,
+                        max_pages=max_pages,
+                        start_page=start_page,
+                        end_page=end_page,
+                        writer=writer,
+                        shard=shard,
+                        rate_limit=rate_limit
+                    )
+                else:
+                    # BienesOnline and others use standard extraction
+                    for listing in extractor.extract_listings(url, config.base_url):
+                        writer.add(listing)
 
-            if i < len(config.page_urls) - 1:
-                time.sleep(rate_limit)
+                if i < len(config.page_urls) - 1:
+                    time.sleep(rate_limit)
 
-        except Exception as e:
-            logger.error(f"Failed {url}: {e}")
-            continue
+            except Exception as e:
+                logger.error(f"Failed {url}: {e}")
+                continue
 
-    # Store remaining listings in Supabase (those not uploaded in batches)
-    result = storage.upsert_listings(all_listings, config.source_id)
+    result = writer.stats
 
     # Mark stale
-    stale = storage.mark_stale_listings(config.source_id)
-
-    return {
+    stale = 0
+    if reconcile == "run":
+        if storage.seen:
+            stale = storage.reconcile_stale_listings(config.source_id)
+        else:
+            logger.warning("No listings seen in this run - skipping stale reconciliation")
+    elif reconcile == "days":
+        stale = storage.mark_stale_listings(config.source_id)
+
+    summary = {
         "source": config.name,
-        "scraped": len(all_listings),
+        "scraped": result["submitted"],
         "upserted": result["upserted"],
+        "unchanged": result["touched"],
         "errors": result["errors"],
         "marked_stale": stale,
     }
+    extractor.manifest.add_counts(summary)
+    return summary
+
+
+def _extract_discovered(
+    extractor: PlaywrightExtractor,
+    urls: List[str],
+    base_url: str,
+    writer: ListingWriter,
+    shard: Optional[Shard],
+    rate_limit: float,
+    chunk_size: int = 12
+) -> None:
+    """Fetch details of discovered listings this shard owns, pausing between chunks."""
+    owned = [url for url in urls if not shard or shard.owns(url)]
+    logger.info(f"📋 {len(owned)} of {len(urls)} discovered listings owned by shard {shard or '1/1'}")
+
+    for i in range(0, len(owned), chunk_size):
+        extractor.extract_rentahouse_details(owned[i:i + chunk_size], base_url, writer=writer)
+        logger.info(f"Progress: {min(i + chunk_size, len(owned))}/{len(owned)} listings")
+        if i + chunk_size < len(owned):
+            time.sleep(rate_limit)
+
+
+def discover_source(
+    config: ScraperConfig,
+    extractor: PlaywrightExtractor,
+    output: str,
+    max_pages: int = 5,
+    start_page: int = 1,
+    end_page: Optional[int] = None,
+    rate_limit: float = 10.0
+) -> dict:
+    """Walk a page range of index pages and record listing URLs (no detail fetches).
+
+    Args:
+        config: Scraper configuration (Rent-A-House)
+        extractor: Playwright extractor instance
+        output: Discovery file (JSON lines) to append to
+        max_pages: Maximum pages to walk (if end_page not specified)
+        start_page: Starting page number
+        end_page: Ending page number
+        rate_limit: Delay between index pages (seconds)
+
+    Returns:
+        Dictionary with discovery statistics
+    """
+    pages = 0
+    discovered = 0
+    for url in config.page_urls:
+        for page_num, page_urls in extractor.discover_rentahouse_urls(
+            url, config.base_url, max_pages=max_pages, start_page=start_page, end_page=end_page,
+            rate_limit=rate_limit
+        ):
+            pages += 1
+            discovered += write_discovery(output, [(page_num, page_url) for page_url in page_urls])
+
+    logger.info(f"📋 Discovered {discovered} listing URLs on {pages} pages -> {output}")
+    return {"source": config.name, "pages": pages, "discovered": discovered}
 
 
 # =============================================================================
@@ -1183,6 +1836,139 @@ def parse_args():
         default=1284,
         help='Maximum pages to scrape if end-page not specified (default: 1284)'
     )
+    parser.add_argument(
+        '--storage',
+        choices=['supabase', 'sqlite', 'fake'],
+        default='supabase',
+        help='Storage backend: supabase (default), sqlite (local staging store, push with scraper/sync.py) '
+             'or fake (staging store with simulated Supabase latency, for benchmarks)'
+    )
+    parser.add_argument(
+        '--staging-db',
+        default='staging.db',
+        help='SQLite staging database for --storage sqlite (default: staging.db)'
+    )
+    parser.add_argument(
+        '--translator',
+        choices=['gemini', 'fake', 'none'],
+        default='gemini',
+        help='Translation backend: gemini (default), fake (simulated latency, for benchmarks) or none'
+    )
+    parser.add_argument(
+        '--base-url',
+        default=os.environ.get('RENTAHOUSE_BASE_URL'),
+        help='Crawl this site instead of rentahouse.com.ve, e.g. the local mock (scraper/mock_site.py)'
+    )
+    parser.add_argument(
+        '--rate-limit',
+        type=float,
+        default=10.0,
+        help='Delay between index pages and listing chunks in seconds (default: 10)'
+    )
+    parser.add_argument(
+        '--browser-max-rss-mb',
+        type=float,
+        default=1536,
+        help='Restart Chromium when its processes use more memory than this (default: 1536, 0 disables)'
+    )
+    parser.add_argument(
+        '--browser-restart-every',
+        type=int,
+        default=0,
+        metavar='LOADS',
+        help='Also restart Chromium proactively after this many page loads (default: 0, only when unhealthy)'
+    )
+    parser.add_argument(
+        '--run-id',
+        default=os.environ.get('SCRAPE_RUN_ID'),
+        help='Scrape run id stamped on every listing seen (shared by all distributed jobs, default: random)'
+    )
+    parser.add_argument(
+        '--reconcile',
+        choices=['run', 'days', 'none'],
+        default='days',
+        help='Stale handling: run = deactivate listings not seen by this run (full crawls), '
+             'days = not seen for 14 days (default), none = leave to a final --reconcile-only step'
+    )
+    parser.add_argument(
+        '--reconcile-only',
+        action='store_true',
+        help='Do not scrape; deactivate listings not seen by --run-id and exit (final step of a distributed run)'
+    )
+    parser.add_argument(
+        '--run-started-at',
+        default=None,
+        help='ISO timestamp the run started (with --reconcile-only); rows seen by other runs since are kept'
+    )
+    parser.add_argument(
+        '--shard',
+        default=None,
+        help='Only fetch details of listings owned by shard INDEX/COUNT (e.g. 3/18), keyed by RAH code'
+    )
+    parser.add_argument(
+        '--discover-only',
+        metavar='FILE',
+        default=None,
+        help='Only walk index pages and append listing URLs to FILE (JSON lines); no detail fetches'
+    )
+    parser.add_argument(
+        '--discovered',
+        metavar='PATH',
+        nargs='+',
+        default=None,
+        help='Discovery files or directories; scrape their listings instead of walking index pages'
+    )
+    parser.add_argument(
+        '--seen-filter',
+        metavar='PATH',
+        nargs='+',
+        default=None,
+        help='Saved seen filters (files or directories) to merge at startup, e.g. from other jobs of this run'
+    )
+    parser.add_argument(
+        '--save-seen-filter',
+        metavar='FILE',
+        default=None,
+        help='Save the seen filter (known + processed listings) to FILE when done'
+    )
+    parser.add_argument(
+        '--manifest',
+        metavar='FILE',
+        default=None,
+        help='Write a run manifest (listings seen, written, failed, stage timings) to FILE when done'
+    )
+    parser.add_argument(
+        '--metrics',
+        metavar='FILE',
+        nargs='+',
+        default=None,
+        help='Export stage timings (p50/p95/p99) and counters when done: JSON, or Prometheus text for .prom files'
+    )
+    parser.add_argument(
+        '--profile',
+        metavar='DIR',
+        nargs='?',
+        const='profile',
+        default=None,
+        help='Sample CPU stacks per stage and track memory (tracemalloc, Chromium RSS); '
+             'writes stacks.folded (flamegraph input) and memory reports to DIR (default: profile/)'
+    )
+    parser.add_argument(
+        '--profile-interval',
+        type=float,
+        default=0.02,
+        help='Seconds between stack samples with --profile (default: 0.02)'
+    )
+    parser.add_argument(
+        '--profile-rss-only',
+        action='store_true',
+        help='With --profile, skip tracemalloc (it slows HTML parsing ~3x) and only record process RSS'
+    )
+    parser.add_argument(
+        '--startup-only',
+        action='store_true',
+        help='Start the browser and storage, print startup timings as JSON and exit (see bench_startup.py)'
+    )
     return parser.parse_args()
 
 
@@ -1198,50 +1984,110 @@ def main():
 
         # Scrape first 100 pages:
         python scraper/run.py --max-pages 100
+
+        # Scrape offline into a local SQLite staging store, then push to Supabase:
+        python scraper/run.py --storage sqlite --staging-db staging.db
+        python scraper/sync.py --staging-db staging.db
+
+        # Distributed run: shards skip stale handling, a final step reconciles once:
+        python scraper/run.py --start-page 1 --end-page 150 --run-id 42 --reconcile none
+        python scraper/run.py --reconcile-only --run-id 42
+
+        # Profile a run (flamegraph.pl profile/stacks.folded > cpu.svg; see profile/memory.txt):
+        python scraper/run.py --max-pages 20 --profile profile/
+
+        # Stable sharding: discover listing URLs, then each shard fetches the listings it owns:
+        python scraper/run.py --start-page 1 --end-page 150 --discover-only discovery/1.jsonl
+        python scraper/run.py --discovered discovery/ --shard 3/18 --run-id 42 --reconcile none
     """
     args = parse_args()
 
+    try:
+        args.shard = Shard.parse(args.shard)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(2)
+
+    if args.reconcile_only:
+        if not args.run_id:
+            logger.error("--reconcile-only requires --run-id")
+            sys.exit(1)
+        storage = create_storage(args.storage, run_id=args.run_id, staging_db=args.staging_db)
+        stale = storage.reconcile_stale_listings(
+            get_rentahouse_config().source_id, started_at=args.run_started_at
+        )
+        storage.close()
+        logger.info(f"Reconciliation complete for run {args.run_id}: {stale} listings marked inactive")
+        return
+
+    if args.discover_only:
+        # Index pages only - no storage needed
+        with PlaywrightExtractor(translator="none") as extractor:
+            result = discover_source(
+                get_rentahouse_config(args.base_url),
+                extractor,
+                args.discover_only,
+                max_pages=args.max_pages,
+                start_page=args.start_page,
+                end_page=args.end_page,
+                rate_limit=args.rate_limit,
+            )
+        if not result["discovered"]:
+            sys.exit(1)
+        return
+
     logger.info("=" * 60)
     logger.info("Property.com.ve Scraper Starting")
     logger.info(f"Time: {datetime.utcnow().isoformat()}")
-    if args.end_page:
+    if args.discovered:
+        logger.info(f"📋 Discovered listings from: {', '.join(args.discovered)}")
+    elif args.end_page:
         logger.info(f"📄 Page Range: {args.start_page} to {args.end_page}")
     else:
         logger.info(f"📄 Max Pages: {args.max_pages} (starting from page {args.start_page})")
+    if args.shard.count > 1:
+        logger.info(f"🧩 Shard: {args.shard}")
     logger.info("=" * 60)
 
-    # Initialize storage
-    storage = SupabaseStorage()
-    results = []
+    # Turn SIGTERM (job timeout / cancellation) into SystemExit so buffered writes are drained
+    signal.signal(signal.SIGTERM, _handle_sigterm)
 
-    # Use Playwright extractor as context manager (pass storage for smart translation)
-    with PlaywrightExtractor(storage=storage) as extractor:
-        # Scrape BienesOnline - DISABLED FOR NOW
-        # try:
-        #     config = get_bienes_online_config()
-        #     result = scrape_source(config, extractor, storage)
-        #     results.append(result)
-        #     logger.info(f"BienesOnline result: {result}")
-        # except Exception as e:
-        #     logger.error(f"BienesOnline failed: {e}")
-        #     results.append({"source": "BienesOnline", "error": str(e)})
-
-        # Scrape Rent-A-House (15,405 listings across 1,284 pages)
-        try:
-            config = get_rentahouse_config()
-            result = scrape_source(
-                config,
-                extractor,
-                storage,
-                max_pages=args.max_pages,
-                start_page=args.start_page,
-                end_page=args.end_page
-            )
-            results.append(result)
-            logger.info(f"Rent-A-House result: {result}")
-        except Exception as e:
-            logger.error(f"Rent-A-House failed: {e}")
-            results.append({"source": "Rent-A-House", "error": str(e)})
+    storage, extractor = _start(args)
+    logger.info(f"Run ID: {storage.run_id}")
+    results = []
+    profiler = None
+
+    try:
+        if args.profile and not args.startup_only:
+            from profiling import Profiler
+            profiler = Profiler(
+                args.profile,
+                interval=args.profile_interval,
+                stage_of=get_metrics().active_stage,
+                trace_allocations=not args.profile_rss_only,
+            ).start()
+        if not args.startup_only:
+            _run_sources(args, storage, extractor, results)
+    finally:
+        if profiler:
+            # Before the browser closes, so the last checkpoint still sees Chromium's memory
+            profiler.stop()
+        extractor.close()
+        storage.close()
+        if args.save_seen_filter:
+            size = extractor.seen.save(args.save_seen_filter)
+            logger.info(f"🧮 Saved seen filter ({size} bytes): {extractor.seen.stats()}")
+        metrics = get_metrics()
+        if not args.startup_only:
+            metrics.log_summary()
+        for path in args.metrics or []:
+            metrics.save(path)
+        if args.manifest:
+            extractor.manifest.timings = metrics.stage_totals()
+            extractor.manifest.save(args.manifest)
+
+    if args.startup_only:
+        return
 
     # Summary
     logger.info("=" * 60)
@@ -1255,5 +2101,110 @@ def main():
         sys.exit(1)
 
 
+def _handle_sigterm(signum, frame):
+    logger.warning("Received SIGTERM, shutting down...")
+    raise SystemExit(128 + signum)
+
+
+def _start(args) -> Tuple["SupabaseStorage", PlaywrightExtractor]:
+    """Create storage and launch the browser in parallel.
+
+    Storage setup (client, image manifest prefetch) runs on a helper thread
+    while the browser launches on this one (Playwright's sync API is bound
+    to the thread that started it).
+    """
+    imports_done = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage-init") as pool:
+        storage_future = pool.submit(_create_storage_and_seen_set, args)
+        # Pass storage later (smart translation needs it only once scraping starts)
+        extractor = PlaywrightExtractor(
+            translator=args.translator,
+            watchdog=BrowserWatchdog(max_rss_mb=args.browser_max_rss_mb, max_loads=args.browser_restart_every),
+        )
+        try:
+            extractor.start()
+            browser_ready = time.perf_counter()
+            storage, seen = storage_future.result()
+        except BaseException:
+            extractor.close()
+            if not storage_future.cancel() and not storage_future.exception():
+                storage_future.result()[0].close()
+            raise
+    extractor.storage = storage
+    extractor.seen = seen
+    extractor.manifest = RunManifest(
+        run_id=storage.run_id,
+        job=f"shard {args.shard}" if args.shard.count > 1 else f"pages {args.start_page}-{args.end_page or args.max_pages}",
+        source=get_rentahouse_config().source_id,
+    )
+
+    ready = time.perf_counter()
+    timings = {
+        "imports_s": round(imports_done - _PROCESS_START, 3),
+        "browser_s": round(browser_ready - imports_done, 3),
+        "ready_s": round(ready - _PROCESS_START, 3),
+    }
+    logger.info(
+        f"🚀 Ready for first request after {timings['ready_s']:.2f}s "
+        f"(imports {timings['imports_s']:.2f}s, browser {timings['browser_s']:.2f}s, storage in parallel)"
+    )
+    if args.startup_only:
+        print(json.dumps(timings))
+    return storage, extractor
+
+
+def _create_storage_and_seen_set(args) -> Tuple["SupabaseStorage", SeenSet]:
+    """Create storage and the seen filter (bulk-loaded from storage, plus saved filters)."""
+    storage = create_storage(args.storage, run_id=args.run_id, staging_db=args.staging_db)
+    seen = SeenSet(run_id=storage.run_id)
+
+    if args.seen_filter:
+        merged = seen.load_many(args.seen_filter)
+        logger.info(f"🧮 Merged {merged} saved seen filters")
+    if not args.startup_only:
+        try:
+            with get_metrics().span("seen_filter_build") as span:
+                count = seen.build(storage.iter_source_urls(get_rentahouse_config().source_id))
+            logger.info(f"🧮 Seen filter: {count} known listings loaded in {span.elapsed:.2f}s")
+        except Exception as e:
+            # Without the full set negatives are not definite, so exact storage checks are kept
+            logger.warning(f"Could not load known listings into the seen filter: {e}")
+    return storage, seen
+
+
+def _run_sources(args, storage, extractor: PlaywrightExtractor, results: list) -> None:
+    """Scrape all enabled sources, appending one result dict per source."""
+    # Scrape BienesOnline - DISABLED FOR NOW
+    # try:
+    #     config = get_bienes_online_config()
+    #     result = scrape_source(config, extractor, storage)
+    #     results.append(result)
+    #     logger.info(f"BienesOnline result: {result}")
+    # except Exception as e:
+    #     logger.error(f"BienesOnline failed: {e}")
+    #     results.append({"source": "BienesOnline", "error": str(e)})
+
+    # Scrape Rent-A-House (15,405 listings across 1,284 pages)
+    try:
+        config = get_rentahouse_config(args.base_url)
+        result = scrape_source(
+            config,
+            extractor,
+            storage,
+            rate_limit=args.rate_limit,
+            max_pages=args.max_pages,
+            start_page=args.start_page,
+            end_page=args.end_page,
+            reconcile=args.reconcile,
+            shard=args.shard,
+            discovered=list(read_discovery(args.discovered).values()) if args.discovered else None
+        )
+        results.append(result)
+        logger.info(f"Rent-A-House result: {result}")
+    except Exception as e:
+        logger.error(f"Rent-A-House failed: {e}")
+        results.append({"source": "Rent-A-House", "error": str(e)})
+
+
 if __name__ == "__main__":
     main()
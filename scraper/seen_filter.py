@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Compact, mergeable seen-set of listing keys.
+
+Answers "is this listing already in the database?" and "did a job of this
+run already process it?" from memory. Both are Bloom filters: a negative
+answer is definite, a positive one may be false (0.1% by default) and is
+confirmed with an exact storage query where a wrong skip would matter.
+
+- known: every listing key in storage, built in bulk at startup (or
+  restored from a saved filter) and grown during the crawl
+- run: keys processed by this scrape run; filters saved by other jobs of
+  the same run (e.g. an earlier attempt of a re-run shard) are merged in
+
+Saved filters are small binary files (a JSON header plus zlib-compressed
+bits), merged by OR-ing the bits. Usage:
+
+    python scraper/seen_filter.py build --out seen.bloom
+    python scraper/seen_filter.py merge seen/ --out merged.bloom
+    python scraper/seen_filter.py stats merged.bloom
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import math
+import os
+import struct
+import sys
+import zlib
+from typing import Iterable, List, Optional
+
+from sharding import listing_key
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SEEN"
+VERSION = 1
+DEFAULT_CAPACITY = 100_000
+DEFAULT_ERROR_RATE = 0.001
+
+
+class BloomFilter:
+    """Bloom filter over strings (double hashing of one blake2b digest)."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0  # items added (approximate after merges)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def compatible(self, other: "BloomFilter") -> bool:
+        return (self.size, self.hashes) == (other.size, other.hashes)
+
+    def merge(self, other: "BloomFilter") -> None:
+        """Union with another filter of the same size."""
+        if not self.compatible(other):
+            raise ValueError(f"Cannot merge filters of different shapes ({self.size}/{self.hashes} vs {other.size}/{other.hashes})")
+        merged = int.from_bytes(self.bits, "little") | int.from_bytes(other.bits, "little")
+        self.bits = bytearray(merged.to_bytes(len(self.bits), "little"))
+        self.count += other.count
+
+    @property
+    def fill_ratio(self) -> float:
+        return sum(bin(byte).count("1") for byte in self.bits) / self.size
+
+    def header(self) -> dict:
+        return {"capacity": self.capacity, "error_rate": self.error_rate, "count": self.count}
+
+    @classmethod
+    def from_header(cls, header: dict, bits: bytes) -> "BloomFilter":
+        bloom = cls(header["capacity"], header["error_rate"])
+        if len(bits) != len(bloom.bits):
+            raise ValueError("Filter bits do not match the header")
+        bloom.bits = bytearray(bits)
+        bloom.count = header["count"]
+        return bloom
+
+
+class SeenSet:
+    """Known listings and listings processed by this run (see module docstring)."""
+
+    def __init__(
+        self,
+        run_id: Optional[str] = None,
+        capacity: int = DEFAULT_CAPACITY,
+        error_rate: float = DEFAULT_ERROR_RATE,
+    ):
+        self.run_id = run_id
+        self.known = BloomFilter(capacity, error_rate)
+        self.run = BloomFilter(capacity, error_rate)
+        self.processed = set()  # exact keys processed by this process
+        self.new = set()  # keys this process added that were not known before (still new in storage terms)
+        self.known_loaded = False  # False: the known filter is incomplete, negatives are not definite
+
+    def build(self, source_urls: Iterable[str]) -> int:
+        """Add every stored listing to the known filter. Returns the count added."""
+        added = 0
+        for url in source_urls:
+            self.known.add(listing_key(url))
+            added += 1
+        self.known_loaded = True
+        return added
+
+    def is_known(self, url: str) -> bool:
+        """False if the listing is definitely not in storage (as of before this run)."""
+        key = listing_key(url)
+        return not self.known_loaded or (key in self.known and key not in self.new)
+
+    def maybe_processed(self, url: str) -> bool:
+        """True if this run may already have processed the listing (exact for this process)."""
+        key = listing_key(url)
+        return key in self.processed or key in self.run
+
+    def add(self, url: str) -> None:
+        """Record a listing as processed by this run.
+
+        It is also added to the known filter (so saved filters include it),
+        but is_known() keeps answering False for it in this process: the
+        listing is processed after add() and still needs the new-listing path.
+        """
+        key = listing_key(url)
+        self.processed.add(key)
+        self.run.add(key)
+        if self.known_loaded and key not in self.known:
+            self.new.add(key)
+        self.known.add(key)
+
+    def merge(self, other: "SeenSet") -> None:
+        """Union with a filter saved by another job; run keys only if it is the same run."""
+        if self.run_id is None:
+            self.run_id = other.run_id
+        self.known.merge(other.known)
+        self.known_loaded = self.known_loaded or other.known_loaded
+        if other.run_id and other.run_id == self.run_id:
+            self.run.merge(other.run)
+
+    def to_bytes(self) -> bytes:
+        header = json.dumps({
+            "version": VERSION,
+            "run_id": self.run_id,
+            "known_loaded": self.known_loaded,
+            "known": self.known.header(),
+            "run": self.run.header(),
+        }).encode()
+        body = zlib.compress(bytes(self.known.bits) + bytes(self.run.bits), 9)
+        return MAGIC + struct.pack("<I", len(header)) + header + body
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SeenSet":
+        if data[:4] != MAGIC:
+            raise ValueError("Not a seen filter")
+        (header_size,) = struct.unpack("<I", data[4:8])
+        header = json.loads(data[8:8 + header_size])
+        if header["version"] != VERSION:
+            raise ValueError(f"Unsupported seen filter version {header['version']}")
+        bits = zlib.decompress(data[8 + header_size:])
+
+        seen = cls(header["run_id"])
+        seen.known = BloomFilter.from_header(header["known"], bits[:len(bits) // 2])
+        seen.run = BloomFilter.from_header(header["run"], bits[len(bits) // 2:])
+        seen.known_loaded = header["known_loaded"]
+        return seen
+
+    def save(self, path: str) -> int:
+        """Write the filter atomically. Returns its size in bytes."""
+        data = self.to_bytes()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return len(data)
+
+    @classmethod
+    def load(cls, path: str) -> "SeenSet":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    def load_many(self, paths: List[str]) -> int:
+        """Merge saved filters (files or directories of *.bloom). Returns the count merged."""
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                files.extend(sorted(glob.glob(os.path.join(path, "**", "*.bloom"), recursive=True)))
+            else:
+                files.append(path)
+
+        merged = 0
+        for file in files:
+            try:
+                self.merge(self.load(file))
+                merged += 1
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping seen filter {file}: {e}")
+        return merged
+
+    def stats(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "known": self.known.count,
+            "known_fill": round(self.known.fill_ratio, 4),
+            "run": self.run.count,
+            "processed": len(self.processed),
+            "bytes": len(self.to_bytes()),
+        }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Build, merge and inspect listing seen-set filters")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Build the known filter from storage")
+    build.add_argument("--out", required=True)
+    build.add_argument("--source", default="rentahouse")
+    build.add_argument("--storage", choices=["supabase", "sqlite"], default="supabase")
+    build.add_argument("--staging-db", default="staging.db")
+    build.add_argument("--run-id", default=os.environ.get("SCRAPE_RUN_ID"))
+
+    merge = commands.add_parser("merge", help="Merge saved filters into one")
+    merge.add_argument("paths", nargs="+", help="Filter files or directories")
+    merge.add_argument("--out", required=True)
+    merge.add_argument("--run-id", default=None, help="Run whose processed keys to keep (default: the first filter's)")
+
+    stats = commands.add_parser("stats", help="Print filter statistics")
+    stats.add_argument("path")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        from run import create_storage
+
+        storage = create_storage(args.storage, run_id=args.run_id, staging_db=args.staging_db)
+        try:
+            seen = SeenSet(run_id=storage.run_id)
+            count = seen.build(storage.iter_source_urls(args.source))
+        finally:
+            storage.close()
+        logger.info(f"Built seen filter of {count} listings ({seen.save(args.out)} bytes) -> {args.out}")
+    elif args.command == "merge":
+        seen = SeenSet(run_id=args.run_id)
+        merged = seen.load_many(args.paths)
+        logger.info(f"Merged {merged} filters ({seen.save(args.out)} bytes) -> {args.out}")
+    else:
+        print(json.dumps(SeenSet.load(args.path).stats(), indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Stable listing-ID sharding for distributed scraping.
+
+Page ranges shift while listings are added or removed during a long run,
+so jobs that own page ranges re-scrape listings that moved into their range
+and miss the ones that moved out. Instead, index pages are only used to
+discover listing URLs and each job owns the listings whose stable key
+(the Rent-A-House reference code, else a URL hash) hashes to its shard.
+
+Discovery files are JSON lines ({"key", "url", "page"}), one file per
+discovery job; readers merge them and dedupe by key.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Rent-A-House reference code: ..._rah-26-11502.html -> rah-26-11502
+RAH_CODE = re.compile(r'_(rah-\d+(?:-\d+)*)\.html', re.I)
+
+
+def listing_key(url: str) -> str:
+    """Stable identity of a listing that survives pagination and URL slug changes."""
+    match = RAH_CODE.search(url)
+    if match:
+        return match.group(1).lower()
+    parts = urlsplit(url)
+    normalized = f"{parts.netloc.lower()}{parts.path.rstrip('/')}"
+    return "url-" + hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def shard_of(key: str, shard_count: int) -> int:
+    """Shard (0-based) owning a listing key; stable across processes and machines."""
+    return int(hashlib.sha1(key.encode()).hexdigest()[:8], 16) % shard_count
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse a 1-based "INDEX/COUNT" shard spec into (0-based index, count)."""
+    match = re.fullmatch(r'(\d+)/(\d+)', value.strip())
+    if not match or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        raise ValueError(f"Invalid shard '{value}', expected INDEX/COUNT like 3/18")
+    return int(match.group(1)) - 1, int(match.group(2))
+
+
+class Shard:
+    """The listings one job owns."""
+
+    def __init__(self, index: int = 0, count: int = 1):
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def parse(cls, value: Optional[str]) -> "Shard":
+        return cls(*parse_shard(value)) if value else cls()
+
+    def owns(self, url: str) -> bool:
+        return self.count == 1 or shard_of(listing_key(url), self.count) == self.index
+
+    def __str__(self) -> str:
+        return f"{self.index + 1}/{self.count}"
+
+
+def write_discovery(path: str, entries: Iterable[Tuple[int, str]]) -> int:
+    """Append discovered (page, url) entries to a JSON lines file. Returns the count written."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    count = 0
+    with open(path, "a") as f:
+        for page, url in entries:
+            f.write(json.dumps({"key": listing_key(url), "url": url, "page": page}) + "\n")
+            count += 1
+    return count
+
+
+def read_discovery(paths: List[str]) -> Dict[str, str]:
+    """Merge discovery files (or directories of *.jsonl) into key -> url.
+
+    A listing found on several pages (it moved during discovery) is kept
+    once, in the order it was first discovered.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**", "*.jsonl"), recursive=True)))
+        else:
+            files.append(path)
+
+    listings: Dict[str, str] = {}
+    for file in files:
+        with open(file) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    listings.setdefault(entry["key"], entry["url"])
+    return listings
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Local SQLite staging store for scraped listings.
+Same interface as SupabaseStorage, so a scrape can run fully offline at
+local-disk speed; sync.py later pushes changed rows to Supabase in bulk.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    source_url TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    data TEXT NOT NULL,                 -- PropertyListing as JSON
+    content_hash TEXT NOT NULL,
+    scraped_at TEXT NOT NULL,           -- last time the content changed
+    last_seen_at TEXT NOT NULL,
+    last_seen_run_id TEXT,
+    active INTEGER NOT NULL DEFAULT 1,
+    dirty INTEGER NOT NULL DEFAULT 1    -- changed or seen since the last sync
+);
+CREATE INDEX IF NOT EXISTS idx_listings_dirty ON listings(source, last_seen_run_id) WHERE dirty = 1;
+CREATE INDEX IF NOT EXISTS idx_listings_source_active ON listings(source, active);
+"""
+
+# Fields needs_translation() compares/reuses
+TRANSLATION_FIELDS = (
+    "title_en", "title_es", "description_short_en", "description_short_es",
+    "description_full_en", "description_full_es", "translation_model",
+)
+
+
+def content_hash(data: dict) -> str:
+    """Stable hash of the scraped fields of a listing dict (used for change detection).
+
+    Translations are left out - they follow from the scraped text and are
+    reused for unchanged listings - except for whether there is one, so a
+    listing translated for the first time is still written.
+    """
+    scraped = {
+        key: value for key, value in data.items()
+        if key not in TRANSLATION_FIELDS and not key.endswith(("_en", "_es"))
+    }
+    scraped["translated"] = bool(data.get("title_en"))
+    payload = json.dumps(scraped, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SQLiteStagingStore:
+    """Store listings in a local SQLite database."""
+
+    def __init__(self, path: str = "staging.db", run_id: Optional[str] = None):
+        """Open (or create) the staging database.
+
+        Args:
+            path: SQLite database file
+            run_id: Scrape run id stamped on every listing seen (default: random)
+        """
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+        self.run_id = run_id or str(uuid.uuid4())[:8]
+        self.started_at = datetime.utcnow().isoformat()
+        self.seen = 0  # listings upserted or touched by this run
+
+        logger.info(f"Using local staging store: {path}")
+
+    def close(self):
+        self.conn.close()
+
+    def get_translation_state(self, source_url: str) -> Optional[dict]:
+        """Stored translation fields for a listing (None if unknown)."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT data FROM listings WHERE source_url = ?", (source_url,)
+            ).fetchone()
+        if not row:
+            return None
+        data = json.loads(row["data"])
+        return {field: data.get(field) for field in TRANSLATION_FIELDS}
+
+    def upsert_listings(self, listings: list, source: str) -> dict:
+        """Upsert listings locally. Unchanged listings only get last_seen_at bumped."""
+        if not listings:
+            return {"upserted": 0, "touched": 0, "errors": 0}
+
+        now = datetime.utcnow().isoformat()
+        rows = []
+        for listing in listings:
+            data = listing.model_dump()
+            rows.append((listing.source_url, source, json.dumps(data, default=str), content_hash(data)))
+
+        with self._lock, self.conn:
+            existing = self._existing_hashes([r[0] for r in rows])
+            touched = sum(1 for r in rows if existing.get(r[0]) == r[3])
+            self.conn.executemany(
+                """
+                INSERT INTO listings
+                    (source_url, source, data, content_hash, scraped_at, last_seen_at, last_seen_run_id, active, dirty)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 1, 1)
+                ON CONFLICT(source_url) DO UPDATE SET
+                    source = excluded.source,
+                    data = excluded.data,
+                    scraped_at = CASE WHEN listings.content_hash = excluded.content_hash
+                                      THEN listings.scraped_at ELSE excluded.scraped_at END,
+                    content_hash = excluded.content_hash,
+                    last_seen_at = excluded.last_seen_at,
+                    last_seen_run_id = excluded.last_seen_run_id,
+                    active = 1,
+                    dirty = 1
+                """,
+                [(url, src, data, h, now, now, self.run_id) for url, src, data, h in rows],
+            )
+
+        self.seen += len(rows)
+        return {"upserted": len(rows) - touched, "touched": touched, "errors": 0}
+
+    def _existing_hashes(self, source_urls: List[str], chunk_size: int = 500) -> Dict[str, str]:
+        hashes = {}
+        for i in range(0, len(source_urls), chunk_size):
+            chunk = source_urls[i:i + chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+            for row in self.conn.execute(
+                f"SELECT source_url, content_hash FROM listings WHERE source_url IN ({placeholders})", chunk
+            ):
+                hashes[row["source_url"]] = row["content_hash"]
+        return hashes
+
+    def iter_source_urls(self, source: str) -> Iterator[str]:
+        """All stored listing URLs of a source."""
+        with self._lock:
+            rows = self.conn.execute("SELECT source_url FROM listings WHERE source = ?", (source,)).fetchall()
+        return (row["source_url"] for row in rows)
+
+    def seen_in_run(self, source_urls: List[str], chunk_size: int = 500) -> set:
+        """Listings already stored or touched by this run."""
+        seen = set()
+        with self._lock:
+            for i in range(0, len(source_urls), chunk_size):
+                chunk = source_urls[i:i + chunk_size]
+                placeholders = ",".join("?" * len(chunk))
+                seen.update(
+                    row["source_url"] for row in self.conn.execute(
+                        f"SELECT source_url FROM listings WHERE source_url IN ({placeholders}) AND last_seen_run_id = ?",
+                        [*chunk, self.run_id],
+                    )
+                )
+        return seen
+
+    def mark_stale_listings(self, source: str, days: int = 14) -> int:
+        """Mark listings not seen for `days` as inactive."""
+        cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
+        with self._lock, self.conn:
+            count = self.conn.execute(
+                "UPDATE listings SET active = 0, dirty = 1 WHERE source = ? AND active = 1 AND last_seen_at < ?",
+                (source, cutoff),
+            ).rowcount
+        logger.info(f"Marked {count} stale listings for {source}")
+        return count
+
+    def reconcile_stale_listings(self, source: str, run_id: Optional[str] = None, started_at: Optional[str] = None) -> int:
+        """Deactivate listings of `source` that the run did not see (see SupabaseStorage)."""
+        run_id = run_id or self.run_id
+        if started_at is None and run_id == self.run_id:
+            started_at = self.started_at
+
+        with self._lock, self.conn:
+            count = self.conn.execute(
+                """
+                UPDATE listings SET active = 0, dirty = 1
+                WHERE source = ? AND active = 1
+                  AND last_seen_run_id IS NOT ?
+                  AND (? IS NULL OR last_seen_at < ?)
+                """,
+                (source, run_id, started_at, started_at),
+            ).rowcount
+        logger.info(f"Reconciled run {run_id}: marked {count} unseen listings inactive for {source}")
+        return count
+
+    # -------------------------------------------------------------------------
+    # Sync support
+    # -------------------------------------------------------------------------
+
+    def iter_dirty(self, batch_size: int = 500) -> Iterator[List[sqlite3.Row]]:
+        """Yield batches of rows changed or seen since the last sync.
+
+        Batches never mix sources, runs or active/inactive rows, so each one
+        maps to a single bulk operation on the remote side.
+        """
+        last_key = ("", "", -1, "")
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    """
+                    SELECT * FROM listings
+                    WHERE dirty = 1
+                      AND (source, IFNULL(last_seen_run_id, ''), active, source_url) > (?, ?, ?, ?)
+                    ORDER BY source, IFNULL(last_seen_run_id, ''), active, source_url
+                    LIMIT ?
+                    """,
+                    (*last_key, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+
+            last = rows[-1]
+            last_key = (last["source"], last["last_seen_run_id"] or "", last["active"], last["source_url"])
+
+            # Split on group boundaries
+            batch = [rows[0]]
+            for row in rows[1:]:
+                if (row["source"], row["last_seen_run_id"], row["active"]) != (
+                    batch[0]["source"], batch[0]["last_seen_run_id"], batch[0]["active"]
+                ):
+                    yield batch
+                    batch = []
+                batch.append(row)
+            yield batch
+
+    def mark_synced(self, rows: List[sqlite3.Row]) -> None:
+        """Clear the dirty flag, unless the row changed again after it was read."""
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE listings SET dirty = 0 WHERE source_url = ? AND content_hash = ? AND last_seen_at = ?",
+                [(r["source_url"], r["content_hash"], r["last_seen_at"]) for r in rows],
+            )
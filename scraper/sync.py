@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Push a local SQLite staging store (run.py --storage sqlite) to Supabase.
+Only rows changed or seen since the last sync are sent, in bulk batches.
+
+Usage:
+    python scraper/sync.py --staging-db staging.db
+"""
+
+import sys
+import json
+import logging
+import argparse
+
+from run import PropertyListing, SupabaseStorage
+from staging import SQLiteStagingStore
+
+logger = logging.getLogger(__name__)
+
+
+def sync_staging(staging: SQLiteStagingStore, supabase: SupabaseStorage, batch_size: int = 500) -> dict:
+    """Push dirty staging rows to Supabase.
+
+    Active rows go through the normal bulk upsert (unchanged content is only
+    touched remotely); inactive rows become one set-based deactivation. Rows
+    are marked synced only when their batch succeeded, so a failed sync can
+    simply be re-run.
+
+    Args:
+        staging: Local staging store
+        supabase: Remote storage
+        batch_size: Rows per remote request
+
+    Returns:
+        Counts of upserted, touched, deactivated and failed rows
+    """
+    stats = {"batches": 0, "upserted": 0, "touched": 0, "deactivated": 0, "errors": 0}
+
+    for batch in staging.iter_dirty(batch_size):
+        stats["batches"] += 1
+        source = batch[0]["source"]
+        supabase.run_id = batch[0]["last_seen_run_id"] or supabase.run_id
+
+        try:
+            if batch[0]["active"]:
+                listings = [PropertyListing(**json.loads(row["data"])) for row in batch]
+                result = supabase.upsert_listings(listings, source)
+                stats["upserted"] += result["upserted"]
+                stats["touched"] += result["touched"]
+                if result["errors"]:
+                    stats["errors"] += result["errors"]
+                    logger.warning(f"⚠️ Batch {stats['batches']} ({source}): {result['errors']} errors, will retry next sync")
+                    continue
+            else:
+                stats["deactivated"] += supabase.deactivate_listings([row["source_url"] for row in batch])
+        except Exception as e:
+            stats["errors"] += len(batch)
+            logger.error(f"❌ Batch {stats['batches']} ({source}) failed: {e}")
+            continue
+
+        staging.mark_synced(batch)
+
+    return stats
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Sync the local staging store to Supabase')
+    parser.add_argument(
+        '--staging-db',
+        default='staging.db',
+        help='SQLite staging database (default: staging.db)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=500,
+        help='Rows per bulk request (default: 500)'
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    staging = SQLiteStagingStore(args.staging_db)
+    supabase = SupabaseStorage()
+    try:
+        stats = sync_staging(staging, supabase, batch_size=args.batch_size)
+    finally:
+        supabase.close()
+        staging.close()
+
+    logger.info(
+        f"✅ Sync complete: {stats['upserted']} upserted, {stats['touched']} unchanged, "
+        f"{stats['deactivated']} deactivated, {stats['errors']} errors ({stats['batches']} batches)"
+    )
+    if stats["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Tests for the seen filter and the translation shortcut it enables (pytest scraper/)."""
+
+from run import PlaywrightExtractor
+from seen_filter import SeenSet
+
+STORED = "https://rentahouse.com.ve/casa_en_venta_en_caracas_en_el-cafetal_rah-26-1.html"
+NEW = "https://rentahouse.com.ve/casa_en_venta_en_caracas_en_el-cafetal_rah-26-2.html"
+
+
+class RecordingStorage:
+    def __init__(self):
+        self.lookups = []
+
+    def get_translation_state(self, source_url):
+        self.lookups.append(source_url)
+        return {"title_en": "House", "title_es": "Casa", "description_full_es": "Desc"}
+
+
+def _extractor() -> PlaywrightExtractor:
+    extractor = PlaywrightExtractor(storage=RecordingStorage(), translator="none")
+    extractor.seen = SeenSet(run_id="r1")
+    extractor.seen.build([STORED])
+    return extractor
+
+
+def test_new_listing_stays_new_after_add():
+    seen = SeenSet(run_id="r1")
+    seen.build([STORED])
+    seen.add(NEW)
+    seen.add(STORED)
+    assert not seen.is_known(NEW)
+    assert seen.is_known(STORED)
+    assert seen.maybe_processed(NEW)
+
+
+def test_new_listing_skips_storage_lookup():
+    extractor = _extractor()
+    extractor.seen.add(NEW)  # extract_rentahouse_details adds before processing
+
+    assert extractor.needs_translation(NEW, "Casa", "Desc") == (True, {})
+    assert extractor.storage.lookups == []
+
+
+def test_stored_listing_is_checked_in_storage():
+    extractor = _extractor()
+    extractor.seen.add(STORED)
+
+    needs, existing = extractor.needs_translation(STORED, "Casa", "Desc")
+    assert not needs and existing["title_en"] == "House"
+    assert extractor.storage.lookups == [STORED]
+
+
+def test_saved_filter_knows_listings_added_this_run():
+    seen = SeenSet(run_id="r1")
+    seen.build([STORED])
+    seen.add(NEW)
+    assert SeenSet.from_bytes(seen.to_bytes()).is_known(NEW)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Shared pooled HTTP transport for the scraper.
+One place configures keep-alive, HTTP/2, pool size and per-endpoint
+timeouts for Supabase (PostgREST, Storage) and image traffic, and counts
+how often requests reuse a pooled connection instead of opening a new one.
+"""
+
+import logging
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+    logger.warning("h2 not available - HTTP/2 disabled, falling back to HTTP/1.1 keep-alive")
+
+# Per-endpoint timeouts (seconds), matched on the request path
+TIMEOUTS = {
+    "rpc": httpx.Timeout(120.0, connect=10.0),      # /rest/v1/rpc/* (set-based reconciliation)
+    "postgrest": httpx.Timeout(30.0, connect=10.0),  # /rest/v1/*
+    "storage": httpx.Timeout(60.0, connect=10.0),    # /storage/v1/* (uploads)
+    "default": httpx.Timeout(30.0, connect=10.0),    # image downloads, everything else
+}
+
+
+def endpoint_for(url: httpx.URL) -> str:
+    """Classify a request URL into one of the TIMEOUTS endpoints."""
+    path = url.path
+    if path.startswith("/rest/v1/rpc/"):
+        return "rpc"
+    if path.startswith("/rest/v1/"):
+        return "postgrest"
+    if path.startswith("/storage/v1/"):
+        return "storage"
+    return "default"
+
+
+class ConnectionStats:
+    """Thread-safe per-host counters of requests vs. newly opened connections."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, int]] = {}
+
+    def _bump(self, host: str, key: str) -> None:
+        with self._lock:
+            counters = self._hosts.setdefault(host, {"requests": 0, "connections": 0, "tls_handshakes": 0})
+            counters[key] += 1
+
+    def request(self, host: str) -> None:
+        self._bump(host, "requests")
+
+    def trace(self, host: str, event: str) -> None:
+        """Record an httpcore trace event (only connection setup is counted)."""
+        if event == "connection.connect_tcp.complete":
+            self._bump(host, "connections")
+        elif event == "connection.start_tls.complete":
+            self._bump(host, "tls_handshakes")
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Per-host counters plus the share of requests served on a reused connection."""
+        with self._lock:
+            hosts = {host: dict(counters) for host, counters in self._hosts.items()}
+        for counters in hosts.values():
+            requests = counters["requests"]
+            counters["reuse_ratio"] = round(1 - counters["connections"] / requests, 3) if requests else 0.0
+        return hosts
+
+    def log_summary(self) -> None:
+        for host, c in sorted(self.snapshot().items()):
+            logger.info(
+                f"🔌 {host}: {c['requests']} requests over {c['connections']} connections "
+                f"({c['tls_handshakes']} TLS handshakes, {c['reuse_ratio']:.0%} reused)"
+            )
+
+
+class Transport:
+    """Connection pools shared by every HTTP client in the scraper.
+
+    The sync client serves Supabase (PostgREST and Storage via supabase-py);
+    async clients (one per event loop, e.g. the image pipeline) share the same
+    limits, timeouts and statistics.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 64,
+        max_keepalive_connections: int = 32,
+        keepalive_expiry: float = 60.0,
+        http2: bool = HTTP2_ENABLED,
+        timeouts: Optional[Dict[str, httpx.Timeout]] = None,
+    ):
+        """Initialize the transport.
+
+        Args:
+            max_connections: Pool size per client
+            max_keepalive_connections: Idle connections kept open for reuse
+            keepalive_expiry: Seconds an idle connection is kept open
+            http2: Negotiate HTTP/2 where the server supports it
+            timeouts: Overrides for TIMEOUTS, keyed by endpoint
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2 and HTTP2_ENABLED
+        self.timeouts = {**TIMEOUTS, **(timeouts or {})}
+        self.stats = ConnectionStats()
+        self._client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # Request hooks
+    # -------------------------------------------------------------------------
+
+    def _prepare(self, request: httpx.Request) -> str:
+        host = request.url.host
+        endpoint = endpoint_for(request.url)
+        self.stats.request(host)
+        get_metrics().inc("http_requests", endpoint=endpoint)
+        request.extensions["timeout"] = self.timeouts[endpoint].as_dict()
+        return host
+
+    def _on_response(self, response: httpx.Response) -> None:
+        # Bodies may still be streaming here, so bytes come from Content-Length
+        endpoint = endpoint_for(response.request.url)
+        metrics = get_metrics()
+        metrics.inc("http_responses", endpoint=endpoint, status=f"{response.status_code // 100}xx")
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            metrics.inc("http_response_bytes", int(length), endpoint=endpoint)
+
+    async def _on_response_async(self, response: httpx.Response) -> None:
+        self._on_response(response)
+
+    def _on_request(self, request: httpx.Request) -> None:
+        host = self._prepare(request)
+        request.extensions["trace"] = lambda event, info: self.stats.trace(host, event)
+
+    async def _on_request_async(self, request: httpx.Request) -> None:
+        host = self._prepare(request)
+
+        async def trace(event, info):
+            self.stats.trace(host, event)
+
+        request.extensions["trace"] = trace
+
+    # -------------------------------------------------------------------------
+    # Clients
+    # -------------------------------------------------------------------------
+
+    @property
+    def client(self) -> httpx.Client:
+        """The shared synchronous client (created on first use)."""
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    http2=self.http2,
+                    limits=self.limits,
+                    timeout=self.timeouts["default"],
+                    follow_redirects=True,
+                    event_hooks={"request": [self._on_request], "response": [self._on_response]},
+                )
+            return self._client
+
+    def async_client(self, max_connections: Optional[int] = None) -> httpx.AsyncClient:
+        """A new async client bound to the caller's event loop.
+
+        Args:
+            max_connections: Pool size override (default: the transport's)
+        """
+        limits = self.limits
+        if max_connections:
+            limits = httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=self.limits.keepalive_expiry,
+            )
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=limits,
+            timeout=self.timeouts["default"],
+            follow_redirects=True,
+            event_hooks={"request": [self._on_request_async], "response": [self._on_response_async]},
+        )
+
+    def supabase_client(self, url: str, key: str):
+        """A Supabase client whose PostgREST and Storage traffic uses the shared pool."""
+        from supabase import create_client
+
+        try:
+            from supabase.lib.client_options import SyncClientOptions
+            options = SyncClientOptions(httpx_client=self.client)
+        except (ImportError, TypeError):
+            # Older supabase-py without httpx_client support: keep its own pool
+            logger.warning("supabase-py does not accept a shared httpx client - using its default transport")
+            return create_client(url, key)
+        return create_client(url, key, options=options)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+_default: Optional[Transport] = None
+_default_lock = threading.Lock()
+
+
+def get_transport() -> Transport:
+    """The process-wide shared transport."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Transport()
+        return _default
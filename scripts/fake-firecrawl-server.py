@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Local fake of the Firecrawl v1 API for testing FirecrawlExtractor.
+
+Implements the endpoints the extractor uses (single scrape and batch scrape
+with status polling) and returns generated listings after a simulated
+per-page latency, so batch mode can be tested without credits.
+
+Usage:
+    python scripts/fake-firecrawl-server.py --port 3002 --latency 1-5
+
+    export FIRECRAWL_API_URL=http://localhost:3002
+    export FIRECRAWL_API_KEY=fake
+    modal run modal_app/main.py --local
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+JOBS = {}  # job id -> list of {url, ready_at, failed}
+JOBS_LOCK = threading.Lock()
+
+
+def fake_listings(page_url: str, count: int) -> list:
+    """Deterministic listings for a page (same page -> same listings)."""
+    seed = int(hashlib.md5(page_url.encode()).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    base = page_url.split("?")[0].rstrip("/")
+    return [
+        {
+            "title": f"Apartamento en venta #{seed % 1000}-{i}",
+            "price": rng.randint(20, 400) * 1000,
+            "currency": "USD",
+            "location": rng.choice(["Caracas, Distrito Capital", "Valencia, Carabobo", "Maracaibo, Zulia"]),
+            "bedrooms": rng.randint(1, 5),
+            "bathrooms": rng.randint(1, 4),
+            "area_sqm": rng.randint(40, 400),
+            "source_url": f"{base}/listing-{seed % 100000}-{i}",
+            "property_type": "apartment",
+        }
+        for i in range(count)
+    ]
+
+
+def make_handler(args):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+
+        def _send(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _document(self, url: str, failed: bool) -> dict:
+            if failed:
+                return {"metadata": {"sourceURL": url, "statusCode": 500, "error": "simulated failure"}}
+            return {
+                "extract": {"listings": fake_listings(url, args.listings_per_page)},
+                "metadata": {"sourceURL": url, "statusCode": 200},
+            }
+
+        def _latency(self) -> float:
+            return random.uniform(args.latency_min, args.latency_max)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            if self.path == "/v1/scrape":
+                time.sleep(self._latency())
+                failed = random.random() < args.fail_rate
+                if failed:
+                    return self._send(500, {"success": False, "error": "simulated failure"})
+                return self._send(200, {"success": True, "data": self._document(request["url"], False)})
+
+            if self.path == "/v1/batch/scrape":
+                job_id = str(uuid.uuid4())
+                now = time.time()
+                with JOBS_LOCK:
+                    JOBS[job_id] = [
+                        {"url": url, "ready_at": now + self._latency(), "failed": random.random() < args.fail_rate}
+                        for url in request.get("urls", [])
+                    ]
+                host = self.headers.get("Host")
+                return self._send(200, {
+                    "success": True, "id": job_id, "url": f"http://{host}/v1/batch/scrape/{job_id}", "invalidURLs": [],
+                })
+
+            self._send(404, {"success": False, "error": "not found"})
+
+        def do_GET(self):
+            if not self.path.startswith("/v1/batch/scrape/"):
+                return self._send(404, {"success": False, "error": "not found"})
+            with JOBS_LOCK:
+                pages = JOBS.get(self.path.rsplit("/", 1)[-1])
+            if pages is None:
+                return self._send(404, {"success": False, "error": "job not found"})
+
+            now = time.time()
+            done = [page for page in pages if page["ready_at"] <= now]
+            self._send(200, {
+                "success": True,
+                "status": "completed" if len(done) == len(pages) else "scraping",
+                "total": len(pages),
+                "completed": len(done),
+                "creditsUsed": len(done),
+                "data": [self._document(page["url"], page["failed"]) for page in done],
+            })
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Firecrawl API server")
+    parser.add_argument("--port", type=int, default=3002)
+    parser.add_argument("--latency", default="1-3", help="Per-page latency range in seconds (e.g. 1-5)")
+    parser.add_argument("--listings-per-page", type=int, default=12)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of pages that fail (0-1)")
+    args = parser.parse_args()
+    low, _, high = args.latency.partition("-")
+    args.latency_min, args.latency_max = float(low), float(high or low)
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args))
+    print(f"Fake Firecrawl listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,10 @@
 import sys
 import os
 
-# Add parent directory to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# The scraper modules import each other flatly (run as python scraper/run.py)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scraper'))
 
-from scraper.run import PropertyScraper
+from run import PlaywrightExtractor
 
 def test_agent_office_extraction():
     """Test the agent_office field extraction."""
@@ -19,12 +19,11 @@ def test_agent_office_extraction():
 
     print(f"\n📄 Test URL: {test_url}\n")
 
-    scraper = PropertyScraper()
-
     try:
         # Parse the listing
         print("⏳ Fetching and parsing listing...")
-        result = scraper._parse_rentahouse_listing(test_url, "https://rentahouse.com.ve")
+        with PlaywrightExtractor() as extractor:
+            result = extractor._parse_rentahouse_listing(test_url, "https://rentahouse.com.ve")
 
         print("\n✅ Extraction completed!\n")
         print("-" * 80)
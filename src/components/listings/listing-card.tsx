@@ -28,8 +28,8 @@ export function ListingCard({ listing }: ListingCardProps) {
     office: 'Office',
   };
 
-  // Use thumbnail_url if available, otherwise use first image from image_urls array
-  const imageUrl = listing.thumbnail_url || (listing.image_urls && listing.image_urls.length > 0 ? listing.image_urls[0] : null);
+  // Prefer the card-sized WebP thumbnail, then thumbnail_url, then first image from image_urls array
+  const imageUrl = listing.thumbnail_small_url || listing.thumbnail_url || (listing.image_urls && listing.image_urls.length > 0 ? listing.image_urls[0] : null);
 
   // Use English translations with fallback to Spanish/original
   const displayTitle = listing.title_en || listing.title;
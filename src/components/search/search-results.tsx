@@ -41,7 +41,7 @@ export async function SearchResults({ searchParams }: SearchResultsProps) {
   // Build query - only select fields used in ListingCard
   let query = supabase
     .from('listings')
-    .select('id, title, title_en, thumbnail_url, image_urls, price, currency, property_type, city, location, neighborhood, state, region, bedrooms, bathrooms, area_sqm, parking_spaces', { count: 'exact' })
+    .select('id, title, title_en, thumbnail_url, thumbnail_small_url, image_urls, price, currency, property_type, city, location, neighborhood, state, region, bedrooms, bathrooms, area_sqm, parking_spaces', { count: 'exact' })
     .eq('active', true);
 
   // Keyword search (title, location, city, neighborhood)
@@ -25,6 +25,8 @@ export interface Listing {
   area_sqm: number | null;
   thumbnail_url: string | null;
   image_urls: string[] | null;
+  thumbnail_small_url: string | null;
+  image_variants: Record<string, string>[] | null;
   description_short: string | null;
   description_full: string | null;
   property_type: PropertyType | null;
@@ -0,0 +1,19 @@
+-- Image manifest: maps source image URLs to their self-hosted copies
+-- Lets the scraper reuse already-hosted photos instead of re-downloading
+-- and re-uploading them on every run.
+
+create table if not exists image_manifest (
+  source_url text primary key,        -- original image URL on the source site
+  content_hash text,                  -- sha256 of the image bytes
+  storage_path text not null,         -- path inside the property-images bucket
+  public_url text not null,           -- public URL of the hosted copy
+  created_at timestamp with time zone default now()
+);
+
+-- Lookup by content hash (same image served under a new URL)
+create index if not exists idx_image_manifest_content_hash on image_manifest(content_hash);
+
+-- Only written by the scraper (service role bypasses RLS)
+alter table image_manifest enable row level security;
+
+comment on table image_manifest is 'Source image URL -> hosted copy in property-images bucket. Loaded in bulk at scraper startup.';
@@ -0,0 +1,14 @@
+-- Resized image variants (WebP thumbnails) generated by the scraper
+-- Migration 012: Store variant URLs next to thumbnail_url / image_urls
+
+-- Card-sized WebP of the first image, used by listing cards
+ALTER TABLE listings ADD COLUMN IF NOT EXISTS thumbnail_small_url TEXT;
+
+-- One object per entry in image_urls: {"320": url, "768": url, "1600": url}
+ALTER TABLE listings ADD COLUMN IF NOT EXISTS image_variants JSONB;
+
+-- Image manifest keeps the variants so reused images keep them too
+ALTER TABLE image_manifest ADD COLUMN IF NOT EXISTS variants JSONB;
+
+COMMENT ON COLUMN listings.thumbnail_small_url IS 'Card-sized (768px) WebP variant of the thumbnail, for listing cards';
+COMMENT ON COLUMN listings.image_variants IS 'Resized WebP URLs per image (aligned with image_urls), keyed by width in px';
@@ -0,0 +1,7 @@
+-- Per-listing content hash for change detection
+-- Migration 013: Unchanged listings only get last_seen_at/active bumped
+
+-- sha256 of the scraped listing (all stored fields, computed by the scraper)
+ALTER TABLE listings ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+COMMENT ON COLUMN listings.content_hash IS 'sha256 of the scraped listing; when unchanged the scraper only updates last_seen_at/active';
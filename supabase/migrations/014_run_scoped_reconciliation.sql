@@ -0,0 +1,40 @@
+-- Run-scoped stale reconciliation
+-- Migration 014: Each crawl stamps the rows it sees with its run id; a single
+-- final step deactivates rows the run did not see and returns only a count.
+
+ALTER TABLE listings ADD COLUMN IF NOT EXISTS last_seen_run_id TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_listings_source_active_run
+  ON listings(source, active, last_seen_run_id);
+
+COMMENT ON COLUMN listings.last_seen_run_id IS 'Id of the last scrape run that saw this listing';
+
+-- Deactivate active listings of a source that were not seen by the given run.
+-- Idempotent: re-running for the same run deactivates nothing new.
+-- p_started_at (optional) protects rows touched by another run after this
+-- run started (e.g. the daily scrape overlapping the weekly one).
+CREATE OR REPLACE FUNCTION reconcile_stale_listings(
+  p_source TEXT,
+  p_run_id TEXT,
+  p_started_at TIMESTAMP WITH TIME ZONE DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  deactivated INTEGER;
+BEGIN
+  UPDATE listings
+  SET active = false
+  WHERE source = p_source
+    AND active = true
+    AND last_seen_run_id IS DISTINCT FROM p_run_id
+    AND (p_started_at IS NULL OR last_seen_at < p_started_at);
+
+  GET DIAGNOSTICS deactivated = ROW_COUNT;
+  RETURN deactivated;
+END;
+$$;
+
+COMMENT ON FUNCTION reconcile_stale_listings IS
+  'Marks listings not seen by scrape run p_run_id as inactive; returns the number of rows deactivated';
@@ -0,0 +1,134 @@
+-- Listing change-data feed
+-- Migration 015: An append-only log of what changed in listings (insert,
+-- update, price change, deactivation), written by a trigger so every writer
+-- (scraper, sync, Modal, reconciliation) is covered. Downstream jobs (SEO
+-- counts, sitemaps) read it with a cursor instead of rescanning listings.
+
+create table if not exists listing_changes (
+  id bigint generated always as identity primary key,
+  xact_id xid8 not null default pg_current_xact_id(),  -- writing transaction; cursor with id
+  listing_id uuid not null,
+  source text not null,
+  source_url text not null,
+  change_type text not null check (change_type in ('insert', 'update', 'price_change', 'deactivation')),
+  changed_fields text[] not null default '{}',
+  old_price numeric,
+  new_price numeric,
+  run_id text,
+  created_at timestamp with time zone default now()
+);
+
+create index if not exists idx_listing_changes_listing on listing_changes(listing_id, id);
+create index if not exists idx_listing_changes_cursor on listing_changes(xact_id, id);
+
+-- Written by the trigger below and read by backend jobs (service role
+-- bypasses RLS). No public policy: the log includes source URLs and old
+-- values of deactivated listings, which the anon key must not see.
+alter table listing_changes enable row level security;
+drop policy if exists "Listing changes are publicly readable" on listing_changes;
+
+comment on table listing_changes is 'Append-only change log of listings. Read through read_listing_changes(): '
+  'it returns only changes of transactions older than every running one, ordered by (xact_id, id), so a '
+  'cursor never moves past a change that commits later. Ids alone are not commit-ordered.';
+
+-- Concurrent writers (shards, Modal workers, reconciliation) take ids in one
+-- order and commit in another, so "id > cursor" can skip a late commit.
+-- Every transaction below the snapshot xmin has finished and later ones get
+-- higher ids, so the rows below that horizon are final in (xact_id, id) order.
+create or replace function read_listing_changes(
+  p_after_xact text default '0',
+  p_after_id bigint default 0,
+  p_limit integer default 1000,
+  p_source text default null,
+  p_change_types text[] default null
+)
+returns setof listing_changes
+language sql
+stable
+as $$
+  select *
+  from listing_changes
+  where (xact_id, id) > (p_after_xact::xid8, p_after_id)
+    and xact_id < pg_snapshot_xmin(pg_current_snapshot())
+    and (p_source is null or source = p_source)
+    and (p_change_types is null or change_type = any(p_change_types))
+  order by xact_id, id
+  limit p_limit;
+$$;
+
+revoke execute on function read_listing_changes(text, bigint, integer, text, text[]) from public, anon, authenticated;
+
+-- Logs one entry per real change; bookkeeping columns that change on every
+-- write (last_seen_at, run id, hashes) are ignored, so touches log nothing.
+create or replace function log_listing_change()
+returns trigger
+language plpgsql
+as $$
+declare
+  fields text[];
+  kind text;
+  run text := coalesce(nullif(current_setting('scraper.run_id', true), ''), new.last_seen_run_id);
+begin
+  if tg_op = 'INSERT' then
+    insert into listing_changes (listing_id, source, source_url, change_type, new_price, run_id)
+    values (new.id, new.source, new.source_url, 'insert', new.price, run);
+    return null;
+  end if;
+
+  select coalesce(array_agg(n.key order by n.key), '{}')
+  into fields
+  from jsonb_each(to_jsonb(new)) n
+  join jsonb_each(to_jsonb(old)) o using (key)
+  where n.value is distinct from o.value
+    and n.key not in ('id', 'created_at', 'scraped_at', 'last_seen_at', 'last_seen_run_id',
+                      'content_hash', 'translated_at');
+
+  if cardinality(fields) = 0 then
+    return null;  -- touch only (last_seen_at / run id)
+  end if;
+
+  if old.active and not new.active then
+    kind := 'deactivation';
+  elsif new.price is distinct from old.price then
+    kind := 'price_change';
+  else
+    kind := 'update';
+  end if;
+
+  insert into listing_changes (listing_id, source, source_url, change_type, changed_fields, old_price, new_price, run_id)
+  values (new.id, new.source, new.source_url, kind, fields, old.price, new.price, run);
+  return null;
+end;
+$$;
+
+drop trigger if exists trg_log_listing_change on listings;
+create trigger trg_log_listing_change
+  after insert or update on listings
+  for each row execute function log_listing_change();
+
+-- Reconciliation tags its deactivations with the reconciling run's id
+-- (the rows themselves still carry the id of the last run that saw them).
+CREATE OR REPLACE FUNCTION reconcile_stale_listings(
+  p_source TEXT,
+  p_run_id TEXT,
+  p_started_at TIMESTAMP WITH TIME ZONE DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  deactivated INTEGER;
+BEGIN
+  PERFORM set_config('scraper.run_id', p_run_id, true);
+
+  UPDATE listings
+  SET active = false
+  WHERE source = p_source
+    AND active = true
+    AND last_seen_run_id IS DISTINCT FROM p_run_id
+    AND (p_started_at IS NULL OR last_seen_at < p_started_at);
+
+  GET DIAGNOSTICS deactivated = ROW_COUNT;
+  RETURN deactivated;
+END;
+$$;
@@ -1,6 +1,9 @@
 """Quick script to verify Supabase data has all required fields."""
 import os
-from supabase import create_client
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scraper"))
+from transport import get_transport
 
 # Get environment variables
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -10,7 +13,8 @@ if not SUPABASE_URL or not SUPABASE_KEY:
     print("ERROR: SUPABASE_URL and SUPABASE_KEY must be set")
     exit(1)
 
-client = create_client(SUPABASE_URL, SUPABASE_KEY)
+transport = get_transport()
+client = transport.supabase_client(SUPABASE_URL, SUPABASE_KEY)
 
 # Fetch recent listings
 response = client.table("listings").select("*").limit(5).execute()
@@ -46,3 +50,8 @@ print(f"  With bathrooms: {with_bathrooms.count} ({with_bathrooms.count/total.co
 print(f"  With area: {with_area.count} ({with_area.count/total.count*100:.1f}%)")
 print(f"  With images: {with_images.count} ({with_images.count/total.count*100:.1f}%)")
 print()
+
+print("Connection reuse:")
+for host, stats in transport.stats.snapshot().items():
+    print(f"  {host}: {stats['requests']} requests over {stats['connections']} connections ({stats['reuse_ratio']:.0%} reused)")
+transport.close()